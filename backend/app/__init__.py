@@ -4,6 +4,7 @@ import json
 import os
 from pathlib import Path
 from app.config.quartus_config import DATA_FILES
+from app.services.connection_matrix import ConnectionMatrix
 
 def create_app():
     app = Flask(__name__)
@@ -14,33 +15,50 @@ def create_app():
     app.register_blueprint(pins.bp)
     from app.routes import buttons
     app.register_blueprint(buttons.bp)
+    from app.routes import jobs
+    app.register_blueprint(jobs.bp)
+    from app.routes import builds
+    app.register_blueprint(builds.bp)
+    from app.routes import profiles
+    app.register_blueprint(profiles.bp)
+    from app.routes import crossbar
+    app.register_blueprint(crossbar.bp)
+    from app.routes import boards
+    app.register_blueprint(boards.bp)
 
     # Создаем начальную конфигурацию, если её нет
+    from app.services.pin_config import save_config, load_config
     config_file = Path(DATA_FILES['pin_connections'])
     if not config_file.exists():
-        with open(config_file, 'w') as f:
-            json.dump({'connections': []}, f, indent=4)
+        save_config({'connections': []})
 
-    # Загружаем начальную конфигурацию
+    # Загружаем начальную конфигурацию (дальше она читается из памяти)
     try:
-        with open(config_file, 'r') as f:
-            config = json.load(f)
+        config = load_config()
     except Exception as e:
         print(f"Error loading config: {e}")
         config = {'connections': []}
 
+    # Загружаем таблицы пинов один раз при старте
+    from app.services.pin_map import pin_map
+    try:
+        pin_map.get()
+    except Exception as e:
+        print(f"Error loading pin map: {e}")
+
+    # Фоновое обновление списка JTAG кабелей (если Quartus установлен)
+    from app.services.jtag_registry import jtag_registry
+    jtag_registry.start()
+
     # Создаем директорию для загрузки .sof файлов, если её нет
     de10_upload_dir = Path(DATA_FILES['de10_upload_dir'])
     de10_upload_dir.mkdir(exist_ok=True)
 
     def generate_verilog_code(connections):
-        # Определяем размеры матрицы
-        max_row = 0
-        max_col = 0
-        for conn in connections:
-            row, col = map(int, conn.split('-'))
-            max_row = max(max_row, row)
-            max_col = max(max_col, col)
+        # Матрица соединений из ячеек "row-col", размеры - по наибольшим номерам
+        matrix = ConnectionMatrix.from_cells(connections)
+        max_row = max(matrix.shape[0] - 1, 0)
+        max_col = max(matrix.shape[1] - 1, 0)
         
         # Создаем шаблон модуля
         verilog_code = []
@@ -51,10 +69,8 @@ def create_app():
         verilog_code.append("")
         
         # Добавляем assign statements для каждого соединения
-        for conn, is_connected in connections.items():
-            if is_connected:
-                row, col = map(int, conn.split('-'))
-                verilog_code.append(f"    assign outputs[{col}] = inputs[{row}];")
+        for row, col in matrix.cells():
+            verilog_code.append(f"    assign outputs[{col}] = inputs[{row}];")
         
         verilog_code.append("")
         verilog_code.append("endmodule")
@@ -68,20 +84,15 @@ def create_app():
             print("Received POST request with data:", data)
             
             # Save configuration to file
-            with open(DATA_FILES['pin_connections'], 'w') as f:
-                json.dump(data, f)
+            save_config(data)
             
             print("Configuration saved successfully")
             return jsonify({"message": "Configuration saved successfully"})
         else:
             print("Received GET request for config")
-            try:
-                with open(DATA_FILES['pin_connections'], 'r') as f:
-                    config = json.load(f)
-                    print("Loaded config:", config)
-                    return jsonify(config)
-            except FileNotFoundError:
-                return jsonify({"connections": {}})
+            config = load_config()
+            print("Loaded config:", config)
+            return jsonify(config)
 
     @app.route('/api/pins/verilog', methods=['GET'])
     def get_verilog():
@@ -35,5 +35,149 @@ DATA_FILES = {
     'perif': os.path.join(BASE_DIR, 'data', 'perif.csv'),
     'green_v': os.path.join(BASE_DIR, 'data', '2161_Green', 'GreenP.v'),
     'pin_connections': os.path.join(BASE_DIR, 'data', 'pin_connections.json'),
-    'de10_upload_dir': os.path.join(BASE_DIR, 'data', 'de10_upload')
-} 
\ No newline at end of file
+    'de10_upload_dir': os.path.join(BASE_DIR, 'data', 'de10_upload'),
+    'green_dir': os.path.join(BASE_DIR, 'data', '2161_Green'),
+    'de10_dir': os.path.join(BASE_DIR, 'data', '2161_De10'),
+    'bitstream_cache_dir': os.path.join(BASE_DIR, 'data', 'bitstream_cache'),
+    'build_reports_db': os.path.join(BASE_DIR, 'data', 'build_reports.sqlite3'),
+    'profiles_db': os.path.join(BASE_DIR, 'data', 'profiles.sqlite3')
+}
+
+# Директория bin Quartus, из которой запускаются quartus_sh и quartus_pgm
+QUARTUS_BIN_DIR = '/home/amur/intelFPGA_lite/20.1/quartus/bin'
+
+# Платы стенда. 'port' - кабель по умолчанию, если обнаружение не удалось;
+# 'device' - ПЛИС платы, по которой кабель находится в JTAG цепочках
+BOARDS = {
+    'green': {
+        'project': 'GreenP',
+        'dir': DATA_FILES['green_dir'],
+        'port': 'USB-Blaster [2-1.5]',
+        'device': 'EP4CE6F17C8',
+    },
+    'de10': {
+        'project': 'De10P',
+        'dir': DATA_FILES['de10_dir'],
+        'port': 'USB-Blaster [2-1.6]',
+        'device': '10M50DAF484C7G',
+    },
+}
+
+# Обнаружение JTAG кабелей и цепочек устройств
+JTAG = {
+    # Сколько секунд результат обнаружения считается актуальным
+    'ttl': 30,
+    # Период фонового обновления, секунды (0 - без фонового обновления)
+    'refresh_interval': 20,
+    # Таймаут одного вызова quartus_pgm, секунды
+    'command_timeout': 60,
+}
+
+# Настройки кэша скомпилированных прошивок (.sof)
+BITSTREAM_CACHE = {
+    # Максимальное число сохранённых сборок
+    'max_entries': 32,
+    # Максимальный суммарный размер кэша на диске, байт
+    'max_bytes': 512 * 1024 * 1024,
+} 
+# Настройки очереди задач компиляции и прошивки
+JOBS = {
+    # Число одновременно выполняемых задач. Каждая сборка идёт в своей
+    # рабочей директории (см. WORKSPACES); если они отключены, проект
+    # компилируется на месте и задачи должны выполняться по одной
+    'max_workers': 2,
+    # Потоки для продолжения задач, дождавшихся платы (прошивка после
+    # выдачи аренды); ожидающая задача поток не занимает
+    'resume_workers': 4,
+    # Сколько завершённых задач хранить для опроса статуса
+    'max_history': 100,
+    # Сколько последних строк журнала хранить для каждой задачи
+    'log_lines': 500,
+}
+
+# Прошивка нескольких плат одним запросом
+PROGRAMMING = {
+    # Сколько quartus_pgm может работать одновременно
+    'max_parallel': 4,
+    # Сколько прошивок одновременно допускается на один кабель
+    'per_board_limit': 1,
+}
+
+# Выбор способа компиляции (см. app/services/compile_planner.py)
+COMPILE = {
+    # Пропускать анализ таймингов (quartus_sta) - быстрее, но без отчёта .sta.rpt
+    'skip_sta': False,
+    # Если изменились только assign, запускать Rapid Recompile
+    # (quartus_sh --flow recompile), который переиспользует размещение прошлой
+    # сборки, вместо полного --flow compile. Выбирается только для семейств из
+    # rapid_recompile_families; если recompile всё же не удался, выполняется
+    # полная компиляция и режим для проекта больше не выбирается
+    'incremental': True,
+    # Семейства ПЛИС, для которых Quartus выполняет Rapid Recompile. Cyclone IV E
+    # (Green) и MAX 10 (DE10-Lite) его не поддерживают: для них изменение assign
+    # меняет нетлист, и Quartus заново выполняет все этапы (SMART_RECOMPILE
+    # ничего не пропускает) - ускорить можно только кэшем прошивок и skip_sta
+    'rapid_recompile_families': ('Cyclone V', 'Arria V', 'Stratix V', 'Arria 10', 'Cyclone 10 GX'),
+    # Печатать время этапов generate_verilog при каждой генерации (отладка)
+    'log_generate_timings': False,
+}
+
+# Режим коммутатора (см. app/services/crossbar.py): модуль компилируется
+# один раз, соединения загружаются в регистр выбора через Arduino
+CROSSBAR = {
+    # Имя модуля верхнего уровня
+    'module': 'GreenCrossbar',
+    # Куда записывается сгенерированный модуль
+    'dir': os.path.join(BASE_DIR, 'data', 'crossbar'),
+    # Загрузка соединений в коммутатор (POST /api/crossbar/apply). Выключено:
+    # портам cfg_clk/cfg_data/cfg_latch не назначены пины в .qsf и скетч
+    # Arduino пока не принимает кадр 0x5A. /apply?dry_run=1 работает всегда
+    'apply_enabled': False,
+}
+
+# Пул долгоживущих сессий `quartus_sh -s` (см. app/services/tcl_shell.py).
+# Если включён, этапы компиляции выполняются командами Tcl в уже
+# запущенной сессии вместо запуска отдельного процесса на каждый этап
+QUARTUS_TCL = {
+    'enabled': False,
+    # Число одновременно запущенных сессий
+    'pool_size': 2,
+    # После скольких задач сессия перезапускается
+    'max_jobs': 20,
+    # Сколько секунд ждать готовности новой сессии
+    'startup_timeout': 120,
+    # Таймаут одного этапа компиляции, секунды
+    'command_timeout': 3600,
+}
+
+# Рабочие директории сборок (см. app/services/workspaces.py): каждая задача
+# компилирует свою копию проекта, поэтому сборки могут идти параллельно
+WORKSPACES = {
+    'enabled': True,
+    # Где создаются рабочие директории
+    'dir': os.path.join(BASE_DIR, 'data', 'workspaces'),
+    # Сколько завершённых рабочих директорий хранить для разбора ошибок
+    'max_workspaces': 8,
+    # Максимальный суммарный размер завершённых рабочих директорий, байт
+    'max_bytes': 1024 * 1024 * 1024,
+}
+
+# Очередь к платам (см. app/services/board_scheduler.py): плата выдаётся
+# задаче прошивки или внешнему клиенту во временное пользование (lease)
+BOARD_LEASES = {
+    # Через сколько секунд невозвращённая плата освобождается автоматически
+    'lease_timeout': 300,
+    # Наибольший срок аренды, который может запросить клиент (ttl), секунды
+    'max_ttl': 600,
+    # Допустимые приоритеты: 0 (обычный) .. max_priority
+    'max_priority': 10,
+    # Приоритет выше 0 принимается только с этим значением в заголовке
+    # X-Priority-Token (например, для преподавателя); None - только приоритет 0
+    'priority_token': None,
+    # За какой период, секунды, учитывается, сколько раз клиент уже получал плату
+    'fair_share_window': 600,
+    # Сколько последних длительностей прошивки хранить для оценки ожидания
+    'history': 20,
+    # Оценка длительности прошивки, пока не записано ни одной, секунды
+    'default_duration': 30,
+}
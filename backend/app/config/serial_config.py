@@ -0,0 +1,39 @@
+# Последовательные устройства (Arduino), к которым подключается backend.
+# Ключ - имя устройства, по которому сервисы получают соединение из пула.
+SERIAL_DEVICES = {
+    'arduino': {
+        'port': '/dev/tty.usbmodem1101',
+        # Для двоичного протокола можно поднять скорость, например до 115200
+        'baudrate': 9600,
+        # Таймаут записи/чтения, секунды
+        'timeout': 1,
+    },
+}
+
+# Повторное подключение после ошибок: задержка растёт экспоненциально
+SERIAL_RECONNECT = {
+    # Первая задержка перед повторной попыткой, секунды
+    'backoff_initial': 0.5,
+    # Максимальная задержка, секунды
+    'backoff_max': 30.0,
+}
+
+# Очередь событий кнопок для /api/buttons/state
+BUTTON_PIPELINE = {
+    # Сколько ждать после первого события, собирая пакет, секунды
+    'batch_window': 0.005,
+    # Максимум ожидающих отправки событий (после объединения по кнопкам)
+    'max_pending': 256,
+    # Пауза перед повторной отправкой пакета после ошибки записи, секунды
+    'retry_delay': 0.5,
+}
+
+# Протокол команд кнопок для Arduino:
+#   'text'   - строка "<buttonId>:<0|1>\n" на каждую кнопку
+#   'binary' - кадры фиксированного размера с битовой картой состояний и CRC
+#              (см. app/services/button_protocol.py), скетч Arduino должен
+#              использовать тот же формат
+ARDUINO = {
+    'device': 'arduino',
+    'protocol': 'text',
+}
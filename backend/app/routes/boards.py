@@ -0,0 +1,80 @@
+from flask import Blueprint, jsonify, request
+from app.services.board_scheduler import board_scheduler, parse_priority, LeaseExpired
+
+bp = Blueprint('boards', __name__, url_prefix='/api/boards')
+
+def request_owner(data=None):
+    """Кто запрашивает плату: X-Client-Id, поле owner в теле или адрес клиента"""
+    data = data or {}
+    return request.headers.get('X-Client-Id') or data.get('owner') or request.remote_addr or 'anonymous'
+
+@bp.route('', methods=['GET'])
+def list_boards():
+    """Занятость плат, длина очередей и оценка длительности прошивки"""
+    return jsonify(board_scheduler.get_stats())
+
+@bp.route('/<board>/queue', methods=['GET'])
+def get_board_queue(board):
+    """Выданная заявка и очередь платы с местом и оценкой ожидания"""
+    try:
+        return jsonify(board_scheduler.get_queue(board))
+    except KeyError:
+        return jsonify({'error': 'Board not found'}), 404
+
+@bp.route('/<board>/leases', methods=['POST'])
+def request_lease(board):
+    """
+    Встать в очередь к плате, не дожидаясь выдачи. Статус заявки
+    опрашивается через /api/boards/leases/<id>, выданную плату нужно
+    продлевать (/renew) или вернуть (DELETE) до истечения срока. Срок
+    ttl ограничен BOARD_LEASES['max_ttl'], приоритет выше 0 требует
+    заголовка X-Priority-Token.
+    """
+    data = request.get_json(silent=True)
+    if data is not None and not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be an object'}), 400
+    data = data or {}
+    try:
+        priority = parse_priority(data.get('priority', request.args.get('priority')),
+                                  token=request.headers.get('X-Priority-Token'))
+        ttl = data.get('ttl')
+        if ttl is not None and (isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl <= 0):
+            raise ValueError("ttl must be a positive number of seconds")
+    except PermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        lease = board_scheduler.request(board, request_owner(data), priority, ttl=ttl)
+    except KeyError:
+        return jsonify({'error': 'Board not found'}), 404
+    return jsonify(board_scheduler.get_lease(lease.id)), 201
+
+@bp.route('/leases/<lease_id>', methods=['GET'])
+def get_lease(lease_id):
+    """Состояние заявки: место в очереди и оценка ожидания или срок аренды"""
+    info = board_scheduler.get_lease(lease_id)
+    if info is None:
+        return jsonify({'error': 'Lease not found'}), 404
+    return jsonify(info)
+
+@bp.route('/leases/<lease_id>/renew', methods=['POST'])
+def renew_lease(lease_id):
+    """Продлить выданную аренду"""
+    data = request.get_json(silent=True) or {}
+    ttl = data.get('ttl') if isinstance(data, dict) else None
+    if ttl is not None and (isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl <= 0):
+        return jsonify({'error': 'ttl must be a positive number of seconds'}), 400
+    try:
+        lease = board_scheduler.renew(lease_id, ttl)
+    except LeaseExpired as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(board_scheduler.get_lease(lease.id))
+
+@bp.route('/leases/<lease_id>', methods=['DELETE'])
+def release_lease(lease_id):
+    """Вернуть плату или снять заявку с очереди"""
+    lease = board_scheduler.release(lease_id)
+    if lease is None:
+        return jsonify({'error': 'Lease not found'}), 404
+    return jsonify(board_scheduler.get_lease(lease.id))
@@ -0,0 +1,58 @@
+from pathlib import Path
+from flask import Blueprint, jsonify, request
+from app.config.quartus_config import BOARDS
+from app.services.bitstream_cache import bitstream_cache
+from app.services.build_store import build_store, REPORT_TABLES
+from app.services.compile_planner import load_build_state
+
+bp = Blueprint('builds', __name__, url_prefix='/api/builds')
+
+def resolve_build(build_id):
+    """
+    Находит сборку в хранилище, при необходимости разбирая отчёты.
+
+    build_id - ключ сборки или имя платы ('green', 'de10') для её последней
+    сборки. Отчёты сборки, которой ещё нет в хранилище, берутся из кэша
+    прошивок, а для платы - из output_files проекта.
+    """
+    board = BOARDS.get(build_id)
+    if board is not None:
+        state = load_build_state(board['dir'])
+        # Без записи о сборке отчёты output_files хранятся под именем проекта
+        build_id = state['key'] if state and state.get('key') else board['project']
+        if not build_store.has(build_id):
+            output_dir = Path(board['dir']) / "output_files"
+            if not (output_dir / f"{board['project']}.flow.rpt").is_file():
+                return None
+            build_store.ingest(build_id, board['project'], output_dir)
+        return build_id
+
+    if build_store.has(build_id):
+        return build_id
+    sof_path = bitstream_cache.lookup(build_id)
+    if sof_path is None:
+        return None
+    project_name = sof_path.stem
+    build_store.ingest(build_id, project_name, sof_path.parent)
+    return build_id
+
+@bp.route('', methods=['GET'])
+def list_builds():
+    """Сохранённые сборки; ?project= фильтрует по проекту"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify({'builds': build_store.list_builds(request.args.get('project'), limit)})
+
+@bp.route('/<build_id>/reports', methods=['GET'])
+def get_build_reports(build_id):
+    """
+    Разобранные отчёты сборки: ресурсы, Fmax и запасы по клокам и углам, пины.
+    ?sections=resources,pins ограничивает набор разделов.
+    """
+    sections = [s for s in request.args.get('sections', '').split(',') if s]
+    unknown = [s for s in sections if s not in REPORT_TABLES]
+    if unknown:
+        return jsonify({'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+    resolved = resolve_build(build_id)
+    if resolved is None:
+        return jsonify({'error': 'Build not found'}), 404
+    return jsonify(build_store.get_reports(resolved, sections))
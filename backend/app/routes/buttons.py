@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from app.services.arduino_serial import arduino_serial
+from app.services.button_pipeline import button_pipeline, QueueFullError
+from app.services.serial_pool import serial_pool
 
 bp = Blueprint('buttons', __name__, url_prefix='/api/buttons')
 
@@ -10,8 +11,25 @@ def button_state():
     pressed = data.get('pressed')
     if button_id is None or pressed is None:
         return jsonify({'error': 'Missing buttonId or pressed'}), 400
+    if not isinstance(button_id, str):
+        return jsonify({'error': 'buttonId must be a string'}), 400
     try:
-        arduino_serial.send_button_state(button_id, pressed)
-        return jsonify({'status': 'ok'})
+        # Событие уходит в порт из отдельного потока, запрос не ждёт записи
+        seq = button_pipeline.submit(button_id, pressed)
+        return jsonify({'status': 'queued', 'seq': seq}), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/health', methods=['GET'])
+def serial_health():
+    """Состояние соединений с последовательными устройствами"""
+    return jsonify(serial_pool.health())
+
+@bp.route('/metrics', methods=['GET'])
+def pipeline_metrics():
+    """Глубина очереди, объединённые события и задержка отправки"""
+    return jsonify(button_pipeline.get_metrics())
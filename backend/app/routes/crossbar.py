@@ -0,0 +1,79 @@
+import time
+from pathlib import Path
+from flask import Blueprint, jsonify, request
+from app.config.quartus_config import CROSSBAR
+from app.services import crossbar
+from app.services.arduino_serial import arduino_serial
+from app.services.pin_config import load_config
+from app.services.pin_map import pin_map
+from app.services.pin_validator import pin_validator, InvalidConnections
+from app.services.verilog_generator import write_atomic
+
+bp = Blueprint('crossbar', __name__, url_prefix='/api/crossbar')
+
+@bp.route('/layout', methods=['GET'])
+def get_layout():
+    """Раскладка регистра выбора: источники, выходы, ширина поля"""
+    try:
+        layout = crossbar.make_layout(pin_map.get())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'sources': list(layout.sources),
+        'targets': list(layout.targets),
+        'sel_bits': layout.sel_bits,
+        'image_bits': layout.image_bits,
+        'image_bytes': crossbar.image_size(layout),
+    })
+
+@bp.route('/design', methods=['POST'])
+def generate_design():
+    """Сгенерировать модуль коммутатора для компиляции"""
+    try:
+        layout = crossbar.make_layout(pin_map.get())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    out_dir = Path(CROSSBAR['dir'])
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{CROSSBAR['module']}.v"
+    code = crossbar.generate_verilog(layout, CROSSBAR['module'])
+    write_atomic(path, code)
+    return jsonify({'message': 'Crossbar design generated', 'path': str(path), 'verilog_code': code})
+
+@bp.route('/apply', methods=['POST'])
+def apply_routing():
+    """
+    Загрузить соединения в коммутатор без компиляции.
+
+    Тело {"connections": [...]} или сохранённая конфигурация; ?dry_run=1
+    только возвращает образ регистра. Отправка кадра на Arduino выключена,
+    пока CROSSBAR['apply_enabled'] не включён (нужны скетч, принимающий
+    кадр 0x5A, и назначения пинов cfg_clk/cfg_data/cfg_latch в .qsf) -
+    тогда ответ 501 с образом регистра.
+    """
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and 'connections' in data:
+        connections = data['connections']
+    else:
+        connections = load_config().get('connections', [])
+    try:
+        pin_validator.check(connections)
+        tables = pin_map.get()
+        image = crossbar.encode_selects(connections, tables)
+    except InvalidConnections as e:
+        return jsonify({'error': 'Invalid pin connections', **e.report}), 422
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = {'image': image.hex(), 'image_bytes': len(image), 'connections': len(connections)}
+    if request.args.get('dry_run', '').lower() in ('1', 'true', 'yes'):
+        return jsonify(response)
+    if not CROSSBAR.get('apply_enabled'):
+        return jsonify({'error': 'Crossbar apply is disabled (CROSSBAR apply_enabled)', **response}), 501
+    started = time.perf_counter()
+    try:
+        arduino_serial.send_frames(crossbar.encode_frame(image))
+    except RuntimeError as e:
+        return jsonify({'error': str(e), **response}), 503
+    response['seconds'] = round(time.perf_counter() - started, 4)
+    return jsonify(response)
@@ -0,0 +1,73 @@
+import json
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.services.jobs import job_manager, FINISHED_STATES
+from app.services.quartus import compile_flights
+from app.services.board_scheduler import board_scheduler
+
+bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+@bp.route('', methods=['GET'])
+def list_jobs():
+    """Список задач компиляции/прошивки"""
+    return jsonify({'jobs': [job.to_dict() for job in job_manager.list_jobs()]})
+
+@bp.route('/metrics', methods=['GET'])
+def jobs_metrics():
+    """Число задач по статусам и объединённые сборки с числом ожидающих"""
+    by_status = {}
+    for job in job_manager.list_jobs():
+        by_status[job.status] = by_status.get(job.status, 0) + 1
+    return jsonify({'jobs': by_status, 'compile': compile_flights.get_stats()})
+
+@bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Статус задачи; с ?logs=1 возвращает журнал начиная с offset"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    with_logs = request.args.get('logs', '').lower() in ('1', 'true', 'yes')
+    offset = request.args.get('offset', 0, type=int)
+    data = job.to_dict(with_logs=with_logs, log_offset=max(offset, 0))
+    # Место в очереди к плате, пока задача ждёт её или прошивает
+    data['lease'] = board_scheduler.find_by_job(job.id)
+    return jsonify(data)
+
+@bp.route('/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Отменить задачу"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@bp.route('/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events: записи журнала задачи по мере поступления.
+
+    Каждая запись отправляется событием 'log' с id = seq, поэтому браузер
+    при переподключении продолжает с Last-Event-ID. По завершении задачи
+    отправляется событие 'status' и поток закрывается.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    last_seq = request.headers.get('Last-Event-ID', type=int)
+    if last_seq is None:
+        last_seq = request.args.get('offset', 0, type=int)
+
+    def stream():
+        seq = last_seq
+        while True:
+            for entry in job.logs_after(seq):
+                seq = entry['seq']
+                yield f"id: {seq}\nevent: log\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+            if job.status in FINISHED_STATES and not job.logs_after(seq):
+                yield f"event: status\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+                return
+            if not job.wait_for_change(seq, timeout=15):
+                # Комментарий-пинг, чтобы прокси не закрывали простаивающее соединение
+                yield ": ping\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -1,45 +1,41 @@
 from flask import Blueprint, jsonify, request
-from app.services.pin_config import save_config, load_config
+from app.services.pin_config import save_config, load_config, config_store, VersionConflict
 from app.services.quartus import program_green, program_de10
-from app.services.verilog_generator import generate_verilog
-import csv
+from app.services.verilog_generator import generate_verilog, patch_verilog
+from app.services.bitstream_cache import bitstream_cache
+from app.services.jobs import job_manager, chain, SUCCEEDED
+from app.services.pin_map import pin_map
+from app.services.connection_matrix import ConnectionMatrix
+from app.services.jtag_registry import jtag_registry
+from app.services.multi_program import program_many
+from app.services.compile_planner import load_build_state
+from app.services.pin_validator import pin_validator, InvalidConnections
+from app.services.workspaces import workspace_manager
+from app.services.board_scheduler import parse_priority
 import os
-import pandas as pd
 import werkzeug
 import glob
 from app.config.quartus_config import DATA_FILES
 
 bp = Blueprint('pins', __name__, url_prefix='/api/pins')
 
-def get_pin_names():
-    """Читает имена пинов из CSV файлов"""
-    pin_names = []
-    base_path = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    config_path = os.path.join(base_path, "config")
-    de10_csv_path = os.path.join(config_path, "de10lite.csv")
-    perif_csv_path = os.path.join(config_path, "perif.csv")
+# Максимальное число пар в одной странице /names
+MAX_PIN_NAMES_PAGE = 1000
 
-    try:
-        # Читаем CSV файлы
-        de10_df = pd.read_csv(de10_csv_path)
-        perif_df = pd.read_csv(perif_csv_path)
-
-        # Создаем списки имен пинов
-        left_pins = perif_df['Perifery'].tolist()  # Теперь left - это Perifery
-        right_pins = de10_df['DE10-Lite'].tolist()  # Теперь right - это DE10-Lite
-
-        # Формируем список пар
-        for left in left_pins:
-            for right in right_pins:
-                pin_names.append({
-                    'left': left,
-                    'right': right
-                })
-
-        return pin_names
-    except Exception as e:
-        print(f"Error reading pin names: {e}")
-        return []
+def iter_pin_names(tables, offset=0, limit=None):
+    """
+    Генератор пар имен пинов (left - Perifery, right - DE10-Lite).
+
+    Пары перебираются построчно по периферии; пара с номером i вычисляется
+    напрямую, поэтому страница с offset не требует обхода предыдущих пар.
+    """
+    left_pins = tables.perif_labels
+    right_pins = tables.de10_labels
+    total = len(left_pins) * len(right_pins)
+    stop = total if limit is None else min(total, offset + limit)
+    for i in range(offset, stop):
+        left, right = divmod(i, len(right_pins))
+        yield {'left': left_pins[left], 'right': right_pins[right]}
 
 @bp.route('/config', methods=['POST'])
 def save_pin_config():
@@ -57,23 +53,85 @@ def save_pin_config():
         for pair in connections:
             if not isinstance(pair, list) or len(pair) != 2 or not all(isinstance(pin, str) for pin in pair):
                 return jsonify({"error": "Each connection must be a pair of pin names"}), 400
+
+        # Неизвестные пины и конфликты отклоняются до сохранения
+        report = pin_validator.validate(connections)
+        if not report['valid']:
+            return jsonify({"error": "Invalid pin connections", **report}), 422
     
+    # If-Match защищает от перезаписи чужих изменений (412 при несовпадении)
+    if_match = next(iter(request.if_match), None) if request.if_match else None
     try:
-        save_config(config)
+        saved = save_config(config, if_match=if_match)
         print("Configuration saved successfully")
-        return jsonify({"message": "Configuration saved successfully"}), 200
+        _, etag = config_store.load_with_etag()
+        result = jsonify({"message": "Configuration saved successfully", "version": saved['version']})
+        result.set_etag(etag)
+        return result, 200
+    except VersionConflict as e:
+        return jsonify({"error": "Configuration was modified", "version": e.current_version}), 412
     except Exception as e:
         print("Error saving configuration:", str(e))
         return jsonify({"error": str(e)}), 400
 
+def parse_pairs(value, field):
+    """Список пар имён пинов из тела PATCH или ValueError"""
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(
+            isinstance(pair, list) and len(pair) == 2 and all(isinstance(pin, str) for pin in pair)
+            for pair in value):
+        raise ValueError(f"'{field}' must be a list of [left_pin, right_pin] pairs")
+    return value
+
+@bp.route('/config', methods=['PATCH'])
+def patch_pin_config():
+    """
+    Изменить набор соединений: {"add": [[left, right], ...], "remove": [...]}.
+
+    Пары обрабатываются как элементы множества, поэтому повтор запроса
+    ничего не меняет. В Verilog правятся только изменившиеся assign.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON body required"}), 400
+    try:
+        add = parse_pairs(data.get('add'), 'add')
+        remove = parse_pairs(data.get('remove'), 'remove')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if_match = next(iter(request.if_match), None) if request.if_match else None
+    try:
+        config, added, removed = config_store.patch_connections(
+            add, remove, if_match=if_match, validate=pin_validator.check)
+    except VersionConflict as e:
+        return jsonify({"error": "Configuration was modified", "version": e.current_version}), 412
+    except InvalidConnections as e:
+        return jsonify({"error": "Invalid pin connections", **e.report}), 422
+
+    response = {"version": config['version'], "added": added, "removed": removed}
+    if added or removed:
+        try:
+            changes = patch_verilog(config['connections'], added, removed)
+            response['verilog'] = {key: changes[key] for key in ('added', 'removed', 'full')}
+        except Exception as e:
+            print(f"Error updating Verilog: {e}")
+            response['verilog_error'] = str(e)
+    _, etag = config_store.load_with_etag()
+    result = jsonify(response)
+    result.set_etag(etag)
+    return result
+
 @bp.route('/config', methods=['GET'])
 def get_pin_config():
-    """Получить текущую конфигурацию пинов"""
+    """Получить текущую конфигурацию пинов (с ETag; If-None-Match даёт 304)"""
     print("Received GET request for config")
     try:
-        config = load_config()
+        config, etag = config_store.load_with_etag()
         print("Loaded config:", config)
-        return jsonify(config), 200
+        result = jsonify(config)
+        result.set_etag(etag)
+        return result.make_conditional(request)
     except Exception as e:
         print("Error loading configuration:", str(e))
         return jsonify({"error": str(e)}), 400
@@ -94,26 +152,187 @@ def get_verilog():
         print(f"Error generating Verilog: {e}")
         return jsonify({"error": str(e)}), 500
 
+def wants_wait():
+    """
+    Клиент просит дождаться завершения задачи в запросе (?wait=1 или
+    "wait": true в теле). По умолчанию маршруты прошивки сразу отвечают 202
+    с ID задачи: компиляция идёт минутами и не должна занимать поток
+    сервера, ход задачи - GET /api/jobs/<id> или /api/jobs/<id>/events
+    """
+    if request.args.get('wait', '').lower() in ('1', 'true', 'yes'):
+        return True
+    data = request.get_json(silent=True)
+    return isinstance(data, dict) and data.get('wait') is True
+
+def check_programmed(message):
+    """Проверка кода возврата прошивки, в том числе после ожидания платы"""
+    def check(code):
+        if code != 0:
+            raise RuntimeError(message)
+        return 0
+    return check
+
+def run_program_green(job, owner=None, priority=0):
+    """Задача очереди: компиляция и прошивка Green"""
+    return chain(lambda: program_green(job=job, owner=owner, priority=priority),
+                 check_programmed("Programming failed"))
+
+def run_program_de10(job, sof_path, owner=None, priority=0):
+    """Задача очереди: прошивка DE10-Lite"""
+    return chain(lambda: program_de10(sof_path=sof_path, job=job, owner=owner, priority=priority),
+                 check_programmed("Ошибка прошивки DE10"))
+
+def run_program_many(job, sof_path, cables, device, owner=None, priority=0):
+    """Задача очереди: прошивка одного .sof на несколько плат"""
+    return program_many(sof_path, cables=cables, device=device, job=job, owner=owner, priority=priority)
+
+def lease_params():
+    """
+    Владелец и приоритет заявки на плату из запроса; ValueError при неверном
+    приоритете, PermissionError при приоритете без X-Priority-Token
+    """
+    data = request.get_json(silent=True)
+    data = data if isinstance(data, dict) else {}
+    owner = request.headers.get('X-Client-Id') or data.get('owner') or request.remote_addr
+    priority = parse_priority(data.get('priority', request.args.get('priority')),
+                              token=request.headers.get('X-Priority-Token'))
+    return {'owner': owner, 'priority': priority}
+
+def accepted(job):
+    """Ответ 202 с ID поставленной в очередь задачи"""
+    return jsonify({'job_id': job.id, 'status': job.status, 'status_url': f'/api/jobs/{job.id}'}), 202
+
 @bp.route('/program', methods=['POST'])
 def program_fpga():
     """Скомпилировать проект и прошить FPGA"""
     try:
-        result = program_green()
-        if result == 0:
+        # Не ставим в очередь компиляцию, которая заведомо не пройдёт
+        report = pin_validator.validate(load_config().get('connections', []))
+        if not report['valid']:
+            return jsonify({"error": "Invalid pin connections", **report}), 422
+        try:
+            params = lease_params()
+        except PermissionError as e:
+            return jsonify({"error": str(e)}), 403
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        job = job_manager.submit('program_green', run_program_green, **params)
+        if not wants_wait():
+            return accepted(job)
+        job.wait()
+        if job.status == SUCCEEDED:
             return jsonify({
-                "message": "FPGA programmed successfully"
+                "message": "FPGA programmed successfully",
+                "job_id": job.id
             }), 200
         else:
             return jsonify({
-                "error": "Programming failed"
+                "error": job.error or "Programming failed",
+                "job_id": job.id
             }), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@bp.route('/validate', methods=['POST'])
+def validate_connections():
+    """Проверить соединения без сохранения; без тела проверяется сохранённая конфигурация"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and 'connections' in data:
+        connections = data['connections']
+    else:
+        connections = load_config().get('connections', [])
+    if not isinstance(connections, list):
+        return jsonify({"error": "Connections must be a list of [left_pin, right_pin] pairs"}), 400
+    return jsonify(pin_validator.validate(connections))
+
+@bp.route('/matrix', methods=['GET'])
+def get_connection_matrix():
+    """
+    Текущие соединения в виде битовой матрицы: строки - пины DE10-Lite,
+    столбцы - пины периферии (маски строк в hex). ?format=cells возвращает
+    словарь ячеек {"row-col": true}.
+    """
+    tables = pin_map.get()
+    matrix, unknown = ConnectionMatrix.from_pairs(load_config().get('connections', []), tables)
+    response = {
+        'sources': list(tables.de10_labels),
+        'targets': list(tables.perif_labels),
+        'multiple_drivers': [
+            {'target': tables.perif_labels[j], 'sources': [tables.de10_labels[i] for i in sources]}
+            for j, sources in matrix.multiple_drivers().items()
+        ],
+        'unknown': unknown,
+    }
+    if request.args.get('format') == 'cells':
+        response['cells'] = matrix.to_cells()
+    else:
+        response.update(matrix.to_dict())
+    return jsonify(response)
+
+@bp.route('/cache', methods=['GET'])
+def get_cache_stats():
+    """Статистика кэша скомпилированных прошивок"""
+    return jsonify(bitstream_cache.get_stats())
+
+@bp.route('/workspaces', methods=['GET'])
+def get_workspace_stats():
+    """Статистика рабочих директорий сборок"""
+    return jsonify(workspace_manager.get_stats())
+
+@bp.route('/build', methods=['GET'])
+def get_last_build():
+    """Последняя успешная сборка Green: режим компиляции и время этапов"""
+    state = load_build_state(DATA_FILES['green_dir'])
+    if state is None:
+        return jsonify({'error': 'No successful build recorded'}), 404
+    return jsonify(state)
+
+@bp.route('/jtag', methods=['GET'])
+def get_jtag_devices():
+    """Обнаруженные JTAG кабели и устройства; ?refresh=1 выполняет обнаружение заново"""
+    if request.args.get('refresh', '').lower() in ('1', 'true', 'yes'):
+        jtag_registry.refresh()
+    else:
+        jtag_registry.cables()
+    return jsonify(jtag_registry.to_dict())
+
 @bp.route('/names', methods=['GET'])
 def get_pin_names_route():
-    """Возвращает список имен пинов"""
-    return jsonify({'pin_names': get_pin_names()})
+    """
+    Возвращает оси пинов: left - Perifery, right - DE10-Lite.
+
+    Все пары - это декартово произведение осей, поэтому целиком они не
+    передаются. Страница пар возвращается в pin_names при указании
+    offset/limit. Ответ помечается ETag по версии таблиц пинов, повторный
+    запрос с If-None-Match получает 304.
+    """
+    try:
+        tables = pin_map.get()
+    except Exception as e:
+        print(f"Error reading pin names: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    total = len(tables.perif_labels) * len(tables.de10_labels)
+    response = {
+        'left': list(tables.perif_labels),
+        'right': list(tables.de10_labels),
+        'pair_count': total,
+    }
+    offset = request.args.get('offset', type=int)
+    limit = request.args.get('limit', type=int)
+    if offset is not None or limit is not None:
+        offset = max(offset or 0, 0)
+        limit = min(max(limit if limit is not None else MAX_PIN_NAMES_PAGE, 0), MAX_PIN_NAMES_PAGE)
+        response['pin_names'] = list(iter_pin_names(tables, offset, limit))
+        response['offset'] = offset
+        response['limit'] = limit
+        next_offset = offset + limit
+        response['next_offset'] = next_offset if next_offset < total else None
+
+    etag = "{}-{}-{}-{}".format(tables.version[0], tables.version[1], offset, limit)
+    result = jsonify(response)
+    result.set_etag(etag)
+    return result.make_conditional(request)
 
 @bp.route('/upload_sof', methods=['POST'])
 def upload_sof():
@@ -148,23 +367,30 @@ def program_de10_route():
     sof_path = data.get('sof_path')
     if not sof_path or not os.path.isfile(sof_path):
         return jsonify({'error': 'sof_path not provided or file does not exist'}), 400
-    result = program_de10(sof_path=sof_path)
-    if result == 0:
-        return jsonify({'message': 'DE10 успешно прошита'}), 200
+    try:
+        params = lease_params()
+    except PermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    job = job_manager.submit('program_de10', run_program_de10, sof_path=sof_path, **params)
+    if not wants_wait():
+        return accepted(job)
+    job.wait()
+    if job.status == SUCCEEDED:
+        return jsonify({'message': 'DE10 успешно прошита', 'job_id': job.id}), 200
     else:
-        return jsonify({'error': 'Ошибка прошивки DE10'}), 400
+        return jsonify({'error': 'Ошибка прошивки DE10', 'job_id': job.id}), 400
 
 @bp.route('/api/pins/config', methods=['GET'])
 def get_pins_config():
     try:
-        # Читаем CSV файлы
-        de10_df = pd.read_csv(DATA_FILES['de10lite'])
-        perif_df = pd.read_csv(DATA_FILES['perif'])
+        tables = pin_map.get()
 
         # Формируем ответ
         response = {
-            'de10_pins': de10_df['DE10-Lite'].tolist(),
-            'perif_pins': perif_df['Perifery'].tolist()
+            'de10_pins': list(tables.de10_labels),
+            'perif_pins': list(tables.perif_labels)
         }
         return jsonify(response)
     except Exception as e:
@@ -181,4 +407,36 @@ def save_pins_config():
         
         return jsonify({'message': 'Configuration saved successfully', 'verilog': verilog_code})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/program_many', methods=['POST'])
+def program_many_route():
+    """
+    Прошить один .sof на несколько плат параллельно.
+
+    Тело: {"sof_path": "...", "cables": ["USB-Blaster [1-1.1]", ...] или "all",
+    "device": "10M50DAF484C7G" (необязательно, фильтр для "all")}. Кабели
+    плат из BOARDS прошиваются только после выдачи платы планировщиком.
+    """
+    data = request.get_json(silent=True) or {}
+    sof_path = data.get('sof_path')
+    if not sof_path or not os.path.isfile(sof_path):
+        return jsonify({'error': 'sof_path not provided or file does not exist'}), 400
+    cables = data.get('cables', 'all')
+    if cables != 'all' and (not isinstance(cables, list) or not all(isinstance(c, str) for c in cables)):
+        return jsonify({'error': 'cables must be a list of cable names or "all"'}), 400
+    try:
+        params = lease_params()
+    except PermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    job = job_manager.submit('program_many', run_program_many,
+                             sof_path=sof_path, cables=cables, device=data.get('device'), **params)
+    if not wants_wait():
+        return accepted(job)
+    job.wait()
+    if job.status != SUCCEEDED:
+        return jsonify({'error': job.error or 'Programming failed', 'job_id': job.id}), 400
+    status = 200 if job.result['failed'] == 0 else 400
+    return jsonify(dict(job.result, job_id=job.id)), status
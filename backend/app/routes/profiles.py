@@ -0,0 +1,106 @@
+from flask import Blueprint, jsonify, request
+from app.services.profile_store import profile_store, ProfileConflict
+from app.services.pin_config import save_config, CONFIG_BOARD
+from app.services.pin_validator import pin_validator
+
+bp = Blueprint('profiles', __name__, url_prefix='/api/profiles')
+
+def validation_report(connections):
+    """Отчёт pin_validator для списка соединений; None, если это не список"""
+    return pin_validator.validate(connections) if isinstance(connections, list) else None
+
+@bp.route('', methods=['GET'])
+def list_profiles():
+    """Список профилей; ?board= и ?owner= фильтруют"""
+    return jsonify({'profiles': profile_store.list_profiles(request.args.get('board'), request.args.get('owner'))})
+
+@bp.route('/<board>/<name>', methods=['GET'])
+def get_profile(board, name):
+    """Профиль; ?version=N возвращает версию из истории"""
+    profile = profile_store.get(board, name, version=request.args.get('version', type=int))
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify(profile)
+
+@bp.route('/<board>/<name>', methods=['PUT'])
+def save_profile(board, name):
+    """
+    Сохранить профиль: {"connections": [...], "owner": "...", "version": N}.
+    Если передан version, а профиль с тех пор изменился, возвращается 409.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON body required'}), 400
+    connections = data.get('connections', [])
+    report = validation_report(connections)
+    if report is not None and not report['valid']:
+        return jsonify({"error": "Invalid pin connections", **report}), 422
+    try:
+        profile = profile_store.save(board, name, connections, owner=data.get('owner'),
+                                     expected_version=data.get('version'))
+    except ProfileConflict as e:
+        return jsonify({'error': 'Profile was modified', 'version': e.current_version}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(profile)
+
+@bp.route('/<board>/<name>', methods=['DELETE'])
+def delete_profile(board, name):
+    if not profile_store.delete(board, name):
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify({'message': 'Profile deleted'})
+
+@bp.route('/<board>/<name>/history', methods=['GET'])
+def profile_history(board, name):
+    history = profile_store.history(board, name, limit=min(max(request.args.get('limit', 50, type=int), 1), 500))
+    if history is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify({'board': board, 'name': name, 'history': history})
+
+@bp.route('/<board>/<name>/activate', methods=['POST'])
+def activate_profile(board, name):
+    """
+    Сделать профиль (или ?version=N) текущей конфигурацией для компиляции.
+    Текущая конфигурация - это GreenP.v, поэтому активировать можно только
+    профили платы CONFIG_BOARD; соединения проверяются, как при сохранении
+    (версия из истории могла быть сохранена до изменения таблиц пинов)
+    """
+    if board != CONFIG_BOARD:
+        return jsonify({'error': f"Only '{CONFIG_BOARD}' profiles can be activated"}), 400
+    profile = profile_store.get(board, name, version=request.args.get('version', type=int))
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    report = validation_report(profile['connections'])
+    if report is not None and not report['valid']:
+        return jsonify({"error": "Invalid pin connections", **report}), 422
+    saved = save_config({'connections': profile['connections'],
+                         'profile': {'board': board, 'name': name, 'version': profile['version']}})
+    return jsonify({'message': 'Profile activated', 'config_version': saved['version']})
+
+@bp.route('/export', methods=['GET'])
+def export_profiles():
+    """Выгрузить все профили (или профили одной платы ?board=)"""
+    return jsonify({'profiles': profile_store.export_profiles(request.args.get('board'))})
+
+@bp.route('/import', methods=['POST'])
+def import_profiles():
+    """
+    Загрузить профили: {"profiles": [...], "replace": false}. Если соединения
+    хотя бы одного профиля не проходят проверку, ничего не загружается и
+    возвращается 422 с отчётами по каждому такому профилю
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('profiles'), list):
+        return jsonify({'error': "Body must contain a 'profiles' list"}), 400
+    invalid = []
+    for i, item in enumerate(data['profiles']):
+        report = validation_report(item.get('connections', [])) if isinstance(item, dict) else None
+        if report is not None and not report['valid']:
+            invalid.append({'index': i, 'board': item.get('board'), 'name': item.get('name'), **report})
+    if invalid:
+        return jsonify({"error": "Invalid pin connections", 'profiles': invalid}), 422
+    try:
+        result = profile_store.import_profiles(data['profiles'], replace=bool(data.get('replace')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
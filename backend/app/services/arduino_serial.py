@@ -1,23 +1,60 @@
-import serial
-import threading
+from app.config.serial_config import ARDUINO
+from app.services import button_protocol
+from app.services.serial_pool import serial_pool
 
 class ArduinoSerialService:
-    def __init__(self, port='/dev/tty.usbmodem1101', baudrate=9600):
-        self.port = port
-        self.baudrate = baudrate
-        self.lock = threading.Lock()
+    def __init__(self, device='arduino', pool=serial_pool, protocol='text'):
+        # Порт и скорость задаются в app/config/serial_config.py
+        if protocol not in ('text', 'binary'):
+            raise ValueError(f"Неизвестный протокол: {protocol}")
+        self.device = device
+        self.pool = pool
+        self.protocol = protocol
 
-    def send_button_state(self, button_id, pressed):
+    @property
+    def connection(self):
+        return self.pool.get(self.device)
+
+    def encode_button_state(self, button_id, pressed):
+        """Кадр команды для одной кнопки"""
+        return self.encode_batch([(button_id, pressed)])
+
+    def validate_button(self, button_id):
+        """
+        Проверяет, что идентификатор кнопки можно закодировать; ValueError,
+        если нет. Вызывается до постановки события в очередь, чтобы ошибка
+        дошла до клиента, а не сорвала отправку пакета с чужими событиями.
+        """
+        if self.protocol == 'binary':
+            button_protocol.button_index(button_id)
+        elif any(ch in str(button_id) for ch in ':\n'):
+            raise ValueError(f"Недопустимый идентификатор кнопки: {button_id!r}")
+
+    def encode_batch(self, events):
+        """
+        Кодирует пакет событий (button_id, pressed) в байты для одной записи.
+
+        В текстовом режиме - строка на событие, в двоичном - кадры с битовой
+        картой, по одному на группу из 16 кнопок.
+        """
+        if self.protocol == 'binary':
+            return button_protocol.encode_states(
+                (button_protocol.button_index(button_id), pressed) for button_id, pressed in events)
+        return "".join(f"{button_id}:{int(pressed)}\n" for button_id, pressed in events).encode()
+
+    def send_frames(self, data):
+        """Отправляет один или несколько готовых кадров одной записью"""
         try:
-            n = ''.join(filter(str.isdigit, button_id))
-            state_str = 'включена' if pressed else 'выключена'
-            print(f'кнопка номер {n} {state_str}')
-            with self.lock:
-                with serial.Serial(self.port, self.baudrate, timeout=1) as ser:
-                    cmd = f"{button_id}:{int(pressed)}\n"
-                    ser.write(cmd.encode())
+            self.connection.write(data)
         except Exception as e:
             raise RuntimeError(f"Serial send error: {e}")
 
-# Глобальный экземпляр (порт можно будет переопределить при необходимости)
-arduino_serial = ArduinoSerialService() 
\ No newline at end of file
+    def send_button_state(self, button_id, pressed):
+        # Соединение остаётся открытым между нажатиями
+        self.send_frames(self.encode_button_state(button_id, pressed))
+
+    def health(self):
+        return self.connection.health()
+
+# Глобальный экземпляр, устройство и протокол задаются в serial_config.ARDUINO
+arduino_serial = ArduinoSerialService(ARDUINO['device'], protocol=ARDUINO['protocol'])
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from app.config.quartus_config import DATA_FILES, BITSTREAM_CACHE
+
+# Отчёты Quartus, которые сохраняются вместе с .sof
+REPORT_SUFFIXES = ('.rpt', '.summary', '.pin', '.smsg')
+
+def normalize_connections(connections):
+    """Приводит набор соединений к каноническому виду: уникальные пары, отсортированные"""
+    return sorted({(str(left), str(right)) for left, right in connections})
+
+def compute_key(connections, template_text, qsf_text=""):
+    """
+    Вычисляет ключ кэша по нормализованному набору соединений,
+    содержимому Verilog шаблона и .qsf файла.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(normalize_connections(connections)).encode("utf-8"))
+    for part in (template_text, qsf_text):
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        h.update(b"\0")
+        h.update(hashlib.sha256(data).digest())
+    return h.hexdigest()
+
+def compute_project_key(connections, project_dir, project_name):
+    """Ключ кэша для проекта Quartus: шаблон .v и .qsf читаются из директории проекта"""
+    project_dir = Path(project_dir)
+    template = project_dir / f"{project_name}.v"
+    qsf = project_dir / f"{project_name}.qsf"
+    template_bytes = template.read_bytes() if template.exists() else b""
+    qsf_bytes = qsf.read_bytes() if qsf.exists() else b""
+    return compute_key(connections, template_bytes, qsf_bytes)
+
+class BitstreamCache:
+    """
+    Content-addressed кэш скомпилированных прошивок.
+
+    Каждая запись - директория <cache_dir>/<key> с .sof, отчётами и meta.json.
+    Время последнего использования хранится в mtime meta.json, по нему
+    вытесняются самые старые записи при превышении лимитов.
+    """
+
+    def __init__(self, cache_dir, max_entries=32, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key
+
+    def lookup(self, key):
+        """Возвращает путь к закэшированному .sof или None при промахе"""
+        with self.lock:
+            entry = self._entry_dir(key)
+            meta_path = entry / "meta.json"
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                sof_path = entry / meta['sof']
+            except (OSError, ValueError, KeyError):
+                self.stats['misses'] += 1
+                return None
+            if not sof_path.exists():
+                self.stats['misses'] += 1
+                return None
+            # Отмечаем использование для LRU
+            os.utime(meta_path, None)
+            self.stats['hits'] += 1
+            return sof_path
+
+    def store(self, key, sof_path, report_dir=None):
+        """
+        Сохраняет .sof и отчёты из report_dir в кэш.
+
+        Запись сначала собирается во временной директории и затем
+        переименовывается, так что читатели не видят неполных записей.
+        """
+        sof_path = Path(sof_path)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-"))
+        try:
+            shutil.copy2(sof_path, tmp_dir / sof_path.name)
+            reports = []
+            if report_dir is not None and Path(report_dir).is_dir():
+                for report in Path(report_dir).iterdir():
+                    if report.is_file() and report.name.endswith(REPORT_SUFFIXES):
+                        shutil.copy2(report, tmp_dir / report.name)
+                        reports.append(report.name)
+            meta = {'sof': sof_path.name, 'reports': reports, 'created': time.time()}
+            (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=4), encoding="utf-8")
+
+            with self.lock:
+                entry = self._entry_dir(key)
+                if entry.exists():
+                    shutil.rmtree(entry)
+                os.replace(tmp_dir, entry)
+                self.stats['stores'] += 1
+                self._evict()
+            return entry / sof_path.name
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def report_path(self, key, report_name):
+        """Путь к сохранённому отчёту записи или None"""
+        path = self._entry_dir(key) / report_name
+        return path if path.is_file() else None
+
+    def _entries(self):
+        """Список записей (key, last_used, size), от самых старых к новым"""
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        for entry in self.cache_dir.iterdir():
+            meta_path = entry / "meta.json"
+            if entry.name.startswith(".") or not meta_path.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+            entries.append((entry.name, meta_path.stat().st_mtime, size))
+        entries.sort(key=lambda e: e[1])
+        return entries
+
+    def _evict(self):
+        """Вытесняет самые давно использованные записи сверх лимитов (вызывается под lock)"""
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            key, _, size = entries.pop(0)
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            self.stats['evictions'] += 1
+
+    def get_stats(self):
+        """Счётчики попаданий/промахов и текущий размер кэша"""
+        with self.lock:
+            entries = self._entries()
+            stats = dict(self.stats)
+        stats['entries'] = len(entries)
+        stats['bytes'] = sum(size for _, _, size in entries)
+        return stats
+
+# Глобальный экземпляр кэша
+bitstream_cache = BitstreamCache(
+    DATA_FILES['bitstream_cache_dir'],
+    max_entries=BITSTREAM_CACHE['max_entries'],
+    max_bytes=BITSTREAM_CACHE['max_bytes'],
+)
@@ -0,0 +1,363 @@
+import hmac
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from app.config.quartus_config import BOARDS, BOARD_LEASES
+
+# Состояния аренды платы
+WAITING = 'waiting'
+ACTIVE = 'active'
+RELEASED = 'released'
+EXPIRED = 'expired'
+CANCELLED = 'cancelled'
+
+class LeaseExpired(RuntimeError):
+    """Аренда уже истекла или освобождена"""
+
+def parse_priority(value, token=None, max_priority=None, priority_token=None):
+    """
+    Приоритет заявки из запроса: целое 0..max_priority.
+
+    Приоритет выше 0 требует token, совпадающий с BOARD_LEASES['priority_token'],
+    иначе любой клиент мог бы обойти очередь.
+
+    Raises:
+        ValueError: приоритет не целое число или вне диапазона
+        PermissionError: приоритет выше 0 без верного токена
+    """
+    if max_priority is None:
+        max_priority = BOARD_LEASES['max_priority']
+    if priority_token is None:
+        priority_token = BOARD_LEASES['priority_token']
+    if value is None or value == '':
+        return 0
+    if isinstance(value, bool):
+        raise ValueError("Priority must be an integer")
+    priority = int(value)
+    if not 0 <= priority <= max_priority:
+        raise ValueError(f"Priority must be between 0 and {max_priority}")
+    if priority and not (priority_token and token and hmac.compare_digest(str(token), str(priority_token))):
+        raise PermissionError("Priority above 0 requires a valid X-Priority-Token")
+    return priority
+
+class Lease:
+    """Заявка на плату: в очереди (waiting) или выданная (active)"""
+
+    _seq = itertools.count()
+
+    def __init__(self, board, owner, priority=0, job_id=None, ttl=None, on_grant=None):
+        self.id = uuid.uuid4().hex
+        self.seq = next(self._seq)
+        self.board = board
+        self.owner = owner
+        self.priority = priority
+        self.job_id = job_id
+        self.ttl = ttl
+        self.on_grant = on_grant
+        self.state = WAITING
+        self.requested_at = time.time()
+        self.granted_at = None
+        self.expires_at = None
+        self.released_at = None
+
+class BoardScheduler:
+    """
+    Очередь к физическим платам.
+
+    Каждая плата одновременно выдаётся одной заявке. Ожидающие заявки
+    упорядочиваются по приоритету, затем по тому, сколько раз владелец уже
+    получал эту плату за последние fair_share_window секунд (чтобы один
+    клиент не занимал плату подряд, пока другие ждут), затем по времени
+    подачи. Выданная плата освобождается вызовом release или по истечении
+    lease_timeout без продления.
+
+    Длительности использования плат записываются и дают оценку ожидания
+    для каждого места в очереди.
+
+    Заявка с on_grant не требует ожидающего потока: при выдаче платы
+    вызывается on_grant(lease), а истёкшие аренды освобождает фоновый
+    поток раз в reap_interval секунд.
+    """
+
+    def __init__(self, boards, lease_timeout=300, fair_share_window=600,
+                 history=20, default_duration=30, max_finished=100, max_ttl=None,
+                 reap_interval=1.0):
+        self.lease_timeout = lease_timeout
+        self.max_ttl = max_ttl or lease_timeout
+        self.fair_share_window = fair_share_window
+        self.default_duration = default_duration
+        self.max_finished = max_finished
+        self.reap_interval = reap_interval
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.granted = []
+        self.reaper = None
+        self.leases = {}
+        self.queues = {board: [] for board in boards}
+        self.active = {board: None for board in boards}
+        self.grants = {board: deque() for board in boards}
+        self.durations = {board: deque(maxlen=history) for board in boards}
+        self.stats = {'granted': 0, 'released': 0, 'expired': 0, 'cancelled': 0}
+
+    @contextmanager
+    def _locked(self):
+        """
+        Блокировка планировщика; on_grant выданных под ней заявок
+        вызываются после её освобождения
+        """
+        try:
+            with self.lock:
+                yield
+        finally:
+            with self.lock:
+                granted, self.granted = self.granted, []
+            for lease in granted:
+                try:
+                    lease.on_grant(lease)
+                except Exception as e:
+                    print(f"Ошибка уведомления о выдаче платы {lease.board}: {e}")
+
+    def _start_reaper(self):
+        with self.lock:
+            if self.reaper is not None:
+                return
+            self.reaper = threading.Thread(target=self._reap, name="board-reaper", daemon=True)
+        self.reaper.start()
+
+    def _reap(self):
+        """Освобождает истёкшие аренды, когда ожидающих потоков нет"""
+        while True:
+            time.sleep(self.reap_interval)
+            with self._locked():
+                now = time.time()
+                for board in self.queues:
+                    self._dispatch(board, now)
+
+    def _ttl(self, ttl):
+        """Срок аренды: запрошенный, но не больше max_ttl"""
+        return min(ttl or self.lease_timeout, self.max_ttl)
+
+    def _check_board(self, board):
+        if board not in self.queues:
+            raise KeyError(f"Unknown board: {board}")
+
+    def _recent_grants(self, board, owner, now):
+        grants = self.grants[board]
+        while grants and grants[0][0] < now - self.fair_share_window:
+            grants.popleft()
+        return sum(1 for _, grant_owner in grants if grant_owner == owner)
+
+    def _ordered(self, board, now):
+        """Ожидающие заявки платы в порядке выдачи"""
+        return sorted(self.queues[board], key=lambda lease: (
+            -lease.priority, self._recent_grants(board, lease.owner, now), lease.seq))
+
+    def _finish(self, lease, state, now):
+        lease.state = state
+        lease.released_at = now
+        self.stats[state] += 1
+        if self.active.get(lease.board) is lease:
+            self.active[lease.board] = None
+            if state == RELEASED:
+                self.durations[lease.board].append(now - lease.granted_at)
+
+    def _dispatch(self, board, now):
+        """Освобождает истёкшую аренду и выдаёт свободную плату следующей заявке"""
+        current = self.active[board]
+        if current is not None and current.expires_at <= now:
+            print(f"Аренда платы {board} клиентом {current.owner} истекла")
+            self._finish(current, EXPIRED, now)
+            current = None
+        if current is None and self.queues[board]:
+            lease = self._ordered(board, now)[0]
+            self.queues[board].remove(lease)
+            lease.state = ACTIVE
+            lease.granted_at = now
+            lease.expires_at = now + self._ttl(lease.ttl)
+            self.active[board] = lease
+            self.grants[board].append((now, lease.owner))
+            self.stats['granted'] += 1
+            if lease.on_grant is not None:
+                self.granted.append(lease)
+            self.changed.notify_all()
+
+    def request(self, board, owner, priority=0, job_id=None, ttl=None, on_grant=None):
+        """
+        Ставит заявку в очередь платы, не дожидаясь выдачи. on_grant(lease)
+        вызывается, когда плата выдана (в том числе сразу, внутри request)
+        """
+        self._check_board(board)
+        lease = Lease(board, owner, priority, job_id, ttl, on_grant)
+        if on_grant is not None:
+            self._start_reaper()
+        with self._locked():
+            self.leases[lease.id] = lease
+            self.queues[board].append(lease)
+            self._dispatch(board, time.time())
+        return lease
+
+    def acquire(self, board, owner, priority=0, job=None, timeout=None, on_wait=None):
+        """
+        Ждёт выдачи платы. Ожидание прерывается отменой задачи job
+        (JobCancelled) или по timeout (TimeoutError); заявка при этом
+        снимается с очереди. Если плата занята, on_wait вызывается с
+        состоянием заявки (место в очереди, оценка ожидания).
+        """
+        lease = self.request(board, owner, priority, job_id=job.id if job is not None else None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            if on_wait is not None and lease.state == WAITING:
+                on_wait(self.get_lease(lease.id))
+            while True:
+                with self._locked():
+                    self._dispatch(board, time.time())
+                    if lease.state == ACTIVE:
+                        return lease
+                    self.changed.wait(0.5)
+                if job is not None:
+                    job.check_cancelled()
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Плата {board} не освободилась за {timeout} с")
+        except BaseException:
+            self.release(lease.id, state=CANCELLED)
+            raise
+
+    def renew(self, lease_id, ttl=None):
+        """Продлевает выданную аренду"""
+        with self._locked():
+            lease = self.leases.get(lease_id)
+            now = time.time()
+            if lease is not None:
+                self._dispatch(lease.board, now)
+            if lease is None or lease.state != ACTIVE:
+                raise LeaseExpired(f"Lease {lease_id} is not active")
+            lease.expires_at = now + self._ttl(ttl or lease.ttl)
+            return lease
+
+    def release(self, lease_id, state=RELEASED):
+        """
+        Возвращает плату; для заявки из очереди - снимает её. Длительность
+        использования записывается только при state=RELEASED.
+        """
+        with self._locked():
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return None
+            now = time.time()
+            if lease.state == ACTIVE:
+                self._finish(lease, state, now)
+            elif lease.state == WAITING:
+                self.queues[lease.board].remove(lease)
+                self._finish(lease, CANCELLED, now)
+            self._dispatch(lease.board, now)
+            self._trim()
+            return lease
+
+    def _trim(self):
+        # Завершённые заявки хранятся только для ответа на запросы статуса
+        finished = [lease_id for lease_id, lease in self.leases.items()
+                    if lease.state not in (WAITING, ACTIVE)]
+        for lease_id in finished[:-self.max_finished]:
+            del self.leases[lease_id]
+
+    @contextmanager
+    def lease(self, board, owner, priority=0, job=None, on_wait=None):
+        """Плата на время блока"""
+        lease = self.acquire(board, owner, priority, job=job, on_wait=on_wait)
+        try:
+            yield lease
+        finally:
+            self.release(lease.id)
+
+    def estimated_duration(self, board):
+        """Средняя длительность использования платы по записанным, секунды"""
+        durations = self.durations[board]
+        return sum(durations) / len(durations) if durations else self.default_duration
+
+    def _lease_info(self, lease, position=None, wait=None):
+        info = {
+            'id': lease.id,
+            'board': lease.board,
+            'owner': lease.owner,
+            'priority': lease.priority,
+            'job_id': lease.job_id,
+            'state': lease.state,
+            'requested_at': lease.requested_at,
+            'granted_at': lease.granted_at,
+            'expires_at': lease.expires_at,
+            'released_at': lease.released_at,
+        }
+        if lease.state == WAITING:
+            info['position'] = position
+            info['estimated_wait'] = round(wait, 1)
+        return info
+
+    def _queue_info(self, board, now):
+        """Выданная заявка и ожидающие с местом в очереди и оценкой ожидания"""
+        duration = self.estimated_duration(board)
+        current = self.active[board]
+        wait = 0.0
+        if current is not None:
+            wait = max(min(current.granted_at + duration, current.expires_at) - now, 0.0)
+        waiting = []
+        for position, lease in enumerate(self._ordered(board, now), start=1):
+            waiting.append(self._lease_info(lease, position, wait))
+            wait += duration
+        return {
+            'board': board,
+            'active': self._lease_info(current) if current is not None else None,
+            'waiting': waiting,
+            'estimated_duration': round(duration, 1),
+            'recorded_durations': len(self.durations[board]),
+        }
+
+    def get_queue(self, board):
+        self._check_board(board)
+        with self._locked():
+            now = time.time()
+            self._dispatch(board, now)
+            return self._queue_info(board, now)
+
+    def get_lease(self, lease_id):
+        """Состояние заявки с местом в очереди, None если неизвестна"""
+        with self._locked():
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return None
+            now = time.time()
+            self._dispatch(lease.board, now)
+            if lease.state != WAITING:
+                return self._lease_info(lease)
+            queue = self._queue_info(lease.board, now)
+        return next(info for info in queue['waiting'] if info['id'] == lease_id)
+
+    def find_by_job(self, job_id):
+        """Последняя заявка задачи очереди задач или None"""
+        with self.lock:
+            found = [lease for lease in self.leases.values() if lease.job_id == job_id]
+        return self.get_lease(found[-1].id) if found else None
+
+    def get_stats(self):
+        with self._locked():
+            now = time.time()
+            for board in self.queues:
+                self._dispatch(board, now)
+            stats = dict(self.stats)
+            stats['boards'] = {
+                board: {
+                    'busy': self.active[board] is not None,
+                    'waiting': len(self.queues[board]),
+                    'estimated_duration': round(self.estimated_duration(board), 1),
+                }
+                for board in self.queues
+            }
+        return stats
+
+# Глобальный планировщик плат из настроек
+board_scheduler = BoardScheduler(
+    BOARDS, lease_timeout=BOARD_LEASES['lease_timeout'], max_ttl=BOARD_LEASES['max_ttl'],
+    fair_share_window=BOARD_LEASES['fair_share_window'],
+    history=BOARD_LEASES['history'], default_duration=BOARD_LEASES['default_duration'])
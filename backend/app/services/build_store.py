@@ -0,0 +1,162 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from app.config.quartus_config import DATA_FILES
+from app.services.quartus_reports import parse_report_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    build_id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    family TEXT,
+    device TEXT,
+    status TEXT,
+    summary TEXT,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS builds_project ON builds (project, ingested_at);
+CREATE TABLE IF NOT EXISTS resources (
+    build_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT,
+    used INTEGER,
+    available INTEGER,
+    percent REAL
+);
+CREATE INDEX IF NOT EXISTS resources_build ON resources (build_id);
+CREATE TABLE IF NOT EXISTS fmax (
+    build_id TEXT NOT NULL,
+    corner TEXT NOT NULL,
+    clock TEXT NOT NULL,
+    fmax_mhz REAL,
+    restricted_fmax_mhz REAL
+);
+CREATE INDEX IF NOT EXISTS fmax_build ON fmax (build_id, clock);
+CREATE TABLE IF NOT EXISTS slack (
+    build_id TEXT NOT NULL,
+    corner TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    clock TEXT NOT NULL,
+    slack REAL,
+    tns REAL
+);
+CREATE INDEX IF NOT EXISTS slack_build ON slack (build_id, clock);
+CREATE TABLE IF NOT EXISTS pins (
+    build_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    direction TEXT,
+    io_standard TEXT,
+    voltage TEXT,
+    bank TEXT,
+    user_assignment TEXT
+);
+CREATE INDEX IF NOT EXISTS pins_build_location ON pins (build_id, location);
+"""
+
+# Таблицы с разобранными отчётами и их столбцы (кроме build_id)
+REPORT_TABLES = {
+    'resources': ('name', 'value', 'used', 'available', 'percent'),
+    'fmax': ('corner', 'clock', 'fmax_mhz', 'restricted_fmax_mhz'),
+    'slack': ('corner', 'analysis', 'clock', 'slack', 'tns'),
+    'pins': ('name', 'location', 'direction', 'io_standard', 'voltage', 'bank', 'user_assignment'),
+}
+
+class BuildStore:
+    """
+    Хранилище разобранных отчётов Quartus в SQLite.
+
+    Отчёты каждой сборки разбираются один раз при сохранении, дальше
+    использование ресурсов, тайминги и таблица пинов читаются запросами
+    по индексу build_id (ключ сборки из кэша прошивок).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.local = threading.local()
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=10)
+            conn.row_factory = sqlite3.Row
+            with self.schema_lock:
+                if not self.schema_ready:
+                    conn.executescript(_SCHEMA)
+                    self.schema_ready = True
+            self.local.conn = conn
+        return conn
+
+    def has(self, build_id):
+        row = self._connect().execute(
+            "SELECT 1 FROM builds WHERE build_id = ?", (build_id,)).fetchone()
+        return row is not None
+
+    def ingest(self, build_id, project_name, report_dir):
+        """
+        Разбирает отчёты сборки из report_dir и сохраняет их под build_id
+        (повторное сохранение заменяет прежние данные).
+        """
+        reports = parse_report_dir(report_dir, project_name)
+        summary = reports['summary']
+        conn = self._connect()
+        with conn:
+            for table in REPORT_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE build_id = ?", (build_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO builds (build_id, project, family, device, status, summary, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (build_id, project_name, summary.get('Family'), summary.get('Device'),
+                 summary.get('Flow Status'), json.dumps(summary), time.time()))
+            for table, columns in REPORT_TABLES.items():
+                placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+                conn.executemany(
+                    f"INSERT INTO {table} (build_id, {', '.join(columns)}) VALUES ({placeholders})",
+                    [(build_id,) + tuple(row[c] for c in columns) for row in reports[table]])
+        return self.get_build(build_id)
+
+    def _build_dict(self, row):
+        build = dict(row)
+        build['summary'] = json.loads(build['summary'] or '{}')
+        return build
+
+    def get_build(self, build_id):
+        row = self._connect().execute(
+            "SELECT * FROM builds WHERE build_id = ?", (build_id,)).fetchone()
+        return None if row is None else self._build_dict(row)
+
+    def list_builds(self, project_name=None, limit=50):
+        """Последние сохранённые сборки, новые первыми"""
+        query = "SELECT build_id, project, family, device, status, ingested_at FROM builds"
+        params = []
+        if project_name:
+            query += " WHERE project = ?"
+            params.append(project_name)
+        query += " ORDER BY ingested_at DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._connect().execute(query, params)]
+
+    def get_reports(self, build_id, sections=None):
+        """
+        Отчёты сборки по разделам (resources, fmax, slack, pins) или None,
+        если сборка не сохранена.
+        """
+        build = self.get_build(build_id)
+        if build is None:
+            return None
+        conn = self._connect()
+        for table, columns in REPORT_TABLES.items():
+            if sections and table not in sections:
+                continue
+            build[table] = [dict(row) for row in conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE build_id = ? ORDER BY rowid",
+                (build_id,))]
+        return build
+
+# Глобальный экземпляр хранилища
+build_store = BuildStore(DATA_FILES['build_reports_db'])
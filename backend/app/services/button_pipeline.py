@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+from app.config.serial_config import BUTTON_PIPELINE
+from app.services.arduino_serial import arduino_serial
+
+class QueueFullError(Exception):
+    """Очередь событий кнопок переполнена"""
+
+class ButtonEventPipeline:
+    """
+    Неблокирующая отправка состояний кнопок на Arduino.
+
+    Запрос только кладёт событие в очередь и сразу получает порядковый номер.
+    Отдельный поток забирает накопившиеся события и отправляет их одной
+    записью в порт. Повторные переключения одной кнопки, ещё не ушедшие
+    в порт, объединяются: отправляется последнее состояние.
+
+    Пакет, который не удалось записать, возвращается в очередь (если кнопку
+    с тех пор не переключили снова) и отправляется повторно через
+    retry_delay секунд, поэтому пропадание порта не теряет состояния кнопок.
+    """
+
+    def __init__(self, service=arduino_serial, batch_window=0.005, max_pending=256, retry_delay=0.5):
+        self.service = service
+        self.batch_window = batch_window
+        self.max_pending = max_pending
+        self.retry_delay = retry_delay
+        self.cond = threading.Condition()
+        self.pending = OrderedDict()  # button_id -> (pressed, seq, enqueued_at)
+        self.seq = 0
+        self.thread = None
+        self.metrics = {
+            'submitted': 0,
+            'coalesced': 0,
+            'rejected': 0,
+            'batches': 0,
+            'frames_sent': 0,
+            'send_errors': 0,
+            'failed_events': 0,
+            'requeued': 0,
+            'last_error': None,
+            'last_error_at': None,
+            'last_sent_seq': 0,
+            'max_queue_depth': 0,
+            'latency_ms_last': None,
+            'latency_ms_max': 0.0,
+            'latency_ms_total': 0.0,
+        }
+
+    def _ensure_thread(self):
+        """Запускает поток отправки при первом событии (вызывается под cond)"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="button-writer", daemon=True)
+            self.thread.start()
+
+    def submit(self, button_id, pressed):
+        """
+        Ставит событие в очередь и возвращает его порядковый номер.
+        ValueError - идентификатор кнопки нельзя закодировать.
+        """
+        self.service.validate_button(button_id)
+        with self.cond:
+            if button_id not in self.pending and len(self.pending) >= self.max_pending:
+                self.metrics['rejected'] += 1
+                raise QueueFullError("Очередь событий кнопок переполнена")
+            self.seq += 1
+            seq = self.seq
+            enqueued_at = time.monotonic()
+            if button_id in self.pending:
+                # Объединяем с ещё не отправленным событием, время ожидания берём от первого
+                enqueued_at = self.pending[button_id][2]
+                self.metrics['coalesced'] += 1
+            self.pending[button_id] = (bool(pressed), seq, enqueued_at)
+            self.metrics['submitted'] += 1
+            self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], len(self.pending))
+            self._ensure_thread()
+            self.cond.notify()
+            return seq
+
+    def _take_batch(self):
+        """Ждёт событий, выдерживает окно пакета и забирает всё накопленное"""
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+        if self.batch_window:
+            time.sleep(self.batch_window)
+        with self.cond:
+            batch = list(self.pending.items())
+            self.pending.clear()
+        return batch
+
+    def _requeue(self, batch):
+        """
+        Возвращает неотправленный пакет в начало очереди. Кнопки, которые
+        переключили после взятия пакета, остаются с новым состоянием.
+        """
+        with self.cond:
+            newer = self.pending
+            self.pending = OrderedDict(
+                (button_id, event) for button_id, event in batch if button_id not in newer)
+            self.metrics['requeued'] += len(self.pending)
+            self.pending.update(newer)
+            self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], len(self.pending))
+
+    def _record_error(self, error, events):
+        with self.cond:
+            self.metrics['send_errors'] += 1
+            self.metrics['failed_events'] += events
+            self.metrics['last_error'] = str(error)
+            self.metrics['last_error_at'] = time.time()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                data = self.service.encode_batch(
+                    [(button_id, pressed) for button_id, (pressed, _, _) in batch])
+            except Exception as e:
+                # Повтор не поможет: кнопки проверяются в submit, сюда попадать не должны
+                self._record_error(e, len(batch))
+                print(f"Button pipeline: не удалось закодировать {len(batch)} событий: {e}")
+                continue
+            try:
+                self.service.send_frames(data)
+            except Exception as e:
+                self._record_error(e, len(batch))
+                print(f"Button pipeline: не удалось отправить {len(batch)} событий, "
+                      f"повтор через {self.retry_delay} с: {e}")
+                self._requeue(batch)
+                time.sleep(self.retry_delay)
+                continue
+            sent_at = time.monotonic()
+            with self.cond:
+                self.metrics['batches'] += 1
+                self.metrics['frames_sent'] += len(batch)
+                self.metrics['last_sent_seq'] = max(seq for _, (_, seq, _) in batch)
+                for _, (_, _, enqueued_at) in batch:
+                    latency = (sent_at - enqueued_at) * 1000
+                    self.metrics['latency_ms_total'] += latency
+                    self.metrics['latency_ms_max'] = max(self.metrics['latency_ms_max'], latency)
+                self.metrics['latency_ms_last'] = latency
+
+    def get_metrics(self):
+        with self.cond:
+            metrics = dict(self.metrics)
+            metrics['queue_depth'] = len(self.pending)
+        total = metrics.pop('latency_ms_total')
+        metrics['latency_ms_avg'] = total / metrics['frames_sent'] if metrics['frames_sent'] else None
+        return metrics
+
+# Глобальная очередь событий кнопок
+button_pipeline = ButtonEventPipeline(
+    batch_window=BUTTON_PIPELINE['batch_window'],
+    max_pending=BUTTON_PIPELINE['max_pending'],
+    retry_delay=BUTTON_PIPELINE['retry_delay'],
+)
@@ -0,0 +1,118 @@
+"""
+Компактный двоичный протокол команд кнопок для Arduino.
+
+Каждый кадр имеет фиксированный размер FRAME_SIZE байт:
+
+    0     SYNC (0xA5)
+    1     base - номер первой кнопки группы (кратен GROUP_SIZE)
+    2..3  mask - какие кнопки группы передаются (uint16, little-endian)
+    4..5  state - их состояния, 1 = нажата (uint16, little-endian)
+    6     CRC-8 (полином 0x07) байтов 1..5
+
+Один кадр несёт состояния до 16 кнопок, поэтому пакет событий для всей
+панели уходит одним-двумя кадрами вместо текстовой строки на каждую кнопку.
+"""
+
+import struct
+
+SYNC = 0xA5
+GROUP_SIZE = 16
+FRAME_SIZE = 7
+# base передаётся одним байтом: последняя группа начинается с 240
+MAX_BUTTON_INDEX = 255
+
+_BODY = struct.Struct('<BHH')
+
+def _crc8_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+_CRC8 = _crc8_table()
+
+def crc8(data):
+    """CRC-8 с полиномом 0x07 и нулевым начальным значением"""
+    crc = 0
+    for byte in data:
+        crc = _CRC8[crc ^ byte]
+    return crc
+
+def button_index(button_id):
+    """Номер кнопки из идентификатора вида 'but3' или 'SW3'"""
+    digits = ''.join(filter(str.isdigit, str(button_id)))
+    if not digits:
+        raise ValueError(f"В идентификаторе кнопки нет номера: {button_id}")
+    index = int(digits)
+    if index > MAX_BUTTON_INDEX:
+        raise ValueError(f"Номер кнопки {index} больше {MAX_BUTTON_INDEX}")
+    return index
+
+def encode_frame(base, mask, state):
+    """Кадр для группы кнопок, начинающейся с base"""
+    body = _BODY.pack(base, mask & 0xFFFF, state & mask & 0xFFFF)
+    return bytes((SYNC,)) + body + bytes((crc8(body),))
+
+def encode_states(states):
+    """
+    Кодирует набор состояний кнопок в минимальное число кадров.
+
+    Args:
+        states: пары (номер кнопки, нажата) - последнее значение для номера побеждает
+
+    Returns:
+        bytes: кадры по одному на каждую затронутую группу из GROUP_SIZE кнопок
+    """
+    groups = {}
+    for index, pressed in states:
+        base = index - index % GROUP_SIZE
+        bit = 1 << (index - base)
+        mask, state = groups.get(base, (0, 0))
+        mask |= bit
+        state = state | bit if pressed else state & ~bit
+        groups[base] = (mask, state)
+    return b"".join(encode_frame(base, mask, state) for base, (mask, state) in sorted(groups.items()))
+
+class FrameDecoder:
+    """
+    Потоковый декодер кадров: принимает байты любыми порциями и возвращает
+    пары (номер кнопки, нажата). Мусор и кадры с неверной CRC пропускаются
+    с поиском следующего SYNC.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.bad_frames = 0
+
+    def feed(self, data):
+        self.buffer.extend(data)
+        events = []
+        while True:
+            start = self.buffer.find(SYNC)
+            if start < 0:
+                self.buffer.clear()
+                break
+            if start:
+                del self.buffer[:start]
+            if len(self.buffer) < FRAME_SIZE:
+                break
+            frame = bytes(self.buffer[:FRAME_SIZE])
+            body = frame[1:6]
+            if crc8(body) != frame[6]:
+                # Не кадр - сдвигаемся на байт и ищем следующий SYNC
+                self.bad_frames += 1
+                del self.buffer[:1]
+                continue
+            del self.buffer[:FRAME_SIZE]
+            base, mask, state = _BODY.unpack(body)
+            for bit in range(GROUP_SIZE):
+                if mask & (1 << bit):
+                    events.append((base + bit, bool(state & (1 << bit))))
+        return events
+
+def decode_frames(data):
+    """Декодирует готовый буфер кадров в список пар (номер кнопки, нажата)"""
+    return FrameDecoder().feed(data)
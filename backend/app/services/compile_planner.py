@@ -0,0 +1,180 @@
+import hashlib
+import json
+import re
+import time
+from collections import namedtuple
+from pathlib import Path
+from app.services.bitstream_cache import bitstream_cache, compute_key, compute_project_key
+from app.services.verilog_generator import write_atomic
+from app.services.verilog_template import template_cache, VerilogParseError
+
+# Файл с описанием последней успешной сборки в директории проекта
+BUILD_STATE_FILE = '.build_state.json'
+
+# Режимы компиляции, от самого дешёвого к самому дорогому
+CACHED = 'cached'            # прошивка уже есть в кэше
+REUSE = 'reuse'              # output_files соответствуют текущим исходникам
+INCREMENTAL = 'incremental'  # изменились только assign - quartus_sh --flow recompile (Rapid Recompile),
+                             # только для семейств с его поддержкой
+FULL = 'full'                # изменились шаблон или .qsf, либо предыдущей сборки нет
+
+CompilePlan = namedtuple('CompilePlan', [
+    'mode',        # один из режимов выше
+    'reason',      # почему выбран режим
+    'stages',      # этапы Quartus для запуска: 'flow', 'recompile', 'map', 'fit', 'asm', 'sta'
+    'key',         # ключ кэша прошивки
+    'sof_path',    # готовый .sof для режимов cached/reuse
+    'state',       # описание текущих исходников для записи после успешной сборки
+])
+
+def _digest(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+def describe_sources(project_dir, project_name, verilog_text=None):
+    """
+    Хэши частей исходников проекта: шаблон без assign, набор assign и .qsf.
+    verilog_text заменяет содержимое <project>.v (ещё не записанный исходник).
+    """
+    project_dir = Path(project_dir)
+    verilog_path = project_dir / f"{project_name}.v"
+    qsf_path = project_dir / f"{project_name}.qsf"
+    text = verilog_text
+    if text is None:
+        text = verilog_path.read_text(encoding='utf-8') if verilog_path.exists() else ''
+    try:
+        parsed = template_cache.get(text)
+        template = parsed.head + "\n".join(parsed.body_lines) + parsed.tail
+        assigns = sorted(f"{target}={source}" for target, source in parsed.assigns)
+    except VerilogParseError:
+        template = text
+        assigns = []
+    return {
+        'template_hash': _digest(template),
+        'assigns_hash': _digest("\n".join(assigns)),
+        'qsf_hash': _digest(qsf_path.read_bytes()) if qsf_path.exists() else None,
+    }
+
+def flight_key(project_dir, project_name, connections):
+    """
+    Ключ для объединения одинаковых одновременных сборок: нормализованный
+    набор соединений, шаблон без assign и .qsf. В отличие от ключа кэша не
+    зависит от assign, уже записанных в общий .v - сборка генерирует их сама.
+    """
+    sources = describe_sources(project_dir, project_name)
+    return compute_key(connections, f"{Path(project_dir).resolve()}\0{sources['template_hash']}",
+                       sources['qsf_hash'] or "")
+
+def load_build_state(project_dir):
+    """Описание последней успешной сборки или None"""
+    path = Path(project_dir) / BUILD_STATE_FILE
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+def record_build(project_dir, plan, timings, recompile_supported=None):
+    """
+    Сохраняет описание успешной сборки с разбивкой времени по этапам.
+    recompile_supported - удалось ли выполнить Rapid Recompile; если None,
+    сохраняется значение из прошлой сборки.
+    """
+    if recompile_supported is None:
+        recompile_supported = (load_build_state(project_dir) or {}).get('recompile_supported')
+    state = dict(plan.state, key=plan.key, mode=plan.mode, timings=timings,
+                 recompile_supported=recompile_supported, finished_at=time.time())
+    write_atomic(Path(project_dir) / BUILD_STATE_FILE, json.dumps(state, indent=4))
+    return state
+
+# Семейство ПЛИС по началу номера детали, если в .qsf нет FAMILY
+FAMILY_PREFIXES = (
+    ('EP4CE', 'Cyclone IV E'),
+    ('EP4CGX', 'Cyclone IV GX'),
+    ('10M', 'MAX 10'),
+    ('10CL', 'Cyclone 10 LP'),
+    ('10CX', 'Cyclone 10 GX'),
+    ('10AX', 'Arria 10'),
+    ('5C', 'Cyclone V'),
+    ('5A', 'Arria V'),
+    ('5S', 'Stratix V'),
+)
+
+_FAMILY_RE = re.compile(r'^\s*set_global_assignment\s+-name\s+FAMILY\s+"?([^"\n]+?)"?\s*$', re.M)
+_DEVICE_RE = re.compile(r'^\s*set_global_assignment\s+-name\s+DEVICE\s+"?([^"\s]+)"?\s*$', re.M)
+
+def device_family(project_dir, project_name, device=None):
+    """
+    Семейство ПЛИС проекта: FAMILY из .qsf, иначе по номеру детали (DEVICE
+    из .qsf или device). None, если определить не удалось.
+    """
+    qsf_path = Path(project_dir) / f"{project_name}.qsf"
+    text = qsf_path.read_text(encoding='utf-8', errors='replace') if qsf_path.exists() else ''
+    m = _FAMILY_RE.search(text)
+    if m:
+        return m.group(1).strip()
+    m = _DEVICE_RE.search(text)
+    part = (m.group(1) if m else device or '').upper()
+    for prefix, family in FAMILY_PREFIXES:
+        if part.startswith(prefix):
+            return family
+    return None
+
+def _compile_stages(skip_sta):
+    stages = ['map', 'fit', 'asm']
+    if not skip_sta:
+        stages.append('sta')
+    return stages
+
+def plan_compile(project_dir, project_name, connections, skip_sta=False, incremental=True,
+                 verilog_text=None, device=None, recompile_families=()):
+    """
+    Выбирает самый дешёвый корректный способ получить .sof.
+
+    Сравнивает текущие исходники с последней успешной сборкой:
+    совпадение ключа - готовая прошивка из кэша или из output_files;
+    изменились только assign - Rapid Recompile (quartus_sh --flow recompile),
+    который переиспользует результаты прошлой компиляции из db/ и
+    incremental_db/ и заново размещает только изменённую логику, если
+    семейство ПЛИС (device_family с device из BOARDS) входит в
+    recompile_families; иначе - полная компиляция. skip_sta убирает анализ таймингов из полной
+    компиляции (Rapid Recompile всегда выполняет его сам).
+
+    verilog_text - исходник, который будет скомпилирован, если он ещё не
+    записан в <project>.v (ключ и сравнение считаются по нему).
+    """
+    project_dir = Path(project_dir)
+    if verilog_text is None:
+        key = compute_project_key(connections, project_dir, project_name)
+    else:
+        qsf_path = project_dir / f"{project_name}.qsf"
+        key = compute_key(connections, verilog_text, qsf_path.read_bytes() if qsf_path.exists() else b"")
+    state = describe_sources(project_dir, project_name, verilog_text)
+
+    cached_sof = bitstream_cache.lookup(key)
+    if cached_sof is not None:
+        return CompilePlan(CACHED, 'bitstream cache hit', [], key, cached_sof, state)
+
+    previous = load_build_state(project_dir)
+    output_sof = project_dir / "output_files" / f"{project_name}.sof"
+    if previous is not None and previous.get('key') == key and output_sof.exists():
+        return CompilePlan(REUSE, 'sources unchanged since last build', [], key, output_sof, state)
+
+    family = device_family(project_dir, project_name, device)
+    if previous is None or not (project_dir / "db").is_dir():
+        reason = 'no previous build'
+    elif previous.get('qsf_hash') != state['qsf_hash']:
+        reason = 'qsf changed'
+    elif previous.get('template_hash') != state['template_hash']:
+        reason = 'template changed'
+    elif not incremental:
+        reason = 'incremental compilation disabled'
+    elif previous.get('recompile_supported') is False:
+        reason = 'rapid recompile not supported for this project'
+    elif family not in recompile_families:
+        reason = f"rapid recompile not supported for {family or 'unknown device family'}"
+    else:
+        return CompilePlan(INCREMENTAL, 'only assign statements changed',
+                           ['recompile'], key, None, state)
+    stages = _compile_stages(True) if skip_sta else ['flow']
+    return CompilePlan(FULL, reason, stages, key, None, state)
@@ -0,0 +1,171 @@
+"""
+Матрица соединений: источники (пины DE10-Lite) x приёмники (пины периферии).
+
+Каждая строка и каждый столбец хранятся целым числом Python как битовая
+маска, поэтому вопросы "куда подключён источник", "кто управляет выходом"
+и поиск выходов с несколькими источниками сводятся к операциям над целыми
+числами, а не к перебору списка пар.
+"""
+
+def _bits(mask):
+    """Номера установленных битов маски по возрастанию"""
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(low.bit_length() - 1)
+        mask ^= low
+    return result
+
+class ConnectionMatrix:
+    """
+    Битовая матрица соединений размера n_sources x n_targets.
+
+    rows[i] - маска приёмников источника i, cols[j] - маска источников
+    приёмника j; обе поддерживаются одновременно.
+    """
+
+    def __init__(self, n_sources, n_targets):
+        self.shape = (n_sources, n_targets)
+        self.rows = [0] * n_sources
+        self.cols = [0] * n_targets
+
+    def _check(self, i, j):
+        if not (0 <= i < self.shape[0] and 0 <= j < self.shape[1]):
+            raise IndexError(f"Ячейка ({i}, {j}) вне матрицы {self.shape[0]}x{self.shape[1]}")
+
+    def get(self, i, j):
+        self._check(i, j)
+        return bool(self.rows[i] >> j & 1)
+
+    def set(self, i, j):
+        self._check(i, j)
+        self.rows[i] |= 1 << j
+        self.cols[j] |= 1 << i
+
+    def clear(self, i, j):
+        self._check(i, j)
+        self.rows[i] &= ~(1 << j)
+        self.cols[j] &= ~(1 << i)
+
+    def _masks(self, cells):
+        """
+        Маски по строкам и столбцам для набора ячеек: {i: маска}, {j: маска}.
+        Все ячейки проверяются до изменения матрицы
+        """
+        rows = {}
+        cols = {}
+        for i, j in cells:
+            self._check(i, j)
+            rows[i] = rows.get(i, 0) | 1 << j
+            cols[j] = cols.get(j, 0) | 1 << i
+        return rows, cols
+
+    def set_many(self, cells):
+        """Установить ячейки: одно OR с готовой маской на строку и на столбец"""
+        rows, cols = self._masks(cells)
+        for i, mask in rows.items():
+            self.rows[i] |= mask
+        for j, mask in cols.items():
+            self.cols[j] |= mask
+
+    def clear_many(self, cells):
+        """Сбросить ячейки: одно AND с инверсной маской на строку и на столбец"""
+        rows, cols = self._masks(cells)
+        for i, mask in rows.items():
+            self.rows[i] &= ~mask
+        for j, mask in cols.items():
+            self.cols[j] &= ~mask
+
+    def clear_all(self):
+        self.rows = [0] * self.shape[0]
+        self.cols = [0] * self.shape[1]
+
+    def row(self, i):
+        """Приёмники, подключённые к источнику i"""
+        return _bits(self.rows[i])
+
+    def column(self, j):
+        """Источники, подключённые к приёмнику j"""
+        return _bits(self.cols[j])
+
+    def count(self):
+        return sum(bin(mask).count('1') for mask in self.rows)
+
+    def cells(self):
+        """Все соединения (i, j) построчно"""
+        for i, mask in enumerate(self.rows):
+            for j in _bits(mask):
+                yield i, j
+
+    def multiple_drivers(self):
+        """Приёмники с несколькими источниками: {j: [i, ...]}"""
+        # mask & (mask - 1) != 0 означает, что в маске больше одного бита
+        return {j: _bits(mask) for j, mask in enumerate(self.cols) if mask & (mask - 1)}
+
+    def __eq__(self, other):
+        return isinstance(other, ConnectionMatrix) and self.shape == other.shape and self.rows == other.rows
+
+    # Преобразования из/в форматы конфигурации
+
+    @classmethod
+    def for_tables(cls, tables):
+        """Пустая матрица по таблицам пинов: строки - DE10-Lite, столбцы - периферия"""
+        return cls(len(tables.de10_labels), len(tables.perif_labels))
+
+    @classmethod
+    def from_pairs(cls, connections, tables):
+        """
+        Матрица из списка пар [метка DE10-Lite, метка периферии].
+
+        Returns:
+            tuple: (matrix, unknown) - unknown содержит пары с неизвестными метками
+        """
+        source_index = {label: i for i, label in enumerate(tables.de10_labels)}
+        target_index = {label: j for j, label in enumerate(tables.perif_labels)}
+        matrix = cls.for_tables(tables)
+        cells = []
+        unknown = []
+        for pair in connections:
+            left, right = pair
+            i = source_index.get(left)
+            j = target_index.get(right)
+            if i is None or j is None:
+                unknown.append(pair)
+            else:
+                cells.append((i, j))
+        matrix.set_many(cells)
+        return matrix, unknown
+
+    def to_pairs(self, tables):
+        """Список пар [метка DE10-Lite, метка периферии]"""
+        return [[tables.de10_labels[i], tables.perif_labels[j]] for i, j in self.cells()]
+
+    @classmethod
+    def from_cells(cls, cells, shape=None):
+        """
+        Матрица из словаря ячеек {"row-col": bool} (формат pin_matrix).
+        Без shape размер определяется по наибольшим номерам.
+        """
+        selected = []
+        n_rows = n_cols = 0
+        for key, is_connected in cells.items():
+            row, col = map(int, key.split('-'))
+            n_rows = max(n_rows, row + 1)
+            n_cols = max(n_cols, col + 1)
+            if is_connected:
+                selected.append((row, col))
+        matrix = cls(*(shape or (n_rows, n_cols)))
+        matrix.set_many(selected)
+        return matrix
+
+    def to_cells(self):
+        """Словарь {"row-col": True} для установленных ячеек"""
+        return {f"{i}-{j}": True for i, j in self.cells()}
+
+    def to_dict(self):
+        """Компактное представление: маски строк в шестнадцатеричном виде"""
+        return {
+            'shape': list(self.shape),
+            'rows': [format(mask, 'x') for mask in self.rows],
+            'count': self.count(),
+        }
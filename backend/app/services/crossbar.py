@@ -0,0 +1,134 @@
+"""
+Режим коммутатора (crossbar): маршрутизация без перекомпиляции.
+
+Вместо assign для каждого соединения в ПЛИС один раз загружается модуль с
+мультиплексором на каждом пине периферии. Какой пин DE10-Lite подключён к
+выходу, задаёт поле выбора в регистре конфигурации:
+
+    поле выхода j занимает биты [j*SEL_BITS, (j+1)*SEL_BITS)
+    0 - выход отключён (высокий импеданс), k - источник k-1
+
+Образ регистра упакован в байты младшим битом вперёд. В ПЛИС он попадает
+через последовательный интерфейс cfg_clk/cfg_data/cfg_latch: биты
+вдвигаются начиная с бита 0, по фронту cfg_latch образ применяется.
+Arduino получает образ кадром:
+
+    0     SYNC (0x5A)
+    1..2  длина образа в байтах (uint16, little-endian)
+    3..   образ
+    N-1   CRC-8 (полином 0x07) байтов длины и образа
+
+Все функции модуля - чистый Python без обращения к оборудованию.
+"""
+
+import struct
+from collections import namedtuple
+from app.services.button_protocol import crc8
+
+FRAME_SYNC = 0x5A
+_LENGTH = struct.Struct('<H')
+
+CrossbarLayout = namedtuple('CrossbarLayout', [
+    'sources',       # пины CycloneIV источников (DE10-Lite) в порядке de10lite.csv
+    'targets',       # пины CycloneIV выходов (периферия) в порядке perif.csv
+    'sel_bits',      # ширина поля выбора
+    'image_bits',    # длина регистра конфигурации в битах
+])
+
+def make_layout(tables):
+    """Раскладка регистра по таблицам пинов"""
+    sources = tuple(tables.de10_to_cyclone[label] for label in tables.de10_labels)
+    targets = tuple(tables.perif_to_cyclone[label] for label in tables.perif_labels)
+    shared = set(sources) & set(targets)
+    if shared:
+        raise ValueError(f"Пины одновременно источники и выходы: {', '.join(sorted(shared))}")
+    sel_bits = max(len(sources).bit_length(), 1)
+    return CrossbarLayout(sources, targets, sel_bits, len(targets) * sel_bits)
+
+def image_size(layout):
+    return (layout.image_bits + 7) // 8
+
+def encode_selects(connections, tables, layout=None):
+    """
+    Образ регистра выбора для пар [метка DE10-Lite, метка периферии].
+
+    Raises:
+        ValueError: неизвестная метка или несколько источников одного выхода
+    """
+    layout = layout or make_layout(tables)
+    source_index = {label: i for i, label in enumerate(tables.de10_labels)}
+    target_index = {label: j for j, label in enumerate(tables.perif_labels)}
+    selects = [0] * len(layout.targets)
+    for left, right in connections:
+        i = source_index.get(left)
+        j = target_index.get(right)
+        if i is None or j is None:
+            raise ValueError(f"Неизвестная пара пинов: {left} -> {right}")
+        if selects[j] and selects[j] != i + 1:
+            raise ValueError(f"У выхода {right} несколько источников")
+        selects[j] = i + 1
+    register = 0
+    for j, value in enumerate(selects):
+        register |= value << (j * layout.sel_bits)
+    return register.to_bytes(image_size(layout), 'little')
+
+def decode_selects(image, tables, layout=None):
+    """Пары [метка DE10-Lite, метка периферии] из образа регистра"""
+    layout = layout or make_layout(tables)
+    if len(image) != image_size(layout):
+        raise ValueError(f"Размер образа {len(image)} байт, ожидается {image_size(layout)}")
+    register = int.from_bytes(image, 'little')
+    mask = (1 << layout.sel_bits) - 1
+    pairs = []
+    for j in range(len(layout.targets)):
+        value = register >> (j * layout.sel_bits) & mask
+        if value:
+            if value > len(layout.sources):
+                raise ValueError(f"Неверное поле выбора {value} у выхода {tables.perif_labels[j]}")
+            pairs.append([tables.de10_labels[value - 1], tables.perif_labels[j]])
+    return pairs
+
+def encode_frame(image):
+    """Кадр для Arduino с образом регистра"""
+    body = _LENGTH.pack(len(image)) + bytes(image)
+    return bytes((FRAME_SYNC,)) + body + bytes((crc8(body),))
+
+def decode_frame(frame):
+    """Образ регистра из кадра; ValueError при неверном кадре"""
+    if len(frame) < 4 or frame[0] != FRAME_SYNC:
+        raise ValueError("Нет SYNC в начале кадра")
+    (length,) = _LENGTH.unpack_from(frame, 1)
+    if len(frame) != length + 4:
+        raise ValueError("Длина кадра не совпадает с заголовком")
+    if crc8(frame[1:-1]) != frame[-1]:
+        raise ValueError("Неверная CRC кадра")
+    return bytes(frame[3:-1])
+
+def generate_verilog(layout, module='GreenCrossbar'):
+    """Модуль коммутатора для раскладки layout"""
+    sources, targets, sel_bits = layout.sources, layout.targets, layout.sel_bits
+    width = layout.image_bits
+    lines = [f"module {module} (", "", "\t// configuration interface",
+             "\tinput cfg_clk,", "\tinput cfg_data,", "\tinput cfg_latch,", "",
+             "\t// pins for FPGA"]
+    lines += [f"\tinout {pin}," for pin in sources]
+    lines += ["", "\t//pins for periphery"]
+    lines += [f"\tinout {pin}," for pin in targets]
+    lines[-1] = lines[-1].rstrip(',')
+    lines += ["", ");", "",
+              f"    localparam SEL_BITS = {sel_bits};",
+              f"    localparam WIDTH = {width};", "",
+              "    reg [WIDTH-1:0] shift_reg = 0;",
+              "    reg [WIDTH-1:0] select_reg = 0;", "",
+              "    // Бит 0 образа вдвигается первым",
+              "    always @(posedge cfg_clk)",
+              "        shift_reg <= {cfg_data, shift_reg[WIDTH-1:1]};", "",
+              "    always @(posedge cfg_latch)",
+              "        select_reg <= shift_reg;", "",
+              "    // src[0] - заглушка для поля выбора 0",
+              f"    wire [{len(sources)}:0] src = {{{', '.join(reversed(sources))}, 1'b0}};", ""]
+    for j, pin in enumerate(targets):
+        lines.append(f"    wire [SEL_BITS-1:0] sel_{pin} = select_reg[{j}*SEL_BITS +: SEL_BITS];")
+        lines.append(f"    assign {pin} = (sel_{pin} == 0) ? 1'bz : src[sel_{pin}];")
+    lines += ["endmodule", ""]
+    return "\n".join(lines)
@@ -0,0 +1,311 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from app.config.quartus_config import JOBS
+
+# Состояния задачи
+QUEUED = 'queued'
+RUNNING = 'running'
+WAITING = 'waiting'    # ждёт внешнего события, не занимая поток пула
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+class JobCancelled(Exception):
+    """Задача была отменена пользователем"""
+
+class Suspended(Exception):
+    """
+    Задача ждёт внешнего события (например, выдачи платы) и освобождает
+    поток пула. Когда событие наступит, кто-то вызывает job.wake(), и
+    resume(job) продолжает задачу в пуле; его результат становится
+    результатом задачи. resume может снова бросить Suspended, поэтому
+    ложное пробуждение безопасно. on_cancel() вызывается, если ожидающую
+    задачу отменили.
+    """
+
+    def __init__(self, resume, on_cancel=None):
+        super().__init__("waiting")
+        self.resume = resume
+        self.on_cancel = on_cancel
+
+    def then(self, fn):
+        """Продолжение, результат которого проходит через fn"""
+        resume = self.resume
+
+        def chained(job):
+            return chain(lambda: resume(job), fn)
+        return Suspended(chained, self.on_cancel)
+
+def chain(call, then):
+    """then(call()), в том числе когда call() приостановил задачу (Suspended)"""
+    try:
+        result = call()
+    except Suspended as e:
+        raise e.then(then)
+    return then(result)
+
+class Job:
+    """
+    Фоновая задача компиляции/прошивки с состоянием, этапом и журналом.
+
+    Журнал - кольцевой буфер последних log_lines записей. Каждая запись
+    получает сквозной номер seq, по которому клиенты запрашивают продолжение.
+    """
+
+    def __init__(self, kind, params=None, log_lines=500):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = QUEUED
+        self.stage = None
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.logs = deque(maxlen=log_lines)
+        self.log_seq = 0
+        self.message_counts = {'info': 0, 'warning': 0, 'critical_warning': 0, 'error': 0}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        # Продолжение приостановленной задачи (см. Suspended)
+        self._resume = None
+        self._on_cancel = None
+        self._wake_pending = False
+        self._on_wake = None
+
+    def log(self, message, event=None):
+        """
+        Добавляет строку в журнал задачи.
+
+        event - разобранное сообщение Quartus (см. quartus_log.parse_message).
+        """
+        with self._lock:
+            self.log_seq += 1
+            entry = {'seq': self.log_seq, 'text': message, 'level': 'output', 'id': None}
+            if event is not None:
+                entry['level'] = event['level']
+                entry['id'] = event['id']
+                if event['level'] in self.message_counts:
+                    self.message_counts[event['level']] += 1
+            self.logs.append(entry)
+            self._changed.notify_all()
+
+    def logs_after(self, seq):
+        """Записи журнала с номером больше seq, ещё оставшиеся в буфере"""
+        with self._lock:
+            return [entry for entry in self.logs if entry['seq'] > seq]
+
+    def wait_for_change(self, seq, timeout=None):
+        """Ждёт новой записи журнала после seq или завершения задачи; False по таймауту"""
+        with self._lock:
+            return self._changed.wait_for(
+                lambda: self.log_seq > seq or self.status in FINISHED_STATES, timeout)
+
+    def set_stage(self, stage, progress=None):
+        """Отмечает текущий этап выполнения и, при необходимости, прогресс в процентах"""
+        self.check_cancelled()
+        with self._lock:
+            self.stage = stage
+            if progress is not None:
+                self.progress = progress
+        self.log(f"== {stage}")
+
+    @property
+    def cancel_event(self):
+        return self._cancel_event
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Прерывает выполнение между этапами, если запрошена отмена"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def wake(self):
+        """
+        Сообщает, что событие, которого ждёт задача, наступило. Можно
+        вызывать до приостановки: пробуждение запоминается.
+        """
+        with self._lock:
+            self._wake_pending = True
+            on_wake = self._on_wake
+        if on_wake is not None:
+            on_wake(self)
+
+    def wait(self, timeout=None):
+        """Ждёт завершения задачи, возвращает True если задача завершилась"""
+        return self._done_event.wait(timeout)
+
+    def to_dict(self, with_logs=False, log_offset=0):
+        with self._lock:
+            data = {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'stage': self.stage,
+                'progress': self.progress,
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'log_seq': self.log_seq,
+                'messages': dict(self.message_counts),
+            }
+            if with_logs:
+                data['logs'] = [entry for entry in self.logs if entry['seq'] > log_offset]
+        return data
+
+class JobManager:
+    """
+    Очередь задач с ограниченным пулом потоков.
+
+    Задачи выполняются функцией fn(job, **params); исключение JobCancelled
+    переводит задачу в состояние cancelled, любое другое - в failed.
+    Suspended приостанавливает задачу (состояние waiting) и освобождает
+    поток; после job.wake() задача продолжается в отдельном пуле
+    resume_workers, чтобы выданная плата не ждала за чужими компиляциями.
+    """
+
+    def __init__(self, max_workers=1, max_history=100, log_lines=500, resume_workers=4):
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self.log_lines = log_lines
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.resume_executor = ThreadPoolExecutor(max_workers=resume_workers, thread_name_prefix="job-resume")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, kind, fn, **params):
+        """Ставит задачу в очередь и сразу возвращает объект Job"""
+        job = Job(kind, params, log_lines=self.log_lines)
+        job._on_wake = self._wake
+        with self.lock:
+            self.jobs[job.id] = job
+            self._trim_history()
+        job.future = self.executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn, resumed=False):
+        if resumed:
+            with job._lock:
+                # Задачу отменили, пока продолжение стояло в очереди
+                if job.status != WAITING:
+                    return
+                job.status = RUNNING
+                job._on_cancel = None
+        else:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+                return
+            with job._lock:
+                job.status = RUNNING
+                job.started_at = time.time()
+        try:
+            result = fn(job) if resumed else fn(job, **job.params)
+            job.result = result
+            self._finish(job, SUCCEEDED)
+        except Suspended as e:
+            with job._lock:
+                job.status = WAITING
+                job._resume = e.resume
+                job._on_cancel = e.on_cancel
+                job._changed.notify_all()
+            # Отмена или пробуждение могли прийти, пока задача ещё выполнялась
+            if not (job.cancel_requested and self._cancel_waiting(job)):
+                self._wake(job)
+        except JobCancelled:
+            job.log("Задача отменена")
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = str(e)
+            job.log(traceback.format_exc())
+            self._finish(job, FAILED)
+
+    def _wake(self, job):
+        """Продолжает приостановленную задачу, если для неё было пробуждение"""
+        with job._lock:
+            if job.status != WAITING or not job._wake_pending or job._resume is None:
+                return
+            job._wake_pending = False
+            resume, job._resume = job._resume, None
+        job.future = self.resume_executor.submit(self._run, job, resume, resumed=True)
+
+    def _cancel_waiting(self, job):
+        """
+        Отменяет приостановленную задачу (в том числе уже разбуженную, но
+        ещё не продолженную); False, если она не ждёт
+        """
+        with job._lock:
+            if job.status != WAITING:
+                return False
+            job.status = CANCELLED
+            on_cancel, job._resume, job._on_cancel = job._on_cancel, None, None
+        try:
+            if on_cancel is not None:
+                on_cancel()
+        finally:
+            job.log("Задача отменена")
+            self._finish(job, CANCELLED)
+        return True
+
+    def _finish(self, job, status):
+        with job._lock:
+            job.status = status
+            job.finished_at = time.time()
+            if status == SUCCEEDED:
+                job.progress = 100
+            job._changed.notify_all()
+        job._done_event.set()
+
+    def _trim_history(self):
+        """Удаляет самые старые завершённые задачи сверх max_history (вызывается под lock)"""
+        excess = len(self.jobs) - self.max_history
+        if excess <= 0:
+            return
+        for job_id in [j.id for j in self.jobs.values() if j.status in FINISHED_STATES][:excess]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """
+        Запрашивает отмену задачи. Задача из очереди и приостановленная
+        отменяются сразу, выполняющаяся - на ближайшей границе этапов.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job._cancel_event.set()
+        if self._cancel_waiting(job):
+            return job
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return job
+
+# Глобальный менеджер задач
+job_manager = JobManager(
+    max_workers=JOBS['max_workers'],
+    max_history=JOBS['max_history'],
+    log_lines=JOBS['log_lines'],
+    resume_workers=JOBS['resume_workers'],
+)
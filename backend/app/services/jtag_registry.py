@@ -0,0 +1,257 @@
+import os
+import re
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from app.config.quartus_config import QUARTUS_BIN_DIR, JTAG, PROGRAMMING
+
+# "1) USB-Blaster [2-1.5]"
+_CABLE_RE = re.compile(r'^\s*(\d+)\)\s+(.+?)\s*$')
+# "  020F10DD   EP3C(5|10)/EP4CE(6|10)"
+_DEVICE_RE = re.compile(r'^\s+([0-9A-Fa-f]{8})\s+(.+?)\s*$')
+
+def parse_cable_list(text):
+    """Имена кабелей из вывода `quartus_pgm -l`"""
+    cables = []
+    for line in text.splitlines():
+        m = _CABLE_RE.match(line)
+        if m:
+            cables.append(m.group(2))
+    return cables
+
+def parse_chains(text):
+    """
+    Разбирает вывод `quartus_pgm -c <cable> -a`.
+
+    Returns:
+        dict: имя кабеля -> список устройств цепочки {'position', 'idcode', 'name'}
+    """
+    chains = {}
+    current = None
+    for line in text.splitlines():
+        m = _CABLE_RE.match(line)
+        if m:
+            current = m.group(2)
+            chains[current] = []
+            continue
+        m = _DEVICE_RE.match(line)
+        if m and current is not None:
+            chains[current].append({
+                'position': len(chains[current]) + 1,
+                'idcode': m.group(1).upper(),
+                'name': m.group(2),
+            })
+    return chains
+
+def device_matches(jtag_name, part_number):
+    """
+    Проверяет, что устройство цепочки соответствует ПЛИС part_number.
+
+    quartus_pgm пишет имена семейств в виде шаблонов через '/', например
+    "EP3C(5|10)/EP4CE(6|10)" или "10M50DA(.|ES)/10M50DC", поэтому каждая
+    альтернатива сопоставляется с началом полного имени ПЛИС как регулярное
+    выражение.
+    """
+    if not part_number:
+        return True
+    for alternative in jtag_name.split('/'):
+        try:
+            if re.match(alternative, part_number, flags=re.I):
+                return True
+        except re.error:
+            if part_number.upper().startswith(alternative.upper()):
+                return True
+    return False
+
+_cable_slots = {}
+_cable_slots_lock = threading.Lock()
+
+def _slot(cable):
+    with _cable_slots_lock:
+        slot = _cable_slots.get(cable)
+        if slot is None:
+            slot = threading.BoundedSemaphore(PROGRAMMING['per_board_limit'])
+            _cable_slots[cable] = slot
+        return slot
+
+@contextmanager
+def cable_slot(cable):
+    """Ограничивает число одновременных прошивок через один кабель"""
+    with _slot(cable):
+        yield
+
+@contextmanager
+def cable_idle(cable):
+    """
+    Без ожидания занимает все места кабеля на время опроса цепочки.
+    Возвращает False, если через кабель сейчас идёт прошивка: `-a` на
+    занятом кабле мешает quartus_pgm, который прошивает плату
+    """
+    slot = _slot(cable)
+    taken = 0
+    try:
+        while taken < PROGRAMMING['per_board_limit'] and slot.acquire(blocking=False):
+            taken += 1
+        yield taken == PROGRAMMING['per_board_limit']
+    finally:
+        for _ in range(taken):
+            slot.release()
+
+class JtagRegistry:
+    """
+    Кэш обнаруженных JTAG кабелей и цепочек устройств.
+
+    Обнаружение (`quartus_pgm -l` и `-a` для каждого кабеля) выполняется
+    один раз и считается актуальным ttl секунд; фоновый поток может
+    обновлять его заранее, чтобы прошивка не ждала запуска quartus_pgm.
+    Неудачное обнаружение тоже запоминается на ttl секунд, чтобы без
+    quartus_pgm каждый запрос не запускал его заново. Кабели, через которые
+    идёт прошивка, не опрашиваются - для них остаётся прежняя запись.
+    """
+
+    def __init__(self, quartus_pgm_path, ttl=30, refresh_interval=0, command_timeout=60):
+        self.quartus_pgm_path = str(quartus_pgm_path)
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.command_timeout = command_timeout
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.records = {}
+        self.discovered_at = None
+        self.failed_at = None
+        self.last_error = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def _run(self, args):
+        result = subprocess.run(
+            [self.quartus_pgm_path] + args,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, timeout=self.command_timeout
+        )
+        return result.stdout
+
+    def refresh(self):
+        """Перечисляет кабели и их цепочки и заменяет кэш целиком"""
+        with self.refresh_lock:
+            try:
+                cables = parse_cable_list(self._run(['-l']))
+                with self.lock:
+                    previous = self.records
+                records = {}
+                for cable in cables:
+                    with cable_idle(cable) as idle:
+                        if idle:
+                            devices = parse_chains(self._run(['-c', cable, '-a'])).get(cable, [])
+                            records[cable] = {'cable': cable, 'devices': devices}
+                        elif cable in previous:
+                            records[cable] = previous[cable]
+                        else:
+                            # Кабель занят с момента запуска - цепочка пока неизвестна
+                            records[cable] = {'cable': cable, 'devices': []}
+                error = None
+            except (OSError, subprocess.SubprocessError) as e:
+                records = None
+                error = str(e)
+            with self.lock:
+                self.last_error = error
+                if records is not None:
+                    self.records = records
+                    self.discovered_at = time.monotonic()
+                    self.failed_at = None
+                    print(f"JTAG: найдено кабелей {len(records)}")
+                else:
+                    self.failed_at = time.monotonic()
+                    print(f"JTAG: обнаружение не удалось: {error}")
+            return records
+
+    def _fresh_records(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.discovered_at is not None and now - self.discovered_at < self.ttl:
+                return self.records
+            if self.failed_at is not None and now - self.failed_at < self.ttl:
+                return {}
+        records = self.refresh()
+        return records if records is not None else {}
+
+    def cables(self):
+        """Список обнаруженных кабелей с цепочками"""
+        return list(self._fresh_records().values())
+
+    def chain(self, cable):
+        """Устройства цепочки кабеля или None, если кабель не обнаружен"""
+        record = self._fresh_records().get(cable)
+        return None if record is None else record['devices']
+
+    def resolve(self, device=None, preferred=None):
+        """
+        Подбирает кабель для платы.
+
+        Среди кабелей, в цепочке которых есть устройство ПЛИС device,
+        выбирается preferred, если он есть, иначе первый найденный. Если
+        обнаружение ничего не дало, возвращается preferred.
+        """
+        records = self._fresh_records()
+        candidates = [
+            cable for cable, record in records.items()
+            if any(device_matches(d['name'], device) for d in record['devices'])
+        ]
+        if preferred in candidates or not candidates:
+            return preferred
+        return candidates[0]
+
+    def invalidate(self):
+        """Сбрасывает кэш, следующий запрос выполнит обнаружение заново"""
+        with self.lock:
+            self.discovered_at = None
+            self.failed_at = None
+
+    def start(self):
+        """Запускает фоновое обновление, если оно включено и quartus_pgm доступен"""
+        if not self.refresh_interval or not os.path.exists(self.quartus_pgm_path):
+            return False
+        if self.thread is not None and self.thread.is_alive():
+            return True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._refresh_loop, name="jtag-refresh", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _refresh_loop(self):
+        while not self.stop_event.is_set():
+            self.refresh()
+            self.stop_event.wait(self.refresh_interval)
+
+    def to_dict(self):
+        with self.lock:
+            age = None if self.discovered_at is None else time.monotonic() - self.discovered_at
+            return {
+                'cables': list(self.records.values()),
+                'age': age,
+                'ttl': self.ttl,
+                'last_error': self.last_error,
+            }
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_registry(quartus_pgm_path):
+    """Реестр для конкретного quartus_pgm (по одному на путь)"""
+    key = str(quartus_pgm_path)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = JtagRegistry(
+                key, ttl=JTAG['ttl'], refresh_interval=JTAG['refresh_interval'],
+                command_timeout=JTAG['command_timeout'])
+            _registries[key] = registry
+        return registry
+
+# Реестр для quartus_pgm из конфигурации
+jtag_registry = get_registry(Path(QUARTUS_BIN_DIR) / "quartus_pgm")
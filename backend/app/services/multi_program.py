@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from app.config.quartus_config import QUARTUS_BIN_DIR, PROGRAMMING, BOARDS
+from app.services.jtag_registry import get_registry, device_matches
+from app.services.quartus import load_sof_to_fpga, describe_wait
+from app.services.board_scheduler import board_scheduler, LeaseExpired, WAITING, CANCELLED
+from app.services.jobs import Suspended
+
+# Сколько последних строк вывода quartus_pgm сохранять в результате по каждой плате
+RESULT_LOG_LINES = 20
+
+def select_cables(registry, cables=None, device=None):
+    """
+    Список кабелей для прошивки.
+
+    cables - явный список имён или None/'all' для всех обнаруженных кабелей;
+    device - если указано, остаются только кабели с этой ПЛИС в цепочке.
+    """
+    if cables is None or cables == 'all':
+        selected = [record['cable'] for record in registry.cables()
+                    if device is None or any(device_matches(d['name'], device) for d in record['devices'])]
+    else:
+        selected = list(dict.fromkeys(cables))
+    return selected
+
+def board_cables(registry):
+    """Кабель -> имя платы из BOARDS, к которой он подключён"""
+    return {registry.resolve(device=board.get('device'), preferred=board['port']): name
+            for name, board in BOARDS.items()}
+
+def _program_one(cable, quartus_pgm, sof_path, job, cancel_event):
+    """Прошивает одну плату, возвращает результат с временем и хвостом журнала"""
+    tail = deque(maxlen=RESULT_LOG_LINES)
+
+    def on_line(line, event):
+        tail.append(line)
+        if job is not None:
+            job.log(f"[{cable}] {line}", event)
+
+    started = time.perf_counter()
+    result = {'cable': cable, 'ok': False, 'error': None}
+    try:
+        result['ok'] = bool(load_sof_to_fpga(cable, str(quartus_pgm), str(sof_path),
+                                             on_line=on_line, cancel_event=cancel_event))
+        if not result['ok']:
+            result['error'] = 'Programming failed'
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    result['log'] = list(tail)
+    return result
+
+def program_many(sof_path, cables=None, device=None, quartus_dir=None, max_parallel=None, job=None,
+                 owner=None, priority=0):
+    """
+    Прошивает один .sof на несколько плат параллельно.
+
+    Каждая прошивка - отдельный процесс quartus_pgm; потоки пула только
+    ждут их завершения. Общее число одновременных прошивок ограничено
+    max_parallel, на один кабель - PROGRAMMING['per_board_limit'].
+
+    Кабели плат из BOARDS прошиваются только после выдачи платы
+    планировщиком (заявка от owner с priority), остальные - сразу. Пока
+    ждут занятые платы, задача приостанавливается (Suspended) и не
+    занимает поток пула; без задачи вызов ждёт на месте.
+
+    Returns:
+        dict: {'results': [...по каждой плате...], 'succeeded', 'failed', 'seconds'}
+    """
+    quartus_dir = Path(quartus_dir or QUARTUS_BIN_DIR)
+    quartus_pgm = quartus_dir / "quartus_pgm"
+    if not Path(sof_path).is_file():
+        raise FileNotFoundError(f"Файл {sof_path} не найден")
+    registry = get_registry(quartus_pgm)
+    selected = select_cables(registry, cables, device)
+    if not selected:
+        raise IOError("Не найдено ни одной платы для прошивки")
+    max_parallel = max_parallel or PROGRAMMING['max_parallel']
+    cancel_event = job.cancel_event if job is not None else threading.Event()
+    if job is not None:
+        job.set_stage('program', 10)
+        job.log(f"Прошивка {len(selected)} плат: {', '.join(selected)}")
+
+    boards = board_cables(registry)
+    on_grant = (lambda lease: job.wake()) if job is not None else None
+    leases = {cable: board_scheduler.request(boards[cable], owner or 'anonymous', priority,
+                                             job_id=job.id if job is not None else None,
+                                             on_grant=on_grant)
+              for cable in selected if cable in boards}
+    for cable, lease in leases.items():
+        info = board_scheduler.get_lease(lease.id)
+        if info['state'] == WAITING:
+            message = f"[{cable}] {describe_wait(lease.board, info)}"
+            print(message)
+            if job is not None:
+                job.log(message)
+
+    pending = list(selected)
+    results = {}
+    started = time.perf_counter()
+
+    def cancel():
+        for lease in leases.values():
+            board_scheduler.release(lease.id, state=CANCELLED)
+
+    def ready(cable):
+        lease = leases.get(cable)
+        if lease is None:
+            return True
+        # Завершённая заявка могла быть уже удалена из истории (get_lease
+        # вернёт None) - тогда ждать нечего, renew в program_ready сообщит об ошибке
+        info = board_scheduler.get_lease(lease.id)
+        return info is None or info['state'] != WAITING
+
+    def program_ready(cable):
+        lease = leases.get(cable)
+        if lease is None:
+            return _program_one(cable, quartus_pgm, sof_path, job, cancel_event)
+        try:
+            # Плата могла истечь, пока задача ждала другие
+            board_scheduler.renew(lease.id)
+        except LeaseExpired:
+            return {'cable': cable, 'ok': False, 'error': f"Аренда платы {lease.board} истекла",
+                    'seconds': 0.0, 'log': []}
+        try:
+            return _program_one(cable, quartus_pgm, sof_path, job, cancel_event)
+        finally:
+            board_scheduler.release(lease.id)
+
+    def step(_job=None):
+        try:
+            while True:
+                batch = [cable for cable in pending if ready(cable)]
+                if batch:
+                    with ThreadPoolExecutor(max_workers=min(max_parallel, len(batch)),
+                                            thread_name_prefix="pgm") as pool:
+                        for result in pool.map(program_ready, batch):
+                            results[result['cable']] = result
+                            pending.remove(result['cable'])
+                if job is not None:
+                    job.check_cancelled()
+                if not pending:
+                    break
+                if job is not None:
+                    raise Suspended(step, on_cancel=cancel)
+                time.sleep(0.5)
+        except Suspended:
+            raise
+        except BaseException:
+            cancel()
+            raise
+
+        ordered = [results[cable] for cable in selected]
+        succeeded = sum(1 for r in ordered if r['ok'])
+        return {
+            'results': ordered,
+            'succeeded': succeeded,
+            'failed': len(ordered) - succeeded,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+    return step()
@@ -1,17 +1,160 @@
+import copy
+import hashlib
 import json
+import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from app.config.paths import BASE_DIR
+from app.services.verilog_generator import write_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка между процессами недоступна
+    fcntl = None
 
 CONFIG_FILE = BASE_DIR / 'data' / 'pin_connections.json'
+# Плата, для которой компилируется текущая конфигурация (GreenP.v)
+CONFIG_BOARD = 'green'
+
+class VersionConflict(Exception):
+    """Конфигурация изменена с момента, когда клиент её прочитал"""
+
+    def __init__(self, current_version, current_etag):
+        super().__init__(f"Config version is {current_version}")
+        self.current_version = current_version
+        self.current_etag = current_etag
+
+class ConfigStore:
+    """
+    Хранилище конфигурации соединений в JSON файле.
+
+    Последняя прочитанная версия держится в памяти и перечитывается только
+    при изменении файла (mtime/размер), поэтому чтение не разбирает JSON
+    заново. Запись идёт через временный файл и os.replace под блокировкой
+    потока и файловой блокировкой (для нескольких процессов gunicorn),
+    при каждой записи номер версии увеличивается на единицу.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(f".{self.path.name}.lock")
+        self.lock = threading.Lock()
+        self._cached = None   # (stat_key, config, etag)
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stat_key(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read(self):
+        """Актуальная пара (config, etag), файл перечитывается только при изменении"""
+        stat_key = self._stat_key()
+        cached = self._cached
+        if cached is not None and cached[0] == stat_key:
+            return cached[1], cached[2]
+        if stat_key is None:
+            config = {'connections': [], 'version': 0}
+            text = json.dumps(config)
+        else:
+            text = self.path.read_text(encoding='utf-8')
+            config = json.loads(text)
+            config.setdefault('version', 0)
+        etag = f"{config['version']}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+        self._cached = (stat_key, config, etag)
+        return config, etag
+
+    def load(self):
+        """Копия текущей конфигурации (с полем version)"""
+        config, _ = self._read()
+        return copy.deepcopy(config)
+
+    def load_with_etag(self):
+        """Копия конфигурации и её ETag (версия и хэш содержимого)"""
+        config, etag = self._read()
+        return copy.deepcopy(config), etag
+
+    def save(self, config, if_match=None):
+        """
+        Атомарно сохраняет конфигурацию со следующим номером версии.
+
+        if_match - ETag, который видел клиент; если конфигурация с тех пор
+        изменилась, выбрасывается VersionConflict.
+
+        Returns:
+            dict: сохранённая конфигурация
+        """
+        with self.lock, self._file_lock():
+            current, etag = self._read()
+            version = current.get('version', 0)
+            if if_match is not None and if_match != etag:
+                raise VersionConflict(version, etag)
+            config = dict(config, version=version + 1)
+            write_atomic(self.path, json.dumps(config, indent=4))
+            self._read()
+            return copy.deepcopy(config)
+
+    def patch_connections(self, add=(), remove=(), if_match=None, validate=None):
+        """
+        Добавляет и удаляет соединения как элементы множества.
+
+        Соединения хранятся списком пар, но изменения применяются через
+        словарь пар (проверка наличия O(1), порядок сохраняется). Повторное
+        добавление существующей пары и удаление отсутствующей ничего не
+        меняют; если набор не изменился, файл не перезаписывается и версия
+        остаётся прежней. validate(connections) может выбросить исключение,
+        чтобы отменить запись.
+
+        Returns:
+            tuple: (config, added, removed) - фактически добавленные и удалённые пары
+        """
+        with self.lock, self._file_lock():
+            current, etag = self._read()
+            version = current.get('version', 0)
+            if if_match is not None and if_match != etag:
+                raise VersionConflict(version, etag)
+            pairs = dict.fromkeys(tuple(pair) for pair in current.get('connections', []))
+            removed = []
+            for pair in dict.fromkeys(map(tuple, remove)):
+                if pair in pairs:
+                    del pairs[pair]
+                    removed.append(list(pair))
+            added = []
+            for pair in dict.fromkeys(map(tuple, add)):
+                if pair not in pairs:
+                    pairs[pair] = None
+                    added.append(list(pair))
+            if not added and not removed:
+                return copy.deepcopy(current), added, removed
+            connections = [list(pair) for pair in pairs]
+            if validate is not None:
+                validate(connections)
+            config = dict(current, connections=connections, version=version + 1)
+            write_atomic(self.path, json.dumps(config, indent=4))
+            self._read()
+            return copy.deepcopy(config), added, removed
+
+# Глобальный экземпляр хранилища
+config_store = ConfigStore(CONFIG_FILE)
 
-def save_config(config):
+def save_config(config, if_match=None):
     """Сохраняет конфигурацию в JSON файл"""
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=4)
+    return config_store.save(config, if_match=if_match)
 
 def load_config():
     """Загружает конфигурацию из JSON файла"""
-    if not CONFIG_FILE.exists():
-        return {'connections': []}
-    with open(CONFIG_FILE, 'r') as f:
-        return json.load(f) 
\ No newline at end of file
+    return config_store.load()
@@ -0,0 +1,83 @@
+import csv
+import os
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+from app.config.quartus_config import DATA_FILES
+
+# Неизменяемый снимок таблиц пинов. Порядок меток сохраняется как в CSV,
+# словари доступны только на чтение и покрывают оба направления.
+PinTables = namedtuple('PinTables', [
+    'de10_labels',        # метки DE10-Lite в порядке CSV
+    'perif_labels',       # метки периферии в порядке CSV
+    'de10_to_cyclone',    # метка DE10-Lite -> пин CycloneIV
+    'cyclone_to_de10',    # пин CycloneIV -> метка DE10-Lite
+    'perif_to_cyclone',   # метка периферии -> пин CycloneIV
+    'cyclone_to_perif',   # пин CycloneIV -> метка периферии
+    'version',            # (mtime_ns de10lite.csv, mtime_ns perif.csv)
+])
+
+def read_pin_csv(path, label_column, pin_column='CycloneIV'):
+    """Читает пары (метка, пин CycloneIV) из CSV файла с заголовком"""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = {label_column, pin_column} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"В файле {path} нет столбцов: {', '.join(sorted(missing))}")
+        return [(row[label_column].strip(), row[pin_column].strip())
+                for row in reader if row[label_column] and row[pin_column]]
+
+def _freeze(pairs):
+    """Прямой и обратный неизменяемые словари для списка пар"""
+    forward = MappingProxyType(dict(pairs))
+    backward = MappingProxyType({pin: label for label, pin in pairs})
+    return forward, backward
+
+class PinMap:
+    """
+    Таблицы соответствия пинов DE10-Lite и периферии пинам CycloneIV.
+
+    Файлы читаются один раз; при каждом обращении проверяется только их
+    mtime, и при изменении таблицы перечитываются и подменяются целиком.
+    Читатели всегда получают согласованный снимок PinTables.
+    """
+
+    def __init__(self, de10_path, perif_path):
+        self.de10_path = de10_path
+        self.perif_path = perif_path
+        self.lock = threading.Lock()
+        self._tables = None
+
+    def _current_version(self):
+        return (os.stat(self.de10_path).st_mtime_ns, os.stat(self.perif_path).st_mtime_ns)
+
+    def _load(self, version):
+        de10_pairs = read_pin_csv(self.de10_path, 'DE10-Lite')
+        perif_pairs = read_pin_csv(self.perif_path, 'Perifery')
+        de10_to_cyclone, cyclone_to_de10 = _freeze(de10_pairs)
+        perif_to_cyclone, cyclone_to_perif = _freeze(perif_pairs)
+        return PinTables(
+            de10_labels=tuple(label for label, _ in de10_pairs),
+            perif_labels=tuple(label for label, _ in perif_pairs),
+            de10_to_cyclone=de10_to_cyclone,
+            cyclone_to_de10=cyclone_to_de10,
+            perif_to_cyclone=perif_to_cyclone,
+            cyclone_to_perif=cyclone_to_perif,
+            version=version,
+        )
+
+    def get(self):
+        """Возвращает актуальный снимок таблиц, перечитывая CSV при изменении mtime"""
+        version = self._current_version()
+        tables = self._tables
+        if tables is not None and tables.version == version:
+            return tables
+        with self.lock:
+            if self._tables is None or self._tables.version != version:
+                self._tables = self._load(version)
+                print(f"Pin map loaded: {len(self._tables.de10_labels)} DE10-Lite, "
+                      f"{len(self._tables.perif_labels)} peripheral pins")
+            return self._tables
+
+# Глобальный экземпляр, общий для всех маршрутов
+pin_map = PinMap(DATA_FILES['de10lite'], DATA_FILES['perif'])
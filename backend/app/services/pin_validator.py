@@ -0,0 +1,289 @@
+import os
+import re
+import shlex
+import threading
+from collections import namedtuple
+from pathlib import Path
+from app.config.quartus_config import BOARDS
+from app.services.connection_matrix import ConnectionMatrix
+from app.services.pin_map import pin_map
+from app.services.quartus_reports import parse_pin_file
+
+# Имена в .pin, которые означают, что пин не доступен для пользовательской логики
+RESERVED_PREFIXES = ('RESERVED', 'GND', 'VCC', 'NC', '~ALTERA', 'DNU')
+
+# "3.3-V LVTTL", "2.5 V", "1.2 V" - напряжение в начале имени стандарта
+_VOLTAGE_RE = re.compile(r'^(\d(?:\.\d+)?)[- ]?V\b', re.I)
+# "SSTL-15 Class I", "HSTL-18 Class II", "SSTL-2 Class I"
+_SSTL_RE = re.compile(r'^(?:SSTL|HSTL)-(\d)(\d?)\b', re.I)
+
+# Опции команд .qsf, за которыми следует значение
+QSF_VALUE_OPTIONS = ('-name', '-to', '-from', '-section_id', '-entity', '-tag', '-comment')
+
+# Индекс пинов CycloneIV для проверки соединений. Пины в конфигурации -
+# это имена портов шаблона (inout M1), а не места в корпусе: без назначения
+# в .qsf Quartus размещает порт M1 где угодно
+PinIndex = namedtuple('PinIndex', [
+    'tables',      # снимок PinTables
+    'de10_index',  # метка DE10-Lite -> строка ConnectionMatrix
+    'perif_index', # метка периферии -> столбец ConnectionMatrix
+    'pins',        # порт -> запись .pin ({'name', 'location', 'direction', 'io_standard', 'bank', ...})
+    'locations',   # место в корпусе -> запись .pin
+    'assigned',    # порт -> место в корпусе из .qsf
+    'standards',   # порт -> I/O стандарт из .qsf
+    'default_standard',  # стандарт по умолчанию из .qsf или None
+    'version',     # (версия PinTables, mtime_ns .pin, mtime_ns .qsf)
+])
+
+class InvalidConnections(ValueError):
+    """Соединения не прошли проверку; report - результат PinValidator.validate"""
+
+    def __init__(self, report):
+        super().__init__("Invalid pin connections")
+        self.report = report
+
+def io_voltage(io_standard):
+    """Напряжение VCCIO для I/O стандарта, вольты, или None если неизвестно"""
+    if not io_standard:
+        return None
+    m = _VOLTAGE_RE.match(io_standard.strip())
+    if m:
+        return float(m.group(1))
+    m = _SSTL_RE.match(io_standard.strip())
+    if m:
+        # SSTL-2 - 2.5 В, SSTL-18 - 1.8 В, HSTL-15 - 1.5 В
+        return float(f"{m.group(1)}.{m.group(2) or 5}")
+    return None
+
+def _qsf_command(line):
+    """Строка .qsf -> (команда, {опция: значение}, [позиционные аргументы]) или None"""
+    try:
+        words = shlex.split(line, comments=True)
+    except ValueError:
+        return None
+    if not words:
+        return None
+    options, positional = {}, []
+    args = iter(words[1:])
+    for arg in args:
+        if arg in QSF_VALUE_OPTIONS:
+            options[arg] = next(args, None)
+        else:
+            positional.append(arg)
+    return words[0], options, positional
+
+def parse_qsf_pins(lines):
+    """
+    Назначения пинов из .qsf: set_location_assignment PIN_<пин> -to <порт>
+    и set_instance_assignment -name IO_STANDARD "<стандарт>" -to <порт>.
+
+    Returns:
+        tuple: (порт -> пин корпуса, порт -> I/O стандарт, стандарт по
+        умолчанию из STRATIX_DEVICE_IO_STANDARD или None)
+    """
+    locations = {}
+    standards = {}
+    default = None
+    for line in lines:
+        parsed = _qsf_command(line)
+        if parsed is None:
+            continue
+        command, options, positional = parsed
+        if not positional:
+            continue
+        if command == 'set_location_assignment' and options.get('-to'):
+            location = positional[0]
+            locations[options['-to']] = location[4:] if location.upper().startswith('PIN_') else location
+        elif command == 'set_instance_assignment' and options.get('-name') == 'IO_STANDARD' and options.get('-to'):
+            standards[options['-to']] = positional[0]
+        elif command == 'set_global_assignment' and options.get('-name') == 'STRATIX_DEVICE_IO_STANDARD':
+            default = positional[0]
+    return locations, standards, default
+
+def is_reserved(record):
+    """Пин зарезервирован, питание, земля или не подключён"""
+    name = (record.get('name') or '').upper()
+    direction = (record.get('direction') or '').lower()
+    return name.startswith(RESERVED_PREFIXES) or direction in ('power', 'gnd')
+
+class PinValidator:
+    """
+    Проверка соединений до постановки компиляции в очередь.
+
+    Индекс строится из de10lite.csv, perif.csv, таблицы пинов последней
+    сборки (GreenP.pin) и назначений пинов из .qsf проекта и
+    перестраивается только при изменении этих файлов. Замечания по
+    таблице пинов - ошибки, только если место порта закреплено в .qsf:
+    иначе следующая сборка может разместить порт по-другому, и они
+    выдаются как предупреждения. Проверка списка
+    соединений - один проход; повторы, несколько источников и конфликты
+    источник/приёмник проверяются по битовым маскам ConnectionMatrix.
+    """
+
+    def __init__(self, pin_report_path, qsf_path=None):
+        self.pin_report_path = Path(pin_report_path)
+        self.qsf_path = Path(qsf_path) if qsf_path is not None else None
+        self.lock = threading.Lock()
+        self._index = None
+
+    @staticmethod
+    def _mtime(path):
+        if path is None:
+            return None
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get_index(self):
+        tables = pin_map.get()
+        version = (tables.version, self._mtime(self.pin_report_path), self._mtime(self.qsf_path))
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+        with self.lock:
+            if self._index is None or self._index.version != version:
+                records = []
+                assigned, standards, default_standard = {}, {}, None
+                if version[1] is not None:
+                    with open(self.pin_report_path, encoding='utf-8', errors='replace') as f:
+                        records = parse_pin_file(f)
+                if version[2] is not None:
+                    with open(self.qsf_path, encoding='utf-8', errors='replace') as f:
+                        assigned, standards, default_standard = parse_qsf_pins(f)
+                pins = {record['name']: record for record in records if not is_reserved(record)}
+                locations = {record['location']: record for record in records}
+                de10_index = {label: i for i, label in enumerate(tables.de10_labels)}
+                perif_index = {label: j for j, label in enumerate(tables.perif_labels)}
+                self._index = PinIndex(tables, de10_index, perif_index, pins, locations,
+                                       assigned, standards, default_standard, version)
+            return self._index
+
+    @staticmethod
+    def io_standard(index, pin):
+        """
+        I/O стандарт пина: назначение из .qsf (то, что будет в следующей
+        сборке), иначе из таблицы пинов прошлой сборки, иначе стандарт по
+        умолчанию из .qsf
+        """
+        record = index.pins.get(pin) or {}
+        return index.standards.get(pin) or record.get('io_standard') or index.default_standard
+
+    def validate(self, connections):
+        """
+        Проверяет список пар [метка DE10-Lite, метка периферии].
+
+        Ошибки: неверный формат пары, неизвестная метка, пин назначен в .qsf
+        на зарезервированное место, для закреплённых в .qsf пинов - порт
+        отсутствует в таблице пинов сборки или несовместимое направление,
+        несколько источников для одного выхода, пин одновременно источник и
+        приёмник. Предупреждения: повтор пары, разные I/O стандарты, разное
+        напряжение банков (по стандартам пинов из .qsf).
+
+        Returns:
+            dict: {'valid': bool, 'errors': [...], 'warnings': [...]}, элементы
+            вида {'index', 'code', 'message'}
+        """
+        index = self.get_index()
+        tables = index.tables
+        pins = index.pins
+        errors = []
+        warnings = []
+        # Принятые соединения: строка - метка DE10-Lite, столбец - метка периферии
+        matrix = ConnectionMatrix.for_tables(tables)
+        pair_of = {}   # (строка, столбец) -> номер пары, установившей ячейку
+
+        def problem(target, i, code, message):
+            target.append({'index': i, 'code': code, 'message': message})
+
+        def check_pin(i, pin, label, role):
+            if not pins:
+                return True
+            location = index.assigned.get(pin)
+            # Без назначения в .qsf таблица прошлой сборки ничего не гарантирует
+            target = errors if location is not None else warnings
+            if location is not None:
+                occupant = index.locations.get(location)
+                if occupant is not None and is_reserved(occupant):
+                    problem(errors, i, 'reserved_pin',
+                            f"Пин {pin} ({label}) назначен на {location}, который недоступен: {occupant['name']}")
+                    return False
+            record = pins.get(pin)
+            if record is None:
+                problem(target, i, 'unknown_location', f"Пин {pin} ({label}) отсутствует в таблице пинов сборки")
+                return target is warnings
+            direction = (record.get('direction') or '').lower()
+            if (role == 'source' and direction == 'output') or (role == 'target' and direction == 'input'):
+                problem(target, i, 'direction', f"Пин {pin} ({label}) имеет направление {direction}")
+                return target is warnings
+            return True
+
+        for i, pair in enumerate(connections):
+            if not isinstance(pair, (list, tuple)) or len(pair) != 2 or not all(isinstance(p, str) for p in pair):
+                problem(errors, i, 'malformed', "Соединение должно быть парой имён пинов")
+                continue
+            left, right = pair
+            row = index.de10_index.get(left)
+            col = index.perif_index.get(right)
+            if row is None:
+                problem(errors, i, 'unknown_pin', f"Неизвестный пин DE10-Lite: {left}")
+            if col is None:
+                problem(errors, i, 'unknown_pin', f"Неизвестный пин периферии: {right}")
+            if row is None or col is None:
+                continue
+            source = tables.de10_to_cyclone[left]
+            target = tables.perif_to_cyclone[right]
+            if not (check_pin(i, source, left, 'source') & check_pin(i, target, right, 'target')):
+                continue
+
+            drivers = matrix.cols[col]
+            if drivers:
+                driver = (drivers & -drivers).bit_length() - 1
+                if driver == row:
+                    problem(warnings, i, 'duplicate', f"Соединение {left} -> {right} повторяется (пара {pair_of[row, col]})")
+                else:
+                    problem(errors, i, 'multiple_drivers',
+                            f"Выход {right} ({target}) уже подключён в паре {pair_of[driver, col]}")
+                continue
+            # Тот же пин CycloneIV может быть и в de10lite.csv, и в perif.csv
+            target_row = index.de10_index.get(tables.cyclone_to_de10.get(target))
+            if target_row is not None and matrix.rows[target_row]:
+                first = min(pair_of[target_row, j] for j in matrix.row(target_row))
+                problem(errors, i, 'conflict', f"Пин {target} ({right}) уже используется как источник в паре {first}")
+                continue
+            source_col = index.perif_index.get(tables.cyclone_to_perif.get(source))
+            if source_col is not None and matrix.cols[source_col]:
+                first = pair_of[matrix.column(source_col)[0], source_col]
+                problem(errors, i, 'conflict', f"Пин {source} ({left}) уже используется как приёмник в паре {first}")
+                continue
+            matrix.set(row, col)
+            pair_of[row, col] = i
+
+            source_standard = self.io_standard(index, source)
+            target_standard = self.io_standard(index, target)
+            if source_standard and target_standard and source_standard != target_standard:
+                problem(warnings, i, 'io_standard',
+                        f"Разные I/O стандарты: {source} {source_standard}, {target} {target_standard}")
+            # Напряжение банка (VCCIO) задаётся стандартами его пинов
+            source_voltage, target_voltage = io_voltage(source_standard), io_voltage(target_standard)
+            if source_voltage and target_voltage and source_voltage != target_voltage:
+                source_bank = (pins.get(source) or {}).get('bank') or '?'
+                target_bank = (pins.get(target) or {}).get('bank') or '?'
+                problem(warnings, i, 'bank_voltage',
+                        f"Банки {source_bank} и {target_bank} с разным напряжением: "
+                        f"{source} {source_voltage} В, {target} {target_voltage} В")
+
+        return {'valid': not errors, 'errors': errors, 'warnings': warnings}
+
+    def check(self, connections):
+        """Как validate, но при ошибках выбрасывает InvalidConnections"""
+        report = self.validate(connections)
+        if not report['valid']:
+            raise InvalidConnections(report)
+        return report
+
+# Глобальный экземпляр для платы Green
+pin_validator = PinValidator(
+    Path(BOARDS['green']['dir']) / "output_files" / f"{BOARDS['green']['project']}.pin",
+    Path(BOARDS['green']['dir']) / f"{BOARDS['green']['project']}.qsf",
+)
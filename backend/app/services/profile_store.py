@@ -0,0 +1,221 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from app.config.quartus_config import DATA_FILES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    board TEXT NOT NULL,
+    name TEXT NOT NULL,
+    owner TEXT,
+    version INTEGER NOT NULL,
+    connections TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (board, name)
+);
+CREATE INDEX IF NOT EXISTS profiles_name ON profiles (name);
+CREATE INDEX IF NOT EXISTS profiles_owner ON profiles (owner);
+CREATE TABLE IF NOT EXISTS profile_history (
+    profile_id INTEGER NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    connections TEXT NOT NULL,
+    owner TEXT,
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (profile_id, version)
+);
+"""
+
+class ProfileConflict(Exception):
+    """Профиль изменён с момента, когда клиент его прочитал"""
+
+    def __init__(self, current_version):
+        super().__init__(f"Profile version is {current_version}")
+        self.current_version = current_version
+
+def normalize_connections(connections):
+    """
+    Приводит соединения к единому формату - списку пар [метка DE10-Lite,
+    метка периферии]. Другие формы (словарь ячеек матрицы) не принимаются.
+    """
+    if not isinstance(connections, list):
+        raise ValueError("Connections must be a list of [left_pin, right_pin] pairs")
+    pairs = []
+    for pair in connections:
+        if not isinstance(pair, (list, tuple)) or len(pair) != 2 or not all(isinstance(p, str) for p in pair):
+            raise ValueError("Each connection must be a pair of pin names")
+        pairs.append([pair[0], pair[1]])
+    return pairs
+
+class ProfileStore:
+    """
+    Именованные профили соединений по платам (стендам) с историей версий.
+
+    Хранятся во встроенной базе SQLite в режиме WAL: читатели не блокируют
+    писателя, поэтому несколько стендов работают одновременно. У каждого
+    потока своё соединение. Каждое сохранение профиля увеличивает его версию
+    и добавляет запись в историю.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.local = threading.local()
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            with self.schema_lock:
+                if not self.schema_ready:
+                    conn.executescript(_SCHEMA)
+                    self.schema_ready = True
+            self.local.conn = conn
+        return conn
+
+    def _profile_dict(self, row, with_connections=True):
+        profile = {
+            'board': row['board'],
+            'name': row['name'],
+            'owner': row['owner'],
+            'version': row['version'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
+        if with_connections:
+            profile['connections'] = json.loads(row['connections'])
+        return profile
+
+    def list_profiles(self, board=None, owner=None):
+        """Профили без соединений, отсортированные по плате и имени"""
+        query = "SELECT board, name, owner, version, created_at, updated_at FROM profiles"
+        conditions, params = [], []
+        if board:
+            conditions.append("board = ?")
+            params.append(board)
+        if owner:
+            conditions.append("owner = ?")
+            params.append(owner)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY board, name"
+        return [self._profile_dict(row, with_connections=False)
+                for row in self._connect().execute(query, params)]
+
+    def get(self, board, name, version=None):
+        """Профиль (или его версия из истории) либо None"""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM profiles WHERE board = ? AND name = ?", (board, name)).fetchone()
+        if row is None:
+            return None
+        profile = self._profile_dict(row)
+        if version is not None and version != row['version']:
+            old = conn.execute(
+                "SELECT version, connections, owner, saved_at FROM profile_history "
+                "WHERE profile_id = ? AND version = ?", (row['id'], version)).fetchone()
+            if old is None:
+                return None
+            profile.update(version=old['version'], owner=old['owner'],
+                           updated_at=old['saved_at'], connections=json.loads(old['connections']))
+        return profile
+
+    def _save(self, conn, board, name, connections, owner, expected_version, now):
+        row = conn.execute("SELECT id, version FROM profiles WHERE board = ? AND name = ?",
+                           (board, name)).fetchone()
+        current = row['version'] if row is not None else 0
+        if expected_version is not None and expected_version != current:
+            raise ProfileConflict(current)
+        text = json.dumps(normalize_connections(connections))
+        if row is None:
+            profile_id = conn.execute(
+                "INSERT INTO profiles (board, name, owner, version, connections, created_at, updated_at) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?)", (board, name, owner, text, now, now)).lastrowid
+        else:
+            profile_id = row['id']
+            conn.execute(
+                "UPDATE profiles SET owner = COALESCE(?, owner), version = ?, connections = ?, updated_at = ? "
+                "WHERE id = ?", (owner, current + 1, text, now, profile_id))
+        conn.execute(
+            "INSERT INTO profile_history (profile_id, version, connections, owner, saved_at) "
+            "VALUES (?, ?, ?, ?, ?)", (profile_id, current + 1, text, owner, now))
+        return current + 1
+
+    def save(self, board, name, connections, owner=None, expected_version=None):
+        """
+        Сохраняет профиль новой версией. expected_version - версия, которую
+        видел клиент (0 - профиль ещё не существует); при расхождении
+        выбрасывается ProfileConflict.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._save(conn, board, name, connections, owner, expected_version, time.time())
+        return self.get(board, name)
+
+    def delete(self, board, name):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM profiles WHERE board = ? AND name = ?", (board, name))
+        return cursor.rowcount > 0
+
+    def history(self, board, name, limit=50):
+        """Версии профиля, новые первыми, или None, если профиля нет"""
+        conn = self._connect()
+        row = conn.execute("SELECT id FROM profiles WHERE board = ? AND name = ?", (board, name)).fetchone()
+        if row is None:
+            return None
+        return [
+            {'version': r['version'], 'owner': r['owner'], 'saved_at': r['saved_at'],
+             'connection_count': len(json.loads(r['connections']))}
+            for r in conn.execute(
+                "SELECT version, owner, saved_at, connections FROM profile_history "
+                "WHERE profile_id = ? ORDER BY version DESC LIMIT ?", (row['id'], limit))
+        ]
+
+    def export_profiles(self, board=None):
+        """Все профили (текущие версии) с соединениями"""
+        query = "SELECT * FROM profiles"
+        params = []
+        if board:
+            query += " WHERE board = ?"
+            params.append(board)
+        query += " ORDER BY board, name"
+        return [self._profile_dict(row) for row in self._connect().execute(query, params)]
+
+    def import_profiles(self, profiles, replace=False):
+        """
+        Импортирует список профилей одной транзакцией. Существующие профили
+        получают новую версию; без replace они пропускаются.
+
+        Returns:
+            dict: {'imported': N, 'skipped': N}
+        """
+        imported = skipped = 0
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for item in profiles:
+                if not isinstance(item, dict) or not item.get('board') or not item.get('name'):
+                    raise ValueError("Each profile needs 'board' and 'name'")
+                exists = conn.execute("SELECT 1 FROM profiles WHERE board = ? AND name = ?",
+                                      (item['board'], item['name'])).fetchone()
+                if exists and not replace:
+                    skipped += 1
+                    continue
+                self._save(conn, item['board'], item['name'], item.get('connections', []),
+                           item.get('owner'), None, now)
+                imported += 1
+        return {'imported': imported, 'skipped': skipped}
+
+# Глобальный экземпляр хранилища
+profile_store = ProfileStore(DATA_FILES['profiles_db'])
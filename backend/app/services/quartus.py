@@ -2,72 +2,73 @@ import subprocess
 import argparse
 import sys
 import os.path
+import time
 from pathlib import Path
+from app.config.quartus_config import QUARTUS_BIN_DIR, BOARDS, COMPILE, QUARTUS_TCL, WORKSPACES
+from app.services.bitstream_cache import bitstream_cache
+from app.services.build_store import build_store
+from app.services import compile_planner
+from app.services.pin_config import load_config
+from app.services.quartus_log import run_streaming, parse_message
+from app.services.tcl_shell import tcl_pool, TclError, TclSessionError
+from app.services.jtag_registry import get_registry, cable_slot
+from app.services.verilog_generator import generate_verilog, write_atomic
+from app.services.workspaces import workspace_manager
+from app.services.single_flight import SingleFlight
+from app.services.jobs import JobCancelled, Suspended
+from app.services.board_scheduler import board_scheduler, WAITING, CANCELLED
 
-def compile_quartus_project(quartus_sh_path, quartus_qpf_path, quartus_qsf_path):
-    # Формируем команду без перенаправления вывода и с корректными параметрами
-    command = f'{quartus_sh_path} --flow compile "{quartus_qpf_path}" -c "{quartus_qsf_path}"'
+# Одинаковые одновременные сборки выполняются один раз; если задачу,
+# которая собирает, отменили, ожидающие запускают сборку сами
+compile_flights = SingleFlight(retry_errors=(JobCancelled,))
+
+def compile_quartus_project(quartus_sh_path, quartus_qpf_path, quartus_qsf_path, on_line=None, cancel_event=None):
+    # Вывод компилятора читается построчно и передаётся в on_line, а не копится в памяти
+    command = [quartus_sh_path, '--flow', 'compile', quartus_qpf_path, '-c', quartus_qsf_path]
     
     print("Проект ПЛИС компилируется")
-    project_compilation_process = subprocess.run(
-        command, 
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE, 
-        shell=True,
-        text=True
-    )
+    returncode, counts = run_streaming(command, on_line=on_line, cancel_event=cancel_event)
     print("Компиляция окончена")
+    print(f"Сообщения: {counts['error']} ошибок, {counts['critical_warning']} критических "
+          f"предупреждений, {counts['warning']} предупреждений")
     print()
     
-    if project_compilation_process.returncode == 0:
+    if returncode == 0:
         f = 1
     else:
         f = 0
     return f
 
-def load_sof_to_fpga(port, quartus_pgm_path, quartus_sof_path):
-    find_connected_fpga = subprocess.run(
-        quartus_pgm_path + " -l", stdout=subprocess.PIPE, 
-        stderr=subprocess.PIPE, shell=True, text=True
-        )
-    
-    # print(find_connected_fpga.returncode) # флаг успешного выполнения команды
-    # print(find_connected_fpga.stdout) # Вывод консоли
-    
-    
-    #find_connected_fpga.stdout.split()[2]
-    # port = "[1-1.5]"
+def _print_line(line, event):
+    print(line)
+
+def load_sof_to_fpga(port, quartus_pgm_path, quartus_sof_path, on_line=None, cancel_event=None):
+    # Кабели и цепочки устройств берутся из кэша реестра, а не запуском
+    # quartus_pgm -l и -a перед каждой прошивкой
+    registry = get_registry(quartus_pgm_path)
+    devices = registry.chain(port)
+    if devices is None:
+        registry.invalidate()
+        raise IOError(f"Плата ПЛИС не найдена на кабеле {port}")
     print('Найдена плата ПЛИС, порт подключения:', port)
-    
-    if not find_connected_fpga:
-        raise IOError("Плата ПЛИС не найдена")
-    
-    fpga_cores = subprocess.run(
-        f'{quartus_pgm_path} -c "{port}" -a', 
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-        shell=True, text=True
-        )
-
-    # Отделяем от всего вывода консоли информацию о подключенных устройствах
-    #print(fpga_cores.stdout.split('Info')[0].split('\n'))
-    fpga_n_cores = [item for item in fpga_cores.stdout.split('Info')[0].split('\n') if item != '' ]
-    cores_cnt = len(fpga_n_cores) - 1
+
+    cores_cnt = len(devices)
     print('Число ядер у платы ПЛИС:', cores_cnt)
     
     print('Начинается прошивка платы ПЛИС')
     if cores_cnt == 1:
-        result = subprocess.run(
-            f'{quartus_pgm_path} -m JTAG -c "{port}" -o "p;{quartus_sof_path}"',
-            stdin=subprocess.PIPE, stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE, shell=True, text=True
-            )
-        print("STDOUT: ", result.stdout, '\n')
-        print("STDERR: ", result.stderr, '\n')
-        if result.returncode == 0:
+        with cable_slot(port):
+            returncode, _ = run_streaming(
+                [quartus_pgm_path, '-m', 'JTAG', '-c', port, '-o', f'p;{quartus_sof_path}'],
+                on_line=on_line or _print_line, cancel_event=cancel_event
+                )
+        if returncode == 0:
             print('Плата ПЛИС успешно прошита')
             f = 1
         else:
             print('Не удалось прошить плату ПЛИС')
+            # Плату могли переподключить - при следующей попытке обнаружим заново
+            registry.invalidate()
             f = 0
         print()
     else:
@@ -75,43 +76,344 @@ def load_sof_to_fpga(port, quartus_pgm_path, quartus_sof_path):
         
     return f
 
-def compile_project(project_name, project_dir, quartus_dir):
+def _job_stream(job):
+    """Обработчик строк вывода и флаг отмены для фоновой задачи"""
+    if job is None:
+        return None, None
+    return job.log, job.cancel_event
+
+def compile_project(project_name, project_dir, quartus_dir, job=None):
     quartus_sh = quartus_dir / "quartus_sh"
     quartus_qpf = project_dir / f"{project_name}.qpf"
     quartus_qsf = project_dir / f"{project_name}.qsf"
-    if not compile_quartus_project(str(quartus_sh), str(quartus_qpf), str(quartus_qsf)):
+    on_line, cancel_event = _job_stream(job)
+    ok = compile_quartus_project(str(quartus_sh), str(quartus_qpf), str(quartus_qsf),
+                                 on_line=on_line, cancel_event=cancel_event)
+    if job is not None:
+        job.check_cancelled()
+    if not ok:
         print("Компиляция проекта не удалась. Выход.")
         return 1
     print("\n=== Компиляция успешно завершена! ===")
     return 0
 
-def program_fpga(port, project_name, project_dir, quartus_dir, sof_path=None):
+def program_fpga(port, project_name, project_dir, quartus_dir, sof_path=None, job=None):
     quartus_pgm = quartus_dir / "quartus_pgm"
     if sof_path is None:
         quartus_sof = project_dir / "output_files" / f"{project_name}.sof"
     else:
         quartus_sof = Path(sof_path)
     print("\nШаг: Прошивка FPGA")
-    if not load_sof_to_fpga(port, str(quartus_pgm), str(quartus_sof)):
+    on_line, cancel_event = _job_stream(job)
+    ok = load_sof_to_fpga(port, str(quartus_pgm), str(quartus_sof), on_line=on_line, cancel_event=cancel_event)
+    if job is not None:
+        job.check_cancelled()
+    if not ok:
         print("Прошивка FPGA не удалась. Выход.")
         return 1
     print("\n=== Прошивка успешно завершена! ===")
     return 0
 
-def program_green():
-    port_green = "USB-Blaster [2-1.5]"
-    project_name_green = "GreenP"
-    project_dir_green = Path("/home/amur/project_2161/backend/app/data/2161_Green")
-    quartus_dir = Path("/home/amur/intelFPGA_lite/20.1/quartus/bin")
-    # Сначала компиляция, потом прошивка
-    if compile_project(project_name_green, project_dir_green, quartus_dir) != 0:
+def _set_stage(job, stage, progress):
+    """Отмечает этап фоновой задачи, если функция вызвана из очереди задач"""
+    if job is not None:
+        job.set_stage(stage, progress)
+
+def _stage_command(stage, quartus_dir, project_name):
+    """Команда отдельного этапа Quartus (как в отчёте .flow.rpt)"""
+    if stage == 'map':
+        return [quartus_dir / "quartus_map", '--read_settings_files=on', '--write_settings_files=off',
+                project_name, '-c', project_name]
+    if stage == 'sta':
+        return [quartus_dir / "quartus_sta", project_name, '-c', project_name]
+    if stage == 'recompile':
+        # Rapid Recompile: размещение берётся из прошлой компиляции
+        return [quartus_dir / "quartus_sh", '--flow', 'recompile', project_name, '-c', project_name]
+    return [quartus_dir / f"quartus_{stage}", '--read_settings_files=off', '--write_settings_files=off',
+            project_name, '-c', project_name]
+
+def _stage_script(stage, project_name, project_dir):
+    """Tcl скрипт этапа для сессии quartus_sh -s; проект закрывается и при ошибке"""
+    if stage == 'flow':
+        action = "execute_flow -compile"
+    elif stage == 'recompile':
+        action = "execute_flow -recompile"
+    elif stage == 'sta':
+        action = "execute_module -tool sta"
+    else:
+        settings = 'on' if stage == 'map' else 'off'
+        action = (f'execute_module -tool {stage} '
+                  f'-args "--read_settings_files={settings} --write_settings_files=off"')
+    return (
+        f"cd {{{project_dir}}}\n"
+        "load_package flow\n"
+        f"project_open -force -revision {project_name} {project_name}\n"
+        f"set stage_rc [catch {{{action}}} stage_err]\n"
+        "project_close\n"
+        "if {$stage_rc} {error $stage_err}"
+    )
+
+def run_stage_tcl(stage, project_name, project_dir, on_line=None, cancel_event=None):
+    """
+    Выполняет этап компиляции в сессии из пула quartus_sh -s.
+    Вывод разбирается так же, как при запуске отдельного процесса.
+
+    Returns:
+        int: 0 при успехе, 1 при ошибке
+    """
+    def forward(line):
+        event = parse_message(line)
+        if on_line is not None:
+            on_line(line, event)
+        else:
+            print(line)
+
+    try:
+        tcl_pool.execute(_stage_script(stage, project_name, project_dir), on_line=forward,
+                         timeout=QUARTUS_TCL['command_timeout'], cancel_event=cancel_event)
+        return 0
+    except TclError as e:
+        print(f"Этап {stage} завершился с ошибкой: {e}")
+    except (OSError, TclSessionError) as e:
+        print(f"Сессия quartus_sh недоступна: {e}")
+    return 1
+
+def run_compile_plan(plan, project_name, project_dir, quartus_dir, job=None):
+    """
+    Выполняет этапы плана компиляции.
+
+    Returns:
+        tuple: (успех, время каждого этапа в секундах)
+    """
+    timings = {}
+    on_line, cancel_event = _job_stream(job)
+    for stage in plan.stages:
+        ok = _run_stage(stage, project_name, project_dir, quartus_dir, timings, job, on_line, cancel_event)
+        if not ok and stage == 'recompile':
+            # Rapid Recompile поддерживается не для всех семейств ПЛИС и не
+            # после любой прошлой сборки - тогда полная компиляция
+            print("Rapid Recompile не удался, выполняется полная компиляция")
+            ok = _run_stage('flow', project_name, project_dir, quartus_dir, timings, job, on_line, cancel_event)
+        if not ok:
+            return False, timings
+    return True, timings
+
+def _run_stage(stage, project_name, project_dir, quartus_dir, timings, job, on_line, cancel_event):
+    """Запускает один этап и записывает его время в timings; True при успехе"""
+    started = time.perf_counter()
+    if QUARTUS_TCL['enabled']:
+        print(f"Этап {stage} (Tcl)")
+        ok = run_stage_tcl(stage, project_name, project_dir,
+                           on_line=on_line, cancel_event=cancel_event) == 0
+        if job is not None:
+            job.check_cancelled()
+    elif stage == 'flow':
+        ok = compile_project(project_name, project_dir, quartus_dir, job=job) == 0
+    else:
+        print(f"Этап {stage}")
+        returncode, _ = run_streaming(_stage_command(stage, quartus_dir, project_name),
+                                      on_line=on_line, cancel_event=cancel_event, cwd=project_dir)
+        if job is not None:
+            job.check_cancelled()
+        ok = returncode == 0
+    timings[stage] = round(time.perf_counter() - started, 3)
+    if job is not None:
+        job.log(f"Этап {stage}: {timings[stage]:.1f} с")
+    if not ok:
+        print(f"Этап {stage} завершился с ошибкой")
+    return ok
+
+def record_reports(build_id, project_name, report_dir):
+    """Сохраняет разобранные отчёты сборки; ошибка разбора не мешает прошивке"""
+    try:
+        build_store.ingest(build_id, project_name, report_dir)
+    except Exception as e:
+        print(f"Не удалось сохранить отчёты сборки {build_id[:12]}: {e}")
+
+def ready_sof(plan, project_name, project_dir):
+    """Прошивка для планов cached/reuse без компиляции"""
+    if plan.mode == compile_planner.CACHED:
+        print(f"Найдена сохранённая прошивка {plan.key[:12]}, компиляция пропущена")
+        if not build_store.has(plan.key):
+            record_reports(plan.key, project_name, plan.sof_path.parent)
+        return plan.sof_path
+    output_dir = Path(project_dir) / "output_files"
+    record_reports(plan.key, project_name, output_dir)
+    return bitstream_cache.store(plan.key, plan.sof_path, report_dir=output_dir)
+
+def plan_options(project_name):
+    """Настройки плана компиляции из COMPILE и ПЛИС платы проекта из BOARDS"""
+    device = next((board.get('device') for board in BOARDS.values() if board['project'] == project_name), None)
+    return {
+        'skip_sta': COMPILE['skip_sta'],
+        'incremental': COMPILE['incremental'],
+        'device': device,
+        'recompile_families': COMPILE['rapid_recompile_families'],
+    }
+
+def compile_project_cached(project_name, project_dir, quartus_dir, connections, job=None, promote_to=None):
+    """
+    Получает .sof самым дешёвым способом (см. compile_planner.plan_compile):
+    из кэша, из результатов прошлой сборки, поэтапной или полной компиляцией.
+    promote_to - директория проекта, в которую после компиляции возвращаются
+    db/ и output_files/ (если project_dir - рабочая директория задачи).
+    Возвращает путь к .sof или None при ошибке.
+    """
+    plan = compile_planner.plan_compile(project_dir, project_name, connections,
+                                        **plan_options(project_name))
+    print(f"План компиляции: {plan.mode} ({plan.reason})")
+    if job is not None:
+        job.log(f"План компиляции: {plan.mode} ({plan.reason})")
+    output_dir = project_dir / "output_files"
+    if plan.mode in (compile_planner.CACHED, compile_planner.REUSE):
+        return ready_sof(plan, project_name, project_dir)
+
+    _set_stage(job, 'compile', 10)
+    ok, timings = run_compile_plan(plan, project_name, project_dir, quartus_dir, job=job)
+    if not ok:
+        return None
+    recompile_supported = None
+    if 'recompile' in plan.stages:
+        # Если после recompile понадобилась полная компиляция, он не поддерживается
+        recompile_supported = 'flow' not in timings
+    compile_planner.record_build(project_dir, plan, timings, recompile_supported)
+    print("Время этапов компиляции: " + ", ".join(f"{k}={v:.1f} с" for k, v in timings.items()))
+    record_reports(plan.key, project_name, output_dir)
+    sof_path = bitstream_cache.store(plan.key, output_dir / f"{project_name}.sof", report_dir=output_dir)
+    if promote_to is not None:
+        workspace_manager.promote(project_dir, promote_to)
+    return sof_path
+
+def compile_in_workspace(project_name, project_dir, quartus_dir, connections, job=None):
+    """
+    Компилирует проект в отдельной рабочей директории задачи: исходник
+    генерируется по снимку соединений в копию, общий GreenP.v и db/ не
+    трогаются до успешного завершения сборки.
+
+    Сначала план строится по проекту и исходнику, который получится из
+    соединений: если прошивка есть в кэше или в output_files проекта,
+    рабочая директория не создаётся.
+    """
+    verilog_text = generate_verilog(connections, write=False)
+    with workspace_manager.project_lock(project_dir):
+        plan = compile_planner.plan_compile(project_dir, project_name, connections,
+                                            verilog_text=verilog_text, **plan_options(project_name))
+        if plan.mode in (compile_planner.CACHED, compile_planner.REUSE):
+            print(f"План компиляции: {plan.mode} ({plan.reason})")
+            if job is not None:
+                job.log(f"План компиляции: {plan.mode} ({plan.reason})")
+            return ready_sof(plan, project_name, project_dir)
+
+    workspace = workspace_manager.create(project_dir, label=job.id[:12] if job is not None else None)
+    try:
+        write_atomic(workspace / f"{project_name}.v", verilog_text)
+        return compile_project_cached(project_name, workspace, quartus_dir, connections,
+                                      job=job, promote_to=project_dir)
+    finally:
+        workspace_manager.release(workspace)
+
+def compile_in_place(project_name, project_dir, quartus_dir, connections, job=None):
+    """Компиляция прямо в директории проекта под её блокировкой (без рабочих директорий)"""
+    with workspace_manager.project_lock(project_dir):
+        return compile_project_cached(project_name, project_dir, quartus_dir, connections, job=job)
+
+def compile_coalesced(project_name, project_dir, quartus_dir, connections, job=None):
+    """
+    Компиляция с объединением одинаковых запросов: если такой же набор
+    соединений уже собирается, задача ждёт ту сборку и получает её .sof.
+    """
+    compile_fn = compile_in_workspace if WORKSPACES['enabled'] else compile_in_place
+    key = compile_planner.flight_key(project_dir, project_name, connections)
+
+    def joined(flight):
+        message = f"Такая же сборка уже выполняется ({flight.waiters} ожидающих), ждём её результат"
+        print(message)
+        if job is not None:
+            job.log(message)
+            _set_stage(job, 'compile', 10)
+
+    sof_path, shared = compile_flights.do(
+        key, lambda: compile_fn(project_name, project_dir, quartus_dir, connections, job=job),
+        on_wait=joined, poll=job.check_cancelled if job is not None else None)
+    if shared and job is not None:
+        job.log("Получен результат сборки другой задачи" if sof_path else "Сборка другой задачи не удалась")
+    return sof_path
+
+def resolve_board_port(board, quartus_dir):
+    """Кабель платы по её ПЛИС в обнаруженных JTAG цепочках, иначе кабель из настроек"""
+    registry = get_registry(quartus_dir / "quartus_pgm")
+    return registry.resolve(device=board.get('device'), preferred=board['port'])
+
+def describe_wait(board_name, info):
+    """Сообщение о месте заявки в очереди платы"""
+    return (f"Плата {board_name} занята: место в очереди {info.get('position')}, "
+            f"ожидание около {info.get('estimated_wait', 0):.0f} с")
+
+def _program_leased(board_name, project_name, project_dir, quartus_dir, sof_path, job, owner, priority, progress):
+    """
+    Прошивка после выдачи платы планировщиком; кабель определяется, когда
+    плата уже выдана. Задача очереди на время ожидания платы
+    приостанавливается (Suspended) и не занимает поток пула; без задачи
+    вызов ждёт выдачи платы на месте.
+    """
+    owner = owner or 'anonymous'
+
+    def program():
+        port = resolve_board_port(BOARDS[board_name], quartus_dir)
+        _set_stage(job, 'program', progress)
+        return program_fpga(port, project_name, project_dir, quartus_dir, sof_path=sof_path, job=job)
+
+    _set_stage(job, 'wait_board', progress)
+    if job is None:
+        def queued(info):
+            print(describe_wait(board_name, info))
+
+        with board_scheduler.lease(board_name, owner, priority, on_wait=queued):
+            return program()
+
+    lease = board_scheduler.request(board_name, owner, priority, job_id=job.id,
+                                    on_grant=lambda lease: job.wake())
+
+    def cancel():
+        board_scheduler.release(lease.id, state=CANCELLED)
+
+    def run(job):
+        info = board_scheduler.get_lease(lease.id)
+        if info is not None and info['state'] == WAITING:
+            raise Suspended(run, on_cancel=cancel)
+        try:
+            job.check_cancelled()
+            # Плата могла истечь, пока продолжение стояло в очереди
+            board_scheduler.renew(lease.id)
+            return program()
+        finally:
+            board_scheduler.release(lease.id)
+
+    info = board_scheduler.get_lease(lease.id)
+    if info is not None and info['state'] == WAITING:
+        message = describe_wait(board_name, info)
+        print(message)
+        job.log(message)
+    return run(job)
+
+def program_green(job=None, owner=None, priority=0):
+    board = BOARDS['green']
+    quartus_dir = Path(QUARTUS_BIN_DIR)
+    project_name_green = board['project']
+    project_dir_green = Path(board['dir'])
+    connections = load_config().get('connections', [])
+    # Сначала компиляция (или готовая прошивка из кэша), потом прошивка
+    sof_path = compile_coalesced(project_name_green, project_dir_green, quartus_dir, connections, job=job)
+    if sof_path is None:
         return 1
-    return program_fpga(port_green, project_name_green, project_dir_green, quartus_dir)
+    return _program_leased('green', project_name_green, project_dir_green, quartus_dir, sof_path,
+                           job, owner, priority, 80)
 
-def program_de10(sof_path=None):
-    port_de10 = "USB-Blaster [2-1.6]"
-    project_name_de10 = "De10P"
-    project_dir_de10 = Path("/home/amur/project_2161/backend/app/data/2161_De10")
-    quartus_dir = Path("/home/amur/intelFPGA_lite/20.1/quartus/bin")
+def program_de10(sof_path=None, job=None, owner=None, priority=0):
+    board = BOARDS['de10']
+    quartus_dir = Path(QUARTUS_BIN_DIR)
+    project_name_de10 = board['project']
+    project_dir_de10 = Path(board['dir'])
     # Только прошивка, без компиляции
-    return program_fpga(port_de10, project_name_de10, project_dir_de10, quartus_dir, sof_path=sof_path)
\ No newline at end of file
+    return _program_leased('de10', project_name_de10, project_dir_de10, quartus_dir, sof_path,
+                           job, owner, priority, 10)
@@ -0,0 +1,99 @@
+import os
+import re
+import signal
+import subprocess
+import threading
+
+# Строки сообщений Quartus вида "Info (12021): Found 1 design units",
+# "Critical Warning (332012): ..." или "Error: Quartus Prime ... was unsuccessful"
+_MESSAGE_RE = re.compile(
+    r'^\s*(?P<level>Info|Extra Info|Warning|Critical Warning|Error)'
+    r'(?:\s*\((?P<id>\d+)\))?:\s?(?P<text>.*)$'
+)
+
+def parse_message(line):
+    """
+    Разбирает строку вывода Quartus в структурированное событие.
+
+    Returns:
+        dict: {'level', 'id', 'text'}, где level - info/warning/critical_warning/error,
+        id - номер сообщения Quartus или None. Для строк, не являющихся
+        сообщениями Quartus, level равен 'output'.
+    """
+    line = line.rstrip('\r\n')
+    m = _MESSAGE_RE.match(line)
+    if not m:
+        return {'level': 'output', 'id': None, 'text': line}
+    level = m.group('level').lower().replace(' ', '_')
+    if level == 'extra_info':
+        level = 'info'
+    msg_id = m.group('id')
+    return {'level': level, 'id': int(msg_id) if msg_id else None, 'text': m.group('text')}
+
+def run_streaming(command, on_line=None, cancel_event=None, cwd=None):
+    """
+    Запускает процесс и читает его вывод построчно по мере поступления.
+
+    Вывод целиком в памяти не хранится: каждая строка сразу передаётся в
+    on_line(line, event), где event - результат parse_message. При установке
+    cancel_event группа процессов завершается.
+
+    Args:
+        command (list): команда и аргументы
+        on_line (callable, optional): обработчик строк вывода
+        cancel_event (threading.Event, optional): флаг отмены
+        cwd: рабочая директория процесса
+
+    Returns:
+        tuple: (код возврата, счётчики сообщений по уровням)
+    """
+    counts = {'info': 0, 'warning': 0, 'critical_warning': 0, 'error': 0}
+    process = subprocess.Popen(
+        [str(part) for part in command],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        errors='replace',
+        bufsize=1,
+        cwd=cwd,
+        start_new_session=True,
+    )
+
+    watcher = None
+    if cancel_event is not None:
+        def watch():
+            while process.poll() is None:
+                if cancel_event.wait(0.2):
+                    _terminate(process)
+                    return
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+
+    try:
+        for line in process.stdout:
+            event = parse_message(line)
+            if event['level'] in counts:
+                counts[event['level']] += 1
+            if on_line is not None:
+                on_line(line.rstrip('\r\n'), event)
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+        if watcher is not None:
+            watcher.join(timeout=1)
+    return returncode, counts
+
+def _terminate(process):
+    """Завершает процесс вместе с дочерними (Quartus порождает свои подпроцессы)"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
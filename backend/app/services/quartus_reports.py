@@ -0,0 +1,215 @@
+import re
+from pathlib import Path
+
+# Строка таблицы отчёта: "; ячейка ; ячейка ;"
+_BORDER_RE = re.compile(r'^(\+-[-+]*|-{3,})$')
+# "71 / 180 ( 39 % )" или "0 / 6,272 ( 0 % )"
+_USAGE_RE = re.compile(r'^\s*([\d,]+)\s*/\s*([\d,]+)\s*\(\s*<?\s*([\d.]+)\s*%\s*\)')
+# "250.0 MHz"
+_MHZ_RE = re.compile(r'^\s*([\d.]+)\s*MHz')
+# "Slow 1200mV 85C Model Setup Summary"
+_CORNER_TABLE_RE = re.compile(r'^(?P<corner>.+?) Model (?P<analysis>.+?) Summary$')
+
+def _cells(line):
+    return [cell.strip() for cell in line.strip()[1:-1].split(';')]
+
+def iter_tables(lines):
+    """
+    Потоковый разбор таблиц текстового отчёта Quartus (.rpt).
+
+    Читает строки по одной и выдаёт кортежи (title, header, rows) для каждой
+    таблицы. header - список названий столбцов или None для таблиц
+    "ключ ; значение"; rows - списки ячеек. Разделы без таблицы
+    ("No paths to report.") выдаются с пустым rows.
+    """
+    block = []
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        stripped = line.strip()
+        if stripped.startswith(';') or _BORDER_RE.match(stripped):
+            block.append(stripped)
+            continue
+        if block:
+            table = _parse_block(block)
+            if table is not None:
+                yield table
+            block = []
+    if block:
+        table = _parse_block(block)
+        if table is not None:
+            yield table
+
+def _parse_block(block):
+    """Раскладывает блок строк таблицы на группы строк между рамками"""
+    groups = [[]]
+    for line in block:
+        if line.startswith(';'):
+            groups[-1].append(_cells(line))
+        elif groups[-1]:
+            groups.append([])
+    groups = [group for group in groups if group]
+    if not groups or len(groups[0]) != 1 or len(groups[0][0]) != 1:
+        return None
+    title = groups[0][0][0]
+    if len(groups) == 1:
+        return title, None, []
+    if len(groups) >= 3 and len(groups[1]) == 1:
+        return title, groups[1][0], [row for group in groups[2:] for row in group]
+    return title, None, [row for group in groups[1:] for row in group]
+
+def parse_usage(value):
+    """Разбирает "used / available ( percent % )" в словарь или None"""
+    m = _USAGE_RE.match(value or '')
+    if not m:
+        return None
+    used, available, percent = m.groups()
+    return {
+        'used': int(used.replace(',', '')),
+        'available': int(available.replace(',', '')),
+        'percent': float(percent),
+    }
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_summary(lines, title_suffix):
+    """
+    Таблица "ключ ; значение" с заголовком, оканчивающимся на title_suffix
+    (например 'Flow Summary', 'Fitter Summary', 'Analysis & Synthesis Summary').
+    """
+    for title, header, rows in iter_tables(lines):
+        if title.endswith(title_suffix) and header is None:
+            return {row[0]: row[1] for row in rows if len(row) >= 2 and row[0]}
+    return {}
+
+def parse_fit_report(lines):
+    """
+    Использование ресурсов из .fit.rpt.
+
+    Returns:
+        dict: {'summary': {...}, 'resources': [{'name', 'value', 'used', 'available', 'percent'}]}
+    """
+    summary = {}
+    resources = []
+    for title, header, rows in iter_tables(lines):
+        if title == 'Fitter Summary' and header is None:
+            summary = {row[0]: row[1] for row in rows if len(row) >= 2}
+        elif title == 'Fitter Resource Usage Summary':
+            for row in rows:
+                if len(row) < 2 or not row[0]:
+                    continue
+                usage = parse_usage(row[1]) or {}
+                resources.append({
+                    'name': row[0].lstrip('- ').rstrip('*').strip(),
+                    'value': row[1],
+                    'used': usage.get('used'),
+                    'available': usage.get('available'),
+                    'percent': usage.get('percent'),
+                })
+    return {'summary': summary, 'resources': resources}
+
+def parse_sta_report(lines):
+    """
+    Fmax и запасы по каждому клоку и углу из .sta.rpt.
+
+    Returns:
+        dict: {'fmax': [{'corner', 'clock', 'fmax_mhz', 'restricted_fmax_mhz'}],
+               'slack': [{'corner', 'analysis', 'clock', 'slack', 'tns'}]}
+    """
+    fmax = []
+    slack = []
+    for title, header, rows in iter_tables(lines):
+        m = _CORNER_TABLE_RE.match(title)
+        if not m or header is None:
+            continue
+        corner, analysis = m.group('corner'), m.group('analysis').lower()
+        columns = {name: i for i, name in enumerate(header)}
+        if analysis == 'fmax' and 'Clock Name' in columns:
+            for row in rows:
+                fmax_value = _MHZ_RE.match(row[columns.get('Fmax', 0)])
+                restricted = _MHZ_RE.match(row[columns['Restricted Fmax']]) if 'Restricted Fmax' in columns else None
+                fmax.append({
+                    'corner': corner,
+                    'clock': row[columns['Clock Name']],
+                    'fmax_mhz': float(fmax_value.group(1)) if fmax_value else None,
+                    'restricted_fmax_mhz': float(restricted.group(1)) if restricted else None,
+                })
+        elif 'Clock' in columns and 'Slack' in columns:
+            tns_column = next((i for name, i in columns.items() if name.endswith('TNS')), None)
+            for row in rows:
+                slack.append({
+                    'corner': corner,
+                    'analysis': analysis,
+                    'clock': row[columns['Clock']],
+                    'slack': _number(row[columns['Slack']]),
+                    'tns': _number(row[tns_column]) if tns_column is not None else None,
+                })
+    return {'fmax': fmax, 'slack': slack}
+
+def parse_pin_file(lines):
+    """
+    Таблица пинов из .pin файла.
+
+    Returns:
+        list: {'name', 'location', 'direction', 'io_standard', 'voltage', 'bank', 'user_assignment'}
+    """
+    pins = []
+    in_table = False
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if not in_table:
+            if line.startswith('Pin Name/Usage'):
+                in_table = True
+            continue
+        if not line.strip() or set(line.strip()) == {'-'}:
+            continue
+        fields = [field.strip() for field in line.rsplit(':', 6)]
+        if len(fields) != 7:
+            continue
+        name, location, direction, io_standard, voltage, bank, user = fields
+        pins.append({
+            'name': name,
+            'location': location,
+            'direction': direction or None,
+            'io_standard': io_standard or None,
+            'voltage': voltage or None,
+            'bank': bank or None,
+            'user_assignment': user or None,
+        })
+    return pins
+
+def parse_report_dir(report_dir, project_name):
+    """
+    Разбирает все отчёты сборки из директории (output_files или запись кэша).
+    Каждый файл читается один раз, построчно.
+    """
+    report_dir = Path(report_dir)
+    result = {'summary': {}, 'resources': [], 'fmax': [], 'slack': [], 'pins': []}
+
+    def open_report(suffix):
+        path = report_dir / f"{project_name}{suffix}"
+        return open(path, encoding='utf-8', errors='replace') if path.is_file() else None
+
+    f = open_report('.flow.rpt')
+    if f is not None:
+        with f:
+            result['summary'] = parse_summary(f, 'Flow Summary')
+    f = open_report('.fit.rpt')
+    if f is not None:
+        with f:
+            fit = parse_fit_report(f)
+        result['resources'] = fit['resources']
+        if not result['summary']:
+            result['summary'] = fit['summary']
+    f = open_report('.sta.rpt')
+    if f is not None:
+        with f:
+            result.update(parse_sta_report(f))
+    f = open_report('.pin')
+    if f is not None:
+        with f:
+            result['pins'] = parse_pin_file(f)
+    return result
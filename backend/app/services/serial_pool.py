@@ -0,0 +1,181 @@
+import atexit
+import threading
+import time
+from app.config.serial_config import SERIAL_DEVICES, SERIAL_RECONNECT
+
+def _default_serial_factory():
+    # pyserial импортируется только при первом подключении
+    import serial
+    return serial.Serial()
+
+class SerialConnection:
+    """
+    Долгоживущее соединение с последовательным портом.
+
+    Порт открывается при первой записи и остаётся открытым. DTR сбрасывается
+    до открытия, чтобы Arduino не перезагружалась при подключении. После
+    ошибки порт закрывается, а повторное подключение выполняется не раньше,
+    чем истечёт задержка с экспоненциальным ростом.
+    """
+
+    def __init__(self, name, port, baudrate=9600, timeout=1,
+                 backoff_initial=0.5, backoff_max=30.0, serial_factory=None):
+        self.name = name
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.serial_factory = serial_factory or _default_serial_factory
+        self.lock = threading.Lock()
+        self._serial = None
+        self.failures = 0
+        self.next_retry_at = 0.0
+        self.last_error = None
+        self.last_error_at = None
+        self.connected_at = None
+        self.writes = 0
+        self.bytes_written = 0
+        self.last_write_at = None
+
+    def _open(self):
+        """Открывает порт (вызывается под lock)"""
+        now = time.monotonic()
+        if now < self.next_retry_at:
+            raise ConnectionError(
+                f"Порт {self.port} недоступен, повтор через {self.next_retry_at - now:.1f} с: {self.last_error}")
+        ser = self.serial_factory()
+        ser.port = self.port
+        ser.baudrate = self.baudrate
+        ser.timeout = self.timeout
+        ser.write_timeout = self.timeout
+        # Без DTR при открытии Arduino не уходит в перезагрузку
+        ser.dtr = False
+        try:
+            ser.open()
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        self._serial = ser
+        self.connected_at = time.time()
+        self.failures = 0
+        self.next_retry_at = 0.0
+        print(f"Serial {self.name}: подключено к {self.port} ({self.baudrate} бод)")
+
+    def _close(self):
+        """Закрывает порт, ошибки закрытия игнорируются (вызывается под lock)"""
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+        self._serial = None
+        self.connected_at = None
+
+    def _record_failure(self, error):
+        self.failures += 1
+        self.last_error = str(error)
+        self.last_error_at = time.time()
+        delay = min(self.backoff_initial * (2 ** (self.failures - 1)), self.backoff_max)
+        self.next_retry_at = time.monotonic() + delay
+        print(f"Serial {self.name}: ошибка {error}, повтор через {delay:.1f} с")
+
+    def write(self, data):
+        """
+        Записывает байты в порт, при необходимости подключаясь.
+
+        Если запись в уже открытый порт не удалась (устройство переподключили),
+        выполняется одна немедленная попытка переоткрыть порт.
+        """
+        with self.lock:
+            for attempt in (1, 2):
+                if self._serial is None:
+                    self._open()
+                try:
+                    written = self._serial.write(data)
+                    self._serial.flush()
+                except Exception as e:
+                    self._close()
+                    if attempt == 2:
+                        self._record_failure(e)
+                        raise
+                    continue
+                self.writes += 1
+                self.bytes_written += written or 0
+                self.last_write_at = time.time()
+                return written
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+    @property
+    def connected(self):
+        return self._serial is not None
+
+    def health(self):
+        """Состояние соединения для мониторинга"""
+        with self.lock:
+            retry_in = max(self.next_retry_at - time.monotonic(), 0.0)
+            return {
+                'name': self.name,
+                'port': self.port,
+                'baudrate': self.baudrate,
+                'connected': self._serial is not None,
+                'connected_at': self.connected_at,
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'last_error_at': self.last_error_at,
+                'retry_in': round(retry_in, 3),
+                'writes': self.writes,
+                'bytes_written': self.bytes_written,
+                'last_write_at': self.last_write_at,
+            }
+
+class SerialPool:
+    """Набор именованных соединений с последовательными устройствами"""
+
+    def __init__(self, devices=None, reconnect=None, serial_factory=None):
+        self.reconnect = reconnect or {}
+        self.serial_factory = serial_factory
+        self.lock = threading.Lock()
+        self.connections = {}
+        for name, settings in (devices or {}).items():
+            self.add(name, **settings)
+
+    def add(self, name, port, baudrate=9600, timeout=1):
+        """Регистрирует устройство; существующее соединение с тем же именем закрывается"""
+        connection = SerialConnection(
+            name, port, baudrate=baudrate, timeout=timeout,
+            backoff_initial=self.reconnect.get('backoff_initial', 0.5),
+            backoff_max=self.reconnect.get('backoff_max', 30.0),
+            serial_factory=self.serial_factory,
+        )
+        with self.lock:
+            old = self.connections.get(name)
+            self.connections[name] = connection
+        if old is not None:
+            old.close()
+        return connection
+
+    def get(self, name):
+        with self.lock:
+            connection = self.connections.get(name)
+        if connection is None:
+            raise KeyError(f"Неизвестное последовательное устройство: {name}")
+        return connection
+
+    def health(self):
+        with self.lock:
+            connections = list(self.connections.values())
+        return {connection.name: connection.health() for connection in connections}
+
+    def close_all(self):
+        with self.lock:
+            connections = list(self.connections.values())
+        for connection in connections:
+            connection.close()
+
+# Глобальный пул соединений
+serial_pool = SerialPool(SERIAL_DEVICES, SERIAL_RECONNECT)
+atexit.register(serial_pool.close_all)
@@ -0,0 +1,96 @@
+import threading
+import time
+
+class _Flight:
+    """Выполняющийся вызов и те, кто ждёт его результата"""
+
+    def __init__(self, key):
+        self.key = key
+        self.started_at = time.time()
+        self.waiters = 0
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вызовов.
+
+    Первый вызов do() с ключом выполняет функцию, остальные вызовы с тем же
+    ключом, пришедшие до её завершения, ждут и получают тот же результат
+    (или то же исключение). Если первый вызов завершился исключением из
+    retry_errors (например, его задачу отменили), ожидающие не получают
+    чужую ошибку, а запускают функцию заново.
+    """
+
+    def __init__(self, retry_errors=()):
+        self.retry_errors = tuple(retry_errors)
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'retries': 0, 'max_waiters': 0}
+
+    def do(self, key, fn, on_wait=None, poll=None):
+        """
+        Выполняет fn() или дожидается уже выполняющегося вызова с тем же ключом.
+
+        Args:
+            on_wait: вызывается один раз, если вызов присоединился к чужому
+            poll: вызывается во время ожидания каждые полсекунды; исключение
+                из poll (например, JobCancelled) прекращает ожидание
+
+        Returns:
+            tuple: (результат, True если результат получен от чужого вызова)
+        """
+        while True:
+            with self.lock:
+                self.stats['calls'] += 1
+                flight = self.flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.flights[key] = _Flight(key)
+                    self.stats['executions'] += 1
+                else:
+                    flight.waiters += 1
+                    self.stats['coalesced'] += 1
+                    self.stats['max_waiters'] = max(self.stats['max_waiters'], flight.waiters)
+
+            if leader:
+                try:
+                    flight.result = fn()
+                    return flight.result, False
+                except BaseException as e:
+                    flight.error = e
+                    raise
+                finally:
+                    with self.lock:
+                        del self.flights[key]
+                    flight.done.set()
+
+            try:
+                if on_wait is not None:
+                    on_wait(flight)
+                while not flight.done.wait(0.5):
+                    if poll is not None:
+                        poll()
+            finally:
+                with self.lock:
+                    flight.waiters -= 1
+            if flight.error is None:
+                return flight.result, True
+            if not isinstance(flight.error, self.retry_errors):
+                raise flight.error
+            with self.lock:
+                self.stats['retries'] += 1
+
+    def get_stats(self):
+        """Счётчики и выполняющиеся вызовы с числом ожидающих"""
+        now = time.time()
+        with self.lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = [
+                {'key': flight.key[:12], 'waiters': flight.waiters,
+                 'elapsed': round(now - flight.started_at, 1)}
+                for flight in self.flights.values()
+            ]
+        stats['waiters'] = sum(flight['waiters'] for flight in stats['in_flight'])
+        return stats
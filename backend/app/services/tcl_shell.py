@@ -0,0 +1,238 @@
+import atexit
+import itertools
+import os
+import queue
+import re
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from app.config.quartus_config import QUARTUS_BIN_DIR, QUARTUS_TCL
+
+# Ответ на команду обрамляется строками-маркерами:
+#   @@BEGIN <id>
+#   ...вывод команды...
+#   @@END <id> <код catch> <результат, \ и перевод строки экранированы>
+_END_RE = re.compile(r'@@END (\d+) (-?\d+) ?(.*)$')
+_UNESCAPE_RE = re.compile(r'\\(.)')
+_PROMPT_RE = re.compile(r'^(?:tcl>\s*)+')
+
+class TclError(RuntimeError):
+    """Команда Tcl завершилась с ошибкой (catch вернул не 0)"""
+
+    def __init__(self, code, result):
+        super().__init__(result or f"Tcl error {code}")
+        self.code = code
+        self.result = result
+
+class TclSessionError(RuntimeError):
+    """Сессия недоступна: процесс завершился или не ответил вовремя"""
+
+def _unescape(text):
+    return _UNESCAPE_RE.sub(lambda m: '\n' if m.group(1) == 'n' else m.group(1), text)
+
+class TclSession:
+    """
+    Долгоживущий процесс `quartus_sh -s` (или любой Tcl интерпретатор),
+    принимающий команды через stdin.
+
+    Каждая команда выполняется внутри catch, а результат печатается
+    строкой-маркером, поэтому вывод команды, код возврата и результат
+    однозначно отделяются друг от друга. Строки вывода до маркера
+    передаются в on_line, как при запуске отдельного процесса.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, command, cwd=None, startup_timeout=60):
+        self.command = [str(part) for part in command]
+        self.cwd = cwd
+        self.jobs = 0
+        self.started_at = time.monotonic()
+        self.lines = queue.Queue()
+        self.process = subprocess.Popen(
+            self.command, cwd=cwd,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, bufsize=1, start_new_session=True
+        )
+        self.reader = threading.Thread(target=self._read_loop, name="tcl-reader", daemon=True)
+        self.reader.start()
+        # Ждём, пока интерпретатор загрузится и начнёт принимать команды
+        self.execute("info patchlevel", timeout=startup_timeout)
+
+    def _read_loop(self):
+        for line in self.process.stdout:
+            self.lines.put(line.rstrip('\r\n'))
+        self.lines.put(None)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def execute(self, script, on_line=None, timeout=None, cancel_event=None):
+        """
+        Выполняет Tcl скрипт и возвращает его результат строкой.
+
+        Raises:
+            TclError: скрипт завершился ошибкой (сессия остаётся рабочей)
+            TclSessionError: процесс завершился, не ответил за timeout или
+                выполнение отменено (сессия закрывается)
+        """
+        if not self.alive():
+            raise TclSessionError("Tcl session is not running")
+        command_id = next(self._ids)
+        framed = (
+            f'puts "@@BEGIN {command_id}"; '
+            f'set __rc [catch {{{script}}} __res]; '
+            f'puts "@@END {command_id} $__rc [string map {{\\\\ \\\\\\\\ \\n \\\\n}} $__res]"; '
+            f'flush stdout\n'
+        )
+        try:
+            self.process.stdin.write(framed)
+            self.process.stdin.flush()
+        except OSError as e:
+            self.close()
+            raise TclSessionError(f"Tcl session write failed: {e}")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        started = False
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                self.close()
+                raise TclSessionError("Tcl command cancelled")
+            wait = 0.5
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    self.close()
+                    raise TclSessionError(f"Tcl command timed out after {timeout} s")
+            try:
+                line = self.lines.get(timeout=wait)
+            except queue.Empty:
+                continue
+            if line is None:
+                raise TclSessionError(f"Tcl session exited with code {self.process.wait()}")
+            line = _PROMPT_RE.sub('', line)
+            if not started:
+                # Вывод до BEGIN - остатки баннера или прошлых команд
+                started = line == f"@@BEGIN {command_id}"
+                continue
+            m = _END_RE.match(line)
+            if m and int(m.group(1)) == command_id:
+                code, result = int(m.group(2)), _unescape(m.group(3))
+                if code != 0:
+                    raise TclError(code, result)
+                return result
+            if on_line is not None:
+                on_line(line)
+
+    def close(self):
+        """Завершает процесс сессии"""
+        if self.alive():
+            try:
+                self.process.stdin.write("exit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+                self.process.wait()
+
+class TclShellPool:
+    """
+    Пул сессий Tcl, чтобы не платить за запуск quartus_sh и проверку
+    лицензии на каждом шаге.
+
+    Сессии создаются по требованию (не больше size), перед выдачей
+    проверяются, а после max_jobs команд или ошибки сессии заменяются
+    новыми.
+    """
+
+    def __init__(self, command, size=2, max_jobs=20, startup_timeout=60, health_timeout=10):
+        self.command = command
+        self.size = size
+        self.max_jobs = max_jobs
+        self.startup_timeout = startup_timeout
+        self.health_timeout = health_timeout
+        self.lock = threading.Lock()
+        self.available = threading.Semaphore(size)
+        self.idle = []
+        self.stats = {'created': 0, 'recycled': 0, 'failed': 0, 'commands': 0}
+
+    def _healthy(self, session):
+        try:
+            return session.alive() and session.execute("expr {1 + 1}", timeout=self.health_timeout) == "2"
+        except (TclError, TclSessionError):
+            return False
+
+    def _acquire(self):
+        while True:
+            with self.lock:
+                session = self.idle.pop() if self.idle else None
+            if session is None:
+                session = TclSession(self.command, startup_timeout=self.startup_timeout)
+                with self.lock:
+                    self.stats['created'] += 1
+                return session
+            if self._healthy(session):
+                return session
+            session.close()
+            with self.lock:
+                self.stats['failed'] += 1
+
+    @contextmanager
+    def session(self):
+        """Выдаёт сессию на время блока и возвращает её в пул"""
+        self.available.acquire()
+        session = None
+        try:
+            session = self._acquire()
+            yield session
+        except TclSessionError:
+            if session is not None:
+                session.close()
+                with self.lock:
+                    self.stats['failed'] += 1
+                session = None
+            raise
+        finally:
+            if session is not None:
+                session.jobs += 1
+                with self.lock:
+                    self.stats['commands'] += 1
+                    if session.alive() and session.jobs < self.max_jobs:
+                        self.idle.append(session)
+                        session = None
+                    else:
+                        self.stats['recycled'] += 1
+                if session is not None:
+                    session.close()
+            self.available.release()
+
+    def execute(self, script, on_line=None, timeout=None, cancel_event=None):
+        """Выполняет скрипт в свободной сессии"""
+        with self.session() as session:
+            return session.execute(script, on_line=on_line, timeout=timeout, cancel_event=cancel_event)
+
+    def close_all(self):
+        with self.lock:
+            sessions, self.idle = self.idle, []
+        for session in sessions:
+            session.close()
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['idle'] = len(self.idle)
+        stats['size'] = self.size
+        return stats
+
+# Глобальный пул сессий quartus_sh; процессы запускаются при первой команде
+tcl_pool = TclShellPool(
+    [Path(QUARTUS_BIN_DIR) / "quartus_sh", '-s'],
+    size=QUARTUS_TCL['pool_size'], max_jobs=QUARTUS_TCL['max_jobs'],
+    startup_timeout=QUARTUS_TCL['startup_timeout'])
+atexit.register(tcl_pool.close_all)
@@ -1,89 +1,102 @@
-import pandas as pd
-import re
+import os
+import tempfile
+import time
 from pathlib import Path
-from app.config.quartus_config import DATA_FILES
-
-def remove_assign_between(file_path):
-    """Удаляет все assign операторы из файла"""
-    text = Path(file_path).read_text(encoding="utf-8")
-    # Разбиваем на три части: до ");", сам блок между и от "endmodule" до конца
-    m = re.match(r'(.*\);\s*)(.*?)(\s*endmodule.*)', text, flags=re.S)
-    if not m:
-        print("Не удалось найти участок `); ... endmodule`")
-        return
-    head, middle, tail = m.groups()
-
-    # Фильтруем: убираем строки assign и пустые строки
-    filtered_lines = []
-    for line in middle.splitlines(keepends=False):
-        # пропускаем пустые или содержащие только пробелы
-        if not line.strip():
-            continue
-        # пропускаем строки assign
-        if re.match(r'\s*assign\b', line):
-            continue
-        filtered_lines.append(line)
-
-    # Собираем результат: head, затем отфильтрованные строки, затем tail
-    new_text = head.rstrip() + "\n"
-    if filtered_lines:
-        # добавляем каждую строку с переносом
-        new_text += "\n".join(filtered_lines).rstrip() + "\n"
-    new_text += tail.lstrip()
-
-    Path(file_path).write_text(new_text, encoding="utf-8")
-
-def insert_before_endmodule(file_path, insert_lines):
+from app.config.quartus_config import DATA_FILES, COMPILE
+from app.services.pin_map import pin_map
+from app.services.verilog_template import template_cache, rendered_template, VerilogParseError
+
+def render_assigns(pairs):
+    """Формирует блок assign операторов для пар [de10_cyclone, perif_cyclone]"""
+    return "".join("\n    assign {a} = {b};\n".format(a=right, b=left) for left, right in pairs)
+
+def assemble_verilog(head, body_lines, assigns, tail):
+    """Собирает итоговый текст модуля из частей шаблона и блока assign"""
+    text = head.rstrip() + "\n"
+    if body_lines:
+        text += "\n".join(body_lines).rstrip() + "\n"
+    return text + assigns + tail.lstrip()
+
+def render_template(template, pairs):
     """
-    Вставляет строки перед endmodule в файле
-    
-    Args:
-        file_path: путь к .v‑файлу (строка или Path)
-        insert_lines: список строк, которые нужно вставить (каждая с '\n' на конце)
+    Модуль из разобранного шаблона с assign для пар [de10_cyclone, perif_cyclone].
+    Разбор результата сразу кладётся в кэш шаблонов: следующая генерация
+    читает этот текст из файла и иначе разбирала бы его заново.
+    """
+    text = assemble_verilog(template.head, template.body_lines, render_assigns(pairs), template.tail)
+    template_cache.put(text, rendered_template(template, [(right, left) for left, right in pairs]))
+    return text
+
+def write_atomic(file_path, text):
+    """
+    Записывает файл атомарно: одна запись во временный файл рядом
+    с целевым и os.replace поверх него.
     """
     p = Path(file_path)
-    lines = p.read_text(encoding="utf-8").splitlines(keepends=True)
-
-    # Находим индекс последнего вхождения 'endmodule'
-    idx = None
-    for i, line in enumerate(lines):
-        if line.strip().lower() == "endmodule":
-            idx = i
-    if idx is None:
-        raise ValueError("В файле не найдена строка 'endmodule'")
-
-    # Вставляем перед этой строкой
-    new_lines = lines[:idx] + insert_lines + lines[idx:]
-    # Записываем обратно
-    p.write_text("".join(new_lines), encoding="utf-8")
-
-def generate_verilog(connections):
+    fd, tmp_path = tempfile.mkstemp(dir=p.parent, prefix=f".{p.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp создаёт файл с правами 0600, сохраняем права оригинала
+        if p.exists():
+            os.chmod(tmp_path, p.stat().st_mode & 0o777)
+        os.replace(tmp_path, p)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def generate_verilog(connections, timings=None, path=None, write=True):
     """
     Генерирует Verilog код на основе конфигурации соединений.
+
+    Шаблон читается и разбирается один раз, все assign формируются за один
+    проход, а результат записывается одной атомарной записью.
     
     Args:
         connections (list): Список пар соединений в формате [['left_pin', 'right_pin'], ...]
         где left_pin - это Perifery, right_pin - это DE10-Lite
+        timings (dict, optional): если передан, заполняется временем этапов в секундах
+        path (str, optional): файл шаблона, который переписывается (по умолчанию
+            общий GreenP.v; задачи сборки передают копию в своей рабочей директории)
+        write (bool): False - только вернуть текст, не изменяя файл
     
     Returns:
         str: Сгенерированный Verilog код
     """
+    if timings is None:
+        timings = {}
+    if path is None:
+        path = DATA_FILES['green_v']
     try:
+        t0 = time.perf_counter()
         # Проверяем существование файлов
         if not Path(DATA_FILES['de10lite']).exists():
             raise FileNotFoundError(f"Файл {DATA_FILES['de10lite']} не найден")
         if not Path(DATA_FILES['perif']).exists():
             raise FileNotFoundError(f"Файл {DATA_FILES['perif']} не найден")
-        if not Path(DATA_FILES['green_v']).exists():
-            raise FileNotFoundError(f"Файл {DATA_FILES['green_v']} не найден")
+        if not Path(path).exists():
+            raise FileNotFoundError(f"Файл {path} не найден")
 
-        # Читаем CSV файлы
-        de10_df = pd.read_csv(DATA_FILES['de10lite'])
-        perif_df = pd.read_csv(DATA_FILES['perif'])
+        # Таблицы пинов загружены заранее и перечитываются только при изменении CSV
+        tables = pin_map.get()
+        de10_dict = tables.de10_to_cyclone
+        perif_dict = tables.perif_to_cyclone
+        t1 = time.perf_counter()
+        timings['load_maps'] = t1 - t0
 
-        # Создаем словари для быстрого поиска
-        de10_dict = dict(zip(de10_df['DE10-Lite'], de10_df['CycloneIV']))
-        perif_dict = dict(zip(perif_df['Perifery'], perif_df['CycloneIV']))
+        # Читаем и разбираем шаблон один раз
+        original = Path(path).read_text(encoding="utf-8")
+        try:
+            template = template_cache.get(original)
+        except VerilogParseError as e:
+            raise ValueError(f"Не удалось найти участок `); ... endmodule`: {e}")
+        t2 = time.perf_counter()
+        timings['parse_template'] = t2 - t1
 
         # Преобразуем соединения в нужный формат
         results = []
@@ -93,16 +106,71 @@ def generate_verilog(connections):
             else:
                 print(f"Warning: Pin pair not found - {left} -> {right}")
 
-        # Очищаем существующие assign
-        remove_assign_between(DATA_FILES['green_v'])
+        # Собираем модуль с новыми assign вместо старых
+        verilog_code = render_template(template, results)
+        t3 = time.perf_counter()
+        timings['render'] = t3 - t2
 
-        # Добавляем новые assign
-        for left, right in results:
-            lst = ["\n    assign {a} = {b};\n".format(a=right, b=left)]
-            insert_before_endmodule(DATA_FILES['green_v'], lst)
+        # Записываем только если содержимое изменилось
+        if write and verilog_code != original:
+            write_atomic(path, verilog_code)
+        timings['write'] = time.perf_counter() - t3
 
-        # Читаем и возвращаем сгенерированный код
-        return Path(DATA_FILES['green_v']).read_text(encoding="utf-8")
+        if COMPILE['log_generate_timings']:
+            print("generate_verilog timings (ms): " + ", ".join(
+                f"{stage}={seconds * 1000:.2f}" for stage, seconds in timings.items()))
+        return verilog_code
     except Exception as e:
         print(f"Error in generate_verilog: {e}")
         raise
+
+def map_connections(connections, tables):
+    """Пары меток -> пары [de10_cyclone, perif_cyclone]; неизвестные пары пропускаются"""
+    de10_dict = tables.de10_to_cyclone
+    perif_dict = tables.perif_to_cyclone
+    return [(de10_dict[left], perif_dict[right]) for left, right in connections
+            if left in de10_dict and right in perif_dict]
+
+def patch_verilog(connections, added, removed):
+    """
+    Вносит в GreenP.v только изменившиеся assign.
+
+    Существующие assign остаются на своих местах и в прежнем виде,
+    удалённые пары вычёркиваются, новые дописываются в конец. Если assign
+    в файле не соответствуют конфигурации (файл правили вручную или он
+    не генерировался), модуль генерируется целиком.
+
+    Args:
+        connections (list): новая полная конфигурация соединений
+        added, removed (list): изменения, уже применённые к connections
+
+    Returns:
+        dict: {'verilog_code', 'added', 'removed', 'full'} - число изменённых
+        assign и признак полной генерации
+    """
+    tables = pin_map.get()
+    original = Path(DATA_FILES['green_v']).read_text(encoding="utf-8")
+    try:
+        template = template_cache.get(original)
+    except VerilogParseError as e:
+        raise ValueError(f"Не удалось разобрать шаблон: {e}")
+    # Текущие assign файла в виде пар (источник, приёмник), как в map_connections
+    existing = [(source, target) for target, source in template.assigns]
+    wanted = dict.fromkeys(map_connections(connections, tables))
+    removed_pairs = set(map_connections(removed, tables))
+    added_pairs = map_connections(added, tables)
+
+    kept = [pair for pair in existing if pair not in removed_pairs]
+    kept_set = set(kept)
+    new_pairs = [pair for pair in dict.fromkeys(added_pairs) if pair not in kept_set]
+    result = kept + new_pairs
+    if set(result) != set(wanted) or len(result) != len(wanted):
+        verilog_code = generate_verilog(connections)
+        return {'verilog_code': verilog_code, 'added': len(added_pairs),
+                'removed': len(removed_pairs), 'full': True}
+
+    verilog_code = render_template(template, result)
+    if verilog_code != original:
+        write_atomic(DATA_FILES['green_v'], verilog_code)
+    return {'verilog_code': verilog_code, 'added': len(new_pairs),
+            'removed': len(existing) - len(kept), 'full': False}
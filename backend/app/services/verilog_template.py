@@ -0,0 +1,202 @@
+"""
+Разбор шаблона Verilog модуля (GreenP.v, green.v).
+
+Поддерживается подмножество языка, которое встречается в шаблонах:
+заголовок модуля со списком портов, непрерывные присваивания assign и
+endmodule. Текст разбивается на лексемы (комментарии, строки и директивы
+распознаются отдельно, поэтому `assign` или `);` внутри комментария не
+сбивают разбор), а результат кэшируется по хэшу текста. Генератор кладёт
+в кэш и разбор собранного им текста (rendered_template), поэтому
+следующая генерация по только что записанному файлу не разбирает его.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+_TOKEN_RE = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:\\.|[^"\\\n])*")
+  | (?P<directive>`\w+)
+  | (?P<ident>[A-Za-z_][\w$]*|\\\S+)
+  | (?P<number>\d[\w']*|'[sS]?[bBoOdDhH][\w?]*)
+  | (?P<space>\s+)
+  | (?P<punct>.)
+""", re.S | re.X)
+
+Token = namedtuple('Token', ['kind', 'value', 'start', 'end'])
+
+PORT_DIRECTIONS = ('input', 'output', 'inout')
+
+# Разобранный шаблон. head + body + assigns + tail восстанавливают модуль.
+VerilogTemplate = namedtuple('VerilogTemplate', [
+    'module',       # имя модуля
+    'ports',        # [(direction, name)] в порядке объявления
+    'head',         # текст до ';' заголовка модуля включительно
+    'body_lines',   # непустые строки тела без assign
+    'assigns',      # [(target, source)] в порядке файла
+    'tail',         # текст начиная с endmodule
+])
+
+class VerilogParseError(ValueError):
+    pass
+
+def tokenize(text):
+    """Лексемы текста без пробелов; комментарии сохраняются"""
+    tokens = []
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind != 'space':
+            tokens.append(Token(kind, m.group(), m.start(), m.end()))
+    return tokens
+
+def _code(tokens):
+    """Лексемы без комментариев"""
+    return [t for t in tokens if t.kind != 'comment']
+
+def _parse_ports(header):
+    """Порты из лексем заголовка: имена после input/output/inout вне [..] и #(..)"""
+    ports = []
+    direction = None
+    bracket = 0
+    for t in header:
+        if t.value == '[':
+            bracket += 1
+        elif t.value == ']':
+            bracket -= 1
+        elif bracket:
+            continue
+        elif t.kind == 'ident' and t.value in PORT_DIRECTIONS:
+            direction = t.value
+        elif t.kind == 'ident' and direction and t.value not in ('wire', 'reg', 'logic', 'signed', 'tri'):
+            ports.append((direction, t.value))
+    return ports
+
+def parse_template(text, module=None):
+    """
+    Разбирает модуль module (по умолчанию первый) в VerilogTemplate.
+
+    Другие модули файла остаются в head (те, что выше) и tail (те, что ниже).
+    """
+    code = _code(tokenize(text))
+    i = 0
+    while i < len(code):
+        t = code[i]
+        if t.kind == 'ident' and t.value == 'module' and i + 1 < len(code):
+            if module is None or code[i + 1].value == module:
+                break
+        i += 1
+    else:
+        raise VerilogParseError("Модуль не найден" if module is None else f"Модуль {module} не найден")
+    name = code[i + 1].value
+
+    # Заголовок заканчивается первой ';' вне скобок
+    depth = 0
+    j = i + 2
+    while j < len(code):
+        t = code[j]
+        if t.value == '(':
+            depth += 1
+        elif t.value == ')':
+            depth -= 1
+        elif t.value == ';' and depth == 0:
+            break
+        j += 1
+    else:
+        raise VerilogParseError(f"Не найден конец заголовка модуля {name}")
+    header_end = code[j].end
+    ports = _parse_ports(code[i + 2:j])
+
+    # Тело: assign до ';' вырезаются, остальное остаётся как есть
+    assigns = []
+    cuts = []
+    k = j + 1
+    while k < len(code):
+        t = code[k]
+        if t.kind == 'ident' and t.value == 'endmodule':
+            break
+        if t.kind == 'ident' and t.value == 'assign':
+            end = k + 1
+            eq = None
+            while end < len(code) and code[end].value != ';':
+                if code[end].value == '=' and eq is None:
+                    eq = end
+                end += 1
+            if end == len(code) or eq is None:
+                raise VerilogParseError(f"Незавершённый assign в модуле {name}")
+            target = text[code[k + 1].start:code[eq - 1].end]
+            source = text[code[eq + 1].start:code[end - 1].end]
+            assigns.append((target, source))
+            cuts.append((t.start, code[end].end))
+            k = end + 1
+            continue
+        k += 1
+    else:
+        raise VerilogParseError(f"Не найден endmodule модуля {name}")
+    body_end = code[k].start
+
+    body = []
+    position = header_end
+    for start, end in cuts:
+        body.append(text[position:start])
+        position = end
+    body.append(text[position:body_end])
+    body_lines = tuple(line for line in "".join(body).splitlines() if line.strip())
+
+    return VerilogTemplate(
+        module=name,
+        ports=tuple(ports),
+        head=text[:header_end],
+        body_lines=body_lines,
+        assigns=tuple(assigns),
+        tail=text[body_end:],
+    )
+
+def rendered_template(template, assigns):
+    """
+    Разбор текста, собранного verilog_generator.assemble_verilog из частей
+    template и assigns [(target, source)], без повторного разбора:
+    assemble_verilog обрезает пробелы на стыках частей, здесь так же.
+    """
+    body = "\n".join(template.body_lines).rstrip()
+    return template._replace(
+        head=template.head.rstrip(),
+        body_lines=tuple(line for line in body.splitlines() if line.strip()),
+        assigns=tuple(assigns),
+        tail=template.tail.lstrip(),
+    )
+
+class TemplateCache:
+    """Разобранные шаблоны по sha256 текста (несколько последних)"""
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, text, module=None):
+        key = (hashlib.sha256(text.encode('utf-8')).hexdigest(), module)
+        with self.lock:
+            template = self.entries.get(key)
+            if template is not None:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return template
+            self.stats['misses'] += 1
+        template = parse_template(text, module)
+        self.put(text, template, module)
+        return template
+
+    def put(self, text, template, module=None):
+        """Запоминает уже известный разбор текста (например, только что собранного)"""
+        key = (hashlib.sha256(text.encode('utf-8')).hexdigest(), module)
+        with self.lock:
+            self.entries[key] = template
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+# Глобальный кэш разобранных шаблонов
+template_cache = TemplateCache()
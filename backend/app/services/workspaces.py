@@ -0,0 +1,244 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from app.config.quartus_config import WORKSPACES
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl FICLONE (Linux): копия файла, разделяющая блоки с исходным (reflink)
+FICLONE = 0x40049409
+
+# Входные файлы, которые сборка только читает: они попадают в рабочую
+# директорию жёсткими ссылками. Только файлы верхнего уровня - всё в
+# поддиректориях (db/, output_files/, simulation/ ...) пишет Quartus, и
+# всё, что не перечислено здесь, копируется (reflink, если файловая
+# система умеет)
+LINKED_SUFFIXES = ('.xlsx', '.csv', '.bak', '.sdc', '.qip', '.mif', '.hex', '.txt', '.pdf')
+
+# Что возвращается в директорию проекта после успешной сборки, чтобы
+# следующие сборки могли быть инкрементальными
+PROMOTED = ('db', 'incremental_db', 'output_files', '.build_state.json')
+
+# Маркер завершённой рабочей директории
+DONE_MARKER = '.workspace_done'
+
+# Файл блокировки в директории проекта; его же блокирует program_fpga.py,
+# поэтому сборки из командной строки и из backend не пересекаются
+PROJECT_LOCK_FILE = '.program_fpga.lock'
+
+@contextmanager
+def project_file_lock(project_dir):
+    """Межпроцессная блокировка проекта (flock); без fcntl ничего не делает"""
+    if fcntl is None:
+        yield
+        return
+    with open(Path(project_dir) / PROJECT_LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def clone_file(src, dst):
+    """Копирует файл через reflink, если возможно, иначе обычным копированием"""
+    if fcntl is not None and hasattr(fcntl, 'ioctl'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return 'reflink'
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return 'copy'
+
+def link_file(src, dst):
+    """Жёсткая ссылка на неизменяемый входной файл, копия при другом устройстве"""
+    try:
+        os.link(src, dst)
+        return 'link'
+    except OSError:
+        shutil.copy2(src, dst)
+        return 'copy'
+
+def _is_read_only(relative):
+    return len(relative.parts) == 1 and relative.name.endswith(LINKED_SUFFIXES) \
+        and not relative.name.startswith('.')
+
+def _workspace_size(path):
+    """Место, занимаемое только рабочей директорией (без файлов-ссылок на проект)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if st.st_nlink == 1:
+                total += st.st_size
+    return total
+
+class WorkspaceManager:
+    """
+    Отдельная копия проекта Quartus для каждой сборки.
+
+    Неизменяемые входные файлы (LINKED_SUFFIXES) попадают в рабочую
+    директорию жёсткими ссылками, всё остальное (исходник .v, настройки,
+    db/, output_files/, simulation/) - через reflink или копированием,
+    поэтому параллельные сборки не портят исходники и db/ друг друга.
+    Клонирование и возврат результатов в проект выполняются под общей
+    блокировкой проекта. Завершённые рабочие директории удаляются,
+    начиная с самых старых, при превышении лимитов.
+    """
+
+    def __init__(self, root, max_workspaces=8, max_bytes=1024 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_workspaces = max_workspaces
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.project_locks = {}
+        self.active = set()
+        self.stats = {'created': 0, 'linked': 0, 'cloned': 0, 'copied': 0, 'removed': 0, 'promoted': 0}
+
+    @contextmanager
+    def project_lock(self, project_dir):
+        """
+        Блокировка директории проекта: пока она взята, никто не возвращает
+        в проект результаты сборки и не компилирует в нём, поэтому db/ и
+        output_files/ согласованы. Потоки процесса ждут на threading.Lock,
+        затем берётся flock на PROJECT_LOCK_FILE - его ждёт и program_fpga.py.
+        """
+        project_dir = Path(project_dir).resolve()
+        with self.lock:
+            lock = self.project_locks.setdefault(project_dir, threading.Lock())
+        with lock, project_file_lock(project_dir):
+            yield
+
+    def _clone_tree(self, project_dir, workspace, counts):
+        for root, dirs, files in os.walk(project_dir):
+            relative_root = Path(root).relative_to(project_dir)
+            # Остатки прерванного возврата результатов (.db.old-*) не копируются
+            dirs[:] = [d for d in dirs if not (d.startswith('.') and '.old-' in d)]
+            (workspace / relative_root).mkdir(parents=True, exist_ok=True)
+            for file_name in files:
+                if file_name == PROJECT_LOCK_FILE:
+                    continue
+                relative = relative_root / file_name
+                src, dst = project_dir / relative, workspace / relative
+                if src.is_symlink():
+                    os.symlink(os.readlink(src), dst)
+                    continue
+                method = link_file(src, dst) if _is_read_only(relative) else clone_file(src, dst)
+                counts[method] += 1
+
+    def create(self, project_dir, label=None):
+        """Клонирует директорию проекта, возвращает путь к рабочей копии"""
+        project_dir = Path(project_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        name = f"{project_dir.name}-{label or uuid.uuid4().hex[:12]}-{int(time.time())}"
+        workspace = self.root / name
+        counts = {'link': 0, 'reflink': 0, 'copy': 0}
+        with self.lock:
+            self.active.add(workspace)
+        try:
+            # Под блокировкой проекта: db/ не подменяется посреди копирования
+            with self.project_lock(project_dir):
+                self._clone_tree(project_dir, workspace, counts)
+        except BaseException:
+            self.release(workspace, keep=False)
+            raise
+        with self.lock:
+            self.stats['created'] += 1
+            self.stats['linked'] += counts['link']
+            self.stats['cloned'] += counts['reflink']
+            self.stats['copied'] += counts['copy']
+        print(f"Рабочая директория {workspace.name}: ссылок {counts['link']}, "
+              f"reflink {counts['reflink']}, копий {counts['copy']}")
+        return workspace
+
+    def promote(self, workspace, project_dir):
+        """
+        Возвращает результаты успешной сборки (db/, output_files/, состояние
+        сборки) в директорию проекта переименованием. Выполняется под
+        блокировкой проекта: клонирование и project_lock() видят либо
+        прежние, либо новые результаты целиком. Код, читающий проект без
+        блокировки, может на мгновение не найти db/ между переименованиями.
+        """
+        project_dir = Path(project_dir)
+        with self.project_lock(project_dir):
+            for name in PROMOTED:
+                src = Path(workspace) / name
+                if not src.exists():
+                    continue
+                dst = project_dir / name
+                if src.is_dir():
+                    old = project_dir / f".{name}.old-{uuid.uuid4().hex[:8]}"
+                    if dst.exists():
+                        os.replace(dst, old)
+                    os.replace(src, dst)
+                    shutil.rmtree(old, ignore_errors=True)
+                else:
+                    os.replace(src, dst)
+        with self.lock:
+            self.stats['promoted'] += 1
+
+    def release(self, workspace, keep=True):
+        """Отмечает сборку завершённой; keep=False удаляет рабочую директорию сразу"""
+        workspace = Path(workspace)
+        with self.lock:
+            self.active.discard(workspace)
+        if not keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+            with self.lock:
+                self.stats['removed'] += 1
+        elif workspace.exists():
+            (workspace / DONE_MARKER).touch()
+        self.gc()
+
+    def _finished(self):
+        """Завершённые рабочие директории (path, finished_at, size), от старых к новым"""
+        entries = []
+        if not self.root.exists():
+            return entries
+        for workspace in self.root.iterdir():
+            marker = workspace / DONE_MARKER
+            if workspace in self.active or not marker.exists():
+                continue
+            entries.append((workspace, marker.stat().st_mtime, _workspace_size(workspace)))
+        entries.sort(key=lambda e: e[1])
+        return entries
+
+    def gc(self):
+        """Удаляет самые старые завершённые рабочие директории сверх лимитов"""
+        entries = self._finished()
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        while entries and (len(entries) > self.max_workspaces or total > self.max_bytes):
+            workspace, _, size = entries.pop(0)
+            shutil.rmtree(workspace, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            with self.lock:
+                self.stats['removed'] += removed
+        return removed
+
+    def get_stats(self):
+        entries = self._finished()
+        with self.lock:
+            stats = dict(self.stats)
+            stats['active'] = len(self.active)
+        stats['finished'] = len(entries)
+        stats['bytes'] = sum(size for _, _, size in entries)
+        return stats
+
+# Глобальный менеджер рабочих директорий
+workspace_manager = WorkspaceManager(
+    WORKSPACES['dir'], max_workspaces=WORKSPACES['max_workspaces'], max_bytes=WORKSPACES['max_bytes'])
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Замер времени импорта backend через `python -X importtime`.
+
+Запускает create_app() в отдельном процессе несколько раз, берёт лучший
+результат и завершается с кодом 1, если время импорта пакета app (вместе
+с модулями app.*, импортируемыми внутри create_app()) превышает бюджет или
+если на пути импорта оказались тяжёлые зависимости.
+
+Пример:
+    python benchmarks/import_time.py --budget-ms 400 --runs 5
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Модули, которые не должны импортироваться при старте приложения
+FORBIDDEN_MODULES = ('pandas', 'numpy')
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+def measure_once(statement):
+    """Один запуск интерпретатора; возвращает список (модуль, self_us, cumulative_us, глубина)"""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Запуск завершился с ошибкой:\n{process.stderr}")
+    rows = []
+    for line in process.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, module = m.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+def app_import_us(rows):
+    """
+    Cumulative время импорта пакета app: сумма по всем строкам верхнего
+    уровня для app и app.* - модули, импортируемые внутри create_app(),
+    попадают в вывод отдельными строками верхнего уровня, а не под app.
+    None, если пакет app не импортировался.
+    """
+    app_rows = [cumulative_us for module, _, cumulative_us, depth in rows
+                if depth == 0 and (module == 'app' or module.startswith('app.'))]
+    return sum(app_rows) if app_rows else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Бюджет времени импорта backend")
+    parser.add_argument('--budget-ms', type=float, default=400.0,
+                        help="допустимое время импорта пакета app, мс")
+    parser.add_argument('--runs', type=int, default=5, help="число запусков, берётся лучший")
+    parser.add_argument('--top', type=int, default=10, help="сколько самых медленных модулей показать")
+    parser.add_argument('--statement', default='from app import create_app; create_app()',
+                        help="замеряемый код")
+    args = parser.parse_args()
+
+    best_total = None
+    best_rows = None
+    for _ in range(max(args.runs, 1)):
+        rows = measure_once(args.statement)
+        total = sum(self_us for _, self_us, _, _ in rows)
+        if best_total is None or total < best_total:
+            best_total, best_rows = total, rows
+
+    app_us = app_import_us(best_rows)
+    if app_us is None:
+        app_us = best_total
+    print(f"Всего импортов: {len(best_rows)}, суммарно {best_total / 1000:.1f} мс")
+    print(f"Пакет app (cumulative): {app_us / 1000:.1f} мс, бюджет {args.budget_ms:.0f} мс")
+    print("Самые медленные модули (cumulative):")
+    for module, _, cumulative_us, _ in sorted(best_rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} мс  {module}")
+
+    failed = False
+    imported = {module.split('.')[0] for module, _, _, _ in best_rows}
+    heavy = sorted(imported.intersection(FORBIDDEN_MODULES))
+    if heavy:
+        print(f"ОШИБКА: при старте импортируются тяжёлые модули: {', '.join(heavy)}")
+        failed = True
+    if app_us / 1000 > args.budget_ms:
+        print("ОШИБКА: время импорта превышает бюджет")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
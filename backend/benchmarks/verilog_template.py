@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Сравнение разбора шаблона Verilog: прежнее регулярное выражение по всему
+тексту и разбор на лексемы из app.services.verilog_template (с кэшем и без).
+
+Шаблоны генерируются синтетически: N портов inout и M assign, как в GreenP.v.
+Для каждого размера сначала проверяется, что оба способа дают одинаковые
+head/body/tail, затем замеряется время.
+
+Пример:
+    python benchmarks/verilog_template.py --ports 100 1000 5000 --assigns 50 --repeat 20
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.verilog_template import parse_template, TemplateCache  # noqa: E402
+
+# Прежняя реализация split_template
+_HEAD_RE = re.compile(r'(.*\);\s*)(.*?)(\s*endmodule.*)', flags=re.S)
+_ASSIGN_RE = re.compile(r'\s*assign\b')
+
+def split_template_regex(text):
+    m = _HEAD_RE.match(text)
+    if not m:
+        return None
+    head, middle, tail = m.groups()
+    body_lines = [
+        line for line in middle.splitlines(keepends=False)
+        if line.strip() and not _ASSIGN_RE.match(line)
+    ]
+    return head, body_lines, tail
+
+def make_template(ports, assigns):
+    lines = ["module GreenP (", "", "\t// pins for FPGA"]
+    names = [f"P{i}" for i in range(ports)]
+    lines += [f"\tinout {name}," for name in names[:-1]] + [f"\tinout {names[-1]}", "", ");", ""]
+    for i in range(assigns):
+        lines += [f"    assign {names[(2 * i) % ports]} = {names[(2 * i + 1) % ports]};", ""]
+    lines.append("endmodule")
+    return "\n".join(lines)
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Разбор шаблона Verilog: regex и лексемы")
+    parser.add_argument('--ports', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="число портов в синтетических шаблонах")
+    parser.add_argument('--assigns', type=int, default=50, help="число assign в шаблоне")
+    parser.add_argument('--repeat', type=int, default=10, help="число повторов, берётся лучший")
+    args = parser.parse_args()
+
+    print(f"{'ports':>8} {'bytes':>10} {'regex, ms':>10} {'parse, ms':>10} {'cached, ms':>11}")
+    for ports in args.ports:
+        text = make_template(ports, args.assigns)
+        expected = split_template_regex(text)
+        template = parse_template(text)
+        actual = (template.head, list(template.body_lines), template.tail)
+        if actual[0].rstrip() != expected[0].rstrip() or actual[1] != expected[1] \
+                or actual[2].lstrip() != expected[2].lstrip():
+            print(f"Результаты разбора различаются для {ports} портов")
+            return 1
+
+        cache = TemplateCache()
+        cache.get(text)
+        regex_time = best_of(lambda: split_template_regex(text), args.repeat)
+        parse_time = best_of(lambda: parse_template(text), args.repeat)
+        cached_time = best_of(lambda: cache.get(text), args.repeat)
+        print(f"{ports:>8} {len(text):>10} {regex_time * 1000:>10.3f} "
+              f"{parse_time * 1000:>10.3f} {cached_time * 1000:>11.3f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import time
+
+from app.services.arduino_serial import ArduinoSerialService
+from app.services.button_pipeline import ButtonEventPipeline
+
+class FlakyService(ArduinoSerialService):
+    """Текстовый протокол без порта: первые failures записей завершаются ошибкой"""
+
+    def __init__(self, failures=0):
+        super().__init__(pool=None)
+        self.failures = failures
+        self.sent = []
+
+    def send_frames(self, data):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Serial send error: device disconnected")
+        self.sent.append(data)
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_batch_is_coalesced():
+    service = FlakyService()
+    pipeline = ButtonEventPipeline(service, batch_window=0.05)
+    pipeline.submit('b1', True)
+    pipeline.submit('b2', True)
+    pipeline.submit('b1', False)
+    wait_for(lambda: pipeline.get_metrics()['frames_sent'] == 2)
+    assert service.sent == [b"b1:0\nb2:1\n"]
+    assert pipeline.get_metrics()['coalesced'] == 1
+
+def test_failed_send_is_requeued():
+    service = FlakyService(failures=2)
+    pipeline = ButtonEventPipeline(service, batch_window=0.01, retry_delay=0.05)
+    pipeline.submit('b1', True)
+    pipeline.submit('b2', True)
+    wait_for(lambda: service.sent)
+    assert service.sent == [b"b1:1\nb2:1\n"]
+    metrics = pipeline.get_metrics()
+    assert metrics['send_errors'] == 2
+    assert metrics['failed_events'] == 4
+    assert metrics['requeued'] == 4
+    assert metrics['frames_sent'] == 2
+    assert 'device disconnected' in metrics['last_error']
+    assert metrics['queue_depth'] == 0
+
+def test_newer_state_wins_over_requeued():
+    service = FlakyService(failures=1)
+    pipeline = ButtonEventPipeline(service, batch_window=0.01, retry_delay=0.2)
+    pipeline.submit('b1', True)
+    pipeline.submit('b2', True)
+    wait_for(lambda: pipeline.get_metrics()['send_errors'] == 1)
+    pipeline.submit('b1', False)
+    wait_for(lambda: service.sent)
+    assert len(service.sent) == 1
+    assert sorted(service.sent[0].splitlines()) == [b"b1:0", b"b2:1"]
@@ -0,0 +1,65 @@
+import pytest
+
+from app.services.button_protocol import (
+    FRAME_SIZE, MAX_BUTTON_INDEX, SYNC, FrameDecoder, button_index, crc8,
+    decode_frames, encode_frame, encode_states,
+)
+
+def test_crc8_check_value():
+    # Стандартное контрольное значение CRC-8 (полином 0x07) для "123456789"
+    assert crc8(b"123456789") == 0xF4
+
+def test_multi_group_round_trip():
+    states = [(1, True), (3, False), (17, True), (40, True), (47, False)]
+    data = encode_states(states)
+    # Группы 0, 16 и 32 - по кадру на каждую
+    assert len(data) == 3 * FRAME_SIZE
+    assert sorted(decode_frames(data)) == sorted(states)
+
+def test_last_value_wins():
+    data = encode_states([(5, True), (6, True), (5, False), (6, False), (6, True)])
+    assert len(data) == FRAME_SIZE
+    assert decode_frames(data) == [(5, False), (6, True)]
+
+def test_index_255_boundary():
+    data = encode_states([(MAX_BUTTON_INDEX, True), (240, False)])
+    assert len(data) == FRAME_SIZE
+    assert data[1] == 240
+    assert decode_frames(data) == [(240, False), (MAX_BUTTON_INDEX, True)]
+    assert button_index(f"but{MAX_BUTTON_INDEX}") == MAX_BUTTON_INDEX
+    with pytest.raises(ValueError):
+        button_index(f"but{MAX_BUTTON_INDEX + 1}")
+    with pytest.raises(ValueError):
+        button_index("but")
+
+def test_state_outside_mask_ignored():
+    frame = encode_frame(0, 0b0001, 0b1111)
+    assert decode_frames(frame) == [(0, True)]
+
+@pytest.mark.parametrize('position', range(1, FRAME_SIZE))
+def test_corrupted_frame_rejected(position):
+    frame = bytearray(encode_frame(16, 0b11, 0b01))
+    frame[position] ^= 0x40
+    decoder = FrameDecoder()
+    assert decoder.feed(bytes(frame)) == []
+    assert decoder.bad_frames >= 1
+
+def test_resync_after_garbage():
+    good = encode_states([(2, True), (20, False)])
+    corrupted = bytearray(encode_frame(0, 1, 1))
+    corrupted[6] ^= 0xFF
+    # Мусор, в том числе байты SYNC, и битый кадр перед верными кадрами
+    data = bytes((0x00, SYNC, 0x13, SYNC)) + bytes(corrupted) + good
+    decoder = FrameDecoder()
+    assert decoder.feed(data) == [(2, True), (20, False)]
+    assert decoder.bad_frames >= 1
+    assert not decoder.buffer
+
+def test_frames_split_across_feeds():
+    data = encode_states([(i, i % 2 == 0) for i in range(0, 64, 3)])
+    decoder = FrameDecoder()
+    events = []
+    for byte in data:
+        events += decoder.feed(bytes((byte,)))
+    assert events == decode_frames(data)
+    assert len(events) == len(range(0, 64, 3))
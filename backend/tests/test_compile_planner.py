@@ -0,0 +1,63 @@
+import pytest
+
+from app.services import compile_planner
+from app.services.compile_planner import FULL, INCREMENTAL, device_family, plan_compile, record_build
+
+TEMPLATE = """module GreenP (
+    inout M1,
+    inout N9
+);
+{assigns}endmodule
+"""
+
+def source(assigns):
+    return TEMPLATE.format(assigns="".join(f"    assign {t} = {s};\n" for t, s in assigns))
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "GreenP.qsf").write_text('set_global_assignment -name FAMILY "Cyclone IV E"\n'
+                                         'set_global_assignment -name DEVICE EP4CE6F17C8\n')
+    (tmp_path / "db").mkdir()
+    first = source([('N9', 'M1')])
+    (tmp_path / "GreenP.v").write_text(first)
+    plan = plan_compile(tmp_path, "GreenP", [['W10', 'RGB1']], verilog_text=first)
+    assert plan.mode == FULL and plan.reason == 'no previous build'
+    record_build(tmp_path, plan, {'flow': 1.0})
+    return tmp_path
+
+def test_device_family(tmp_path):
+    assert device_family(tmp_path, "GreenP", 'EP4CE6F17C8') == 'Cyclone IV E'
+    assert device_family(tmp_path, "GreenP", '10M50DAF484C7G') == 'MAX 10'
+    assert device_family(tmp_path, "GreenP") is None
+    (tmp_path / "GreenP.qsf").write_text('set_global_assignment -name FAMILY "Cyclone V"\n')
+    assert device_family(tmp_path, "GreenP", 'EP4CE6F17C8') == 'Cyclone V'
+
+def test_assign_change_without_rapid_recompile_is_full(project):
+    changed = source([('M1', 'N9')])
+    plan = plan_compile(project, "GreenP", [['W10', 'RGB2']], verilog_text=changed,
+                        recompile_families=('Cyclone V', 'Arria 10'))
+    assert plan.mode == FULL
+    assert plan.stages == ['flow']
+    assert 'Cyclone IV E' in plan.reason
+
+def test_assign_change_with_rapid_recompile(project):
+    changed = source([('M1', 'N9')])
+    plan = plan_compile(project, "GreenP", [['W10', 'RGB2']], verilog_text=changed,
+                        recompile_families=('Cyclone IV E',))
+    assert plan.mode == INCREMENTAL
+    assert plan.stages == ['recompile']
+
+def test_template_change_is_full(project):
+    changed = source([('N9', 'M1')]).replace("inout N9", "inout N9,\n    inout P3")
+    plan = plan_compile(project, "GreenP", [['W10', 'RGB1']], verilog_text=changed,
+                        recompile_families=('Cyclone IV E',))
+    assert (plan.mode, plan.reason) == (FULL, 'template changed')
+
+def test_recompile_failure_disables_mode(project):
+    state = compile_planner.load_build_state(project)
+    plan = compile_planner.CompilePlan(INCREMENTAL, '', ['recompile'], state['key'], None, state)
+    record_build(project, plan, {'recompile': 1.0, 'flow': 2.0}, recompile_supported=False)
+    changed = source([('M1', 'N9')])
+    plan = plan_compile(project, "GreenP", [['W10', 'RGB2']], verilog_text=changed,
+                        recompile_families=('Cyclone IV E',))
+    assert (plan.mode, plan.reason) == (FULL, 'rapid recompile not supported for this project')
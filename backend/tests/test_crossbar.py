@@ -0,0 +1,100 @@
+import pytest
+
+from app.services import crossbar
+from app.services.pin_map import PinTables
+
+def tables(de10, perif):
+    return PinTables(
+        de10_labels=tuple(label for label, _ in de10),
+        perif_labels=tuple(label for label, _ in perif),
+        de10_to_cyclone=dict(de10),
+        cyclone_to_de10={pin: label for label, pin in de10},
+        perif_to_cyclone=dict(perif),
+        cyclone_to_perif={pin: label for label, pin in perif},
+        version=(0, 0),
+    )
+
+# 3 источника -> поле выбора 2 бита, 5 выходов -> 10 бит, 2 байта
+TABLES = tables(
+    [('SW0', 'M1'), ('SW1', 'M2'), ('KEY0', 'N1')],
+    [('LED0', 'P1'), ('LED1', 'P2'), ('LED2', 'R1'), ('RGB1', 'R2'), ('E', 'T1')],
+)
+
+def test_layout():
+    layout = crossbar.make_layout(TABLES)
+    assert layout.sources == ('M1', 'M2', 'N1')
+    assert layout.targets == ('P1', 'P2', 'R1', 'R2', 'T1')
+    assert layout.sel_bits == 2
+    assert layout.image_bits == 10
+    assert crossbar.image_size(layout) == 2
+
+def test_layout_rejects_shared_pins():
+    with pytest.raises(ValueError):
+        crossbar.make_layout(tables([('SW0', 'M1')], [('LED0', 'M1')]))
+
+def test_selects_round_trip():
+    connections = [['SW1', 'LED0'], ['KEY0', 'E'], ['SW0', 'LED2'], ['SW0', 'RGB1']]
+    image = crossbar.encode_selects(connections, TABLES)
+    # LED0 <- 2, LED2 <- 1, RGB1 <- 1, E <- 3
+    assert int.from_bytes(image, 'little') == 2 | 1 << 4 | 1 << 6 | 3 << 8
+    assert sorted(crossbar.decode_selects(image, TABLES)) == sorted(connections)
+
+def test_selects_empty_and_duplicate():
+    assert crossbar.encode_selects([], TABLES) == bytes(2)
+    assert crossbar.decode_selects(bytes(2), TABLES) == []
+    image = crossbar.encode_selects([['SW0', 'LED1'], ['SW0', 'LED1']], TABLES)
+    assert crossbar.decode_selects(image, TABLES) == [['SW0', 'LED1']]
+
+def test_selects_errors():
+    with pytest.raises(ValueError):
+        crossbar.encode_selects([['SW9', 'LED0']], TABLES)
+    with pytest.raises(ValueError):
+        crossbar.encode_selects([['SW0', 'LED0'], ['SW1', 'LED0']], TABLES)
+    with pytest.raises(ValueError):
+        crossbar.decode_selects(bytes(3), TABLES)
+    # 5 источников - поле 3 бита, значение 7 не соответствует источнику
+    wide = tables([(f'SW{i}', f'A{i}') for i in range(5)], [('LED0', 'P1')])
+    with pytest.raises(ValueError):
+        crossbar.decode_selects(bytes((7,)), wide)
+
+def test_frame_round_trip():
+    image = bytes(range(40))
+    frame = crossbar.encode_frame(image)
+    assert frame[0] == crossbar.FRAME_SYNC
+    assert len(frame) == len(image) + 4
+    assert crossbar.decode_frame(frame) == image
+    assert crossbar.decode_frame(crossbar.encode_frame(b'')) == b''
+
+@pytest.mark.parametrize('position', [1, 3, 10, -1])
+def test_frame_corruption(position):
+    frame = bytearray(crossbar.encode_frame(bytes(range(16))))
+    frame[position] ^= 0x01
+    with pytest.raises(ValueError):
+        crossbar.decode_frame(bytes(frame))
+
+def test_frame_bad_sync_and_length():
+    frame = crossbar.encode_frame(b'\x01\x02')
+    with pytest.raises(ValueError):
+        crossbar.decode_frame(b'\x00' + frame[1:])
+    with pytest.raises(ValueError):
+        crossbar.decode_frame(frame[:-1])
+    with pytest.raises(ValueError):
+        crossbar.decode_frame(frame[:3])
+
+def test_generate_verilog():
+    layout = crossbar.make_layout(TABLES)
+    code = crossbar.generate_verilog(layout, 'TestCrossbar')
+    assert code.startswith('module TestCrossbar (')
+    assert code.rstrip().endswith('endmodule')
+    for port in ('cfg_clk', 'cfg_data', 'cfg_latch'):
+        assert f'\tinput {port},' in code
+    for pin in layout.sources + layout.targets:
+        assert code.count(f'\tinout {pin}') == 1
+    # У последнего порта нет запятой
+    assert '\tinout T1\n' in code
+    assert 'localparam SEL_BITS = 2;' in code
+    assert 'localparam WIDTH = 10;' in code
+    assert "wire [3:0] src = {N1, M2, M1, 1'b0};" in code
+    assert 'wire [SEL_BITS-1:0] sel_R1 = select_reg[2*SEL_BITS +: SEL_BITS];' in code
+    assert "assign R1 = (sel_R1 == 0) ? 1'bz : src[sel_R1];" in code
+    assert code.count('assign ') == len(layout.targets)
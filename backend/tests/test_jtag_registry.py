@@ -0,0 +1,55 @@
+import stat
+
+from app.services.jtag_registry import JtagRegistry, cable_slot
+
+# Заглушка quartus_pgm: два кабеля, каждый вызов дописывается в calls
+FAKE_PGM = r"""#!/bin/sh
+echo "$*" >> "$(dirname "$0")/calls"
+if [ "$1" = "-l" ]; then
+    echo "1) USB-Blaster [2-1]"
+    echo "2) USB-Blaster [2-2]"
+    exit 0
+fi
+echo "1) $2"
+echo "  020F10DD   EP3C(5|10)/EP4CE(6|10)"
+"""
+
+def make_registry(tmp_path):
+    pgm = tmp_path / "quartus_pgm"
+    pgm.write_text(FAKE_PGM)
+    pgm.chmod(pgm.stat().st_mode | stat.S_IEXEC)
+    return JtagRegistry(pgm, ttl=60)
+
+def calls(tmp_path):
+    path = tmp_path / "calls"
+    return path.read_text().splitlines() if path.exists() else []
+
+def test_busy_cable_not_scanned(tmp_path):
+    registry = make_registry(tmp_path)
+    registry.refresh()
+    assert registry.chain('USB-Blaster [2-2]')[0]['idcode'] == '020F10DD'
+    (tmp_path / "calls").unlink()
+    with cable_slot('USB-Blaster [2-2]'):
+        records = registry.refresh()
+    assert calls(tmp_path) == ['-l', '-c USB-Blaster [2-1] -a']
+    # Для занятого кабеля остаётся прежняя цепочка
+    assert records['USB-Blaster [2-2]']['devices'][0]['idcode'] == '020F10DD'
+
+def test_busy_cable_on_first_scan(tmp_path):
+    registry = make_registry(tmp_path)
+    with cable_slot('USB-Blaster [2-1]'):
+        registry.refresh()
+    assert registry.chain('USB-Blaster [2-1]') == []
+    assert len(registry.chain('USB-Blaster [2-2]')) == 1
+
+def test_failure_cached_for_ttl(tmp_path):
+    registry = JtagRegistry(tmp_path / "missing" / "quartus_pgm", ttl=60)
+    assert registry.resolve('EP4CE6', preferred='USB-Blaster [1-1]') == 'USB-Blaster [1-1]'
+    assert registry.last_error is not None
+    failed_at = registry.failed_at
+    assert registry.cables() == []
+    assert registry.resolve('EP4CE6') is None
+    assert registry.failed_at == failed_at
+    registry.invalidate()
+    assert registry.cables() == []
+    assert registry.failed_at != failed_at
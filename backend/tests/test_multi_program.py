@@ -0,0 +1,111 @@
+import stat
+import threading
+import time
+
+import pytest
+
+from app.services.board_scheduler import board_scheduler
+from app.services.multi_program import program_many
+
+FAKE_PGM = r"""#!/bin/sh
+# Заглушка quartus_pgm: три кабеля, кабели из fail_cables не прошиваются
+if [ "$1" = "-l" ]; then
+    echo "1) USB-Blaster [1-1]"
+    echo "2) USB-Blaster [1-2]"
+    echo "3) USB-Blaster [1-3]"
+    exit 0
+fi
+if [ "$3" = "-a" ]; then
+    echo "1) $2"
+    case "$2" in
+        *1-3*) echo "  031050DD   10M50DA(.|ES)/10M50DC" ;;
+        *) echo "  020F10DD   EP3C(5|10)/EP4CE(6|10)" ;;
+    esac
+    exit 0
+fi
+echo "Info: programming \"$4\" with $6"
+if grep -qxF "$4" "$(dirname "$0")/fail_cables" 2>/dev/null; then
+    echo "Error (209012): Operation failed"
+    exit 2
+fi
+echo "Info (209011): Successfully performed operation(s)"
+"""
+
+@pytest.fixture
+def quartus_dir(tmp_path):
+    pgm = tmp_path / "quartus_pgm"
+    pgm.write_text(FAKE_PGM)
+    pgm.chmod(pgm.stat().st_mode | stat.S_IEXEC)
+    (tmp_path / "fail_cables").write_text("")
+    return tmp_path
+
+@pytest.fixture
+def sof(tmp_path):
+    path = tmp_path / "GreenP.sof"
+    path.write_bytes(b"sof")
+    return path
+
+def test_all_cables_succeed(quartus_dir, sof):
+    result = program_many(sof, cables='all', quartus_dir=quartus_dir)
+    assert [r['cable'] for r in result['results']] == \
+        ['USB-Blaster [1-1]', 'USB-Blaster [1-2]', 'USB-Blaster [1-3]']
+    assert all(r['ok'] and r['error'] is None for r in result['results'])
+    assert (result['succeeded'], result['failed']) == (3, 0)
+    assert any('Successfully performed' in line for line in result['results'][0]['log'])
+
+def test_partial_failure(quartus_dir, sof):
+    (quartus_dir / "fail_cables").write_text("USB-Blaster [1-2]\n")
+    result = program_many(sof, cables=['USB-Blaster [1-2]', 'USB-Blaster [1-3]', 'USB-Blaster [9-9]'],
+                          quartus_dir=quartus_dir)
+    by_cable = {r['cable']: r for r in result['results']}
+    assert by_cable['USB-Blaster [1-2]']['ok'] is False
+    assert by_cable['USB-Blaster [1-2]']['error'] == 'Programming failed'
+    assert any('Operation failed' in line for line in by_cable['USB-Blaster [1-2]']['log'])
+    assert by_cable['USB-Blaster [1-3]']['ok'] is True
+    assert 'не найдена' in by_cable['USB-Blaster [9-9]']['error']
+    assert (result['succeeded'], result['failed']) == (1, 2)
+
+def test_device_filter(quartus_dir, sof):
+    result = program_many(sof, cables='all', device='10M50DAF484C7G', quartus_dir=quartus_dir)
+    assert [r['cable'] for r in result['results']] == ['USB-Blaster [1-3]']
+
+def test_no_cables(quartus_dir, sof):
+    with pytest.raises(IOError):
+        program_many(sof, cables='all', device='5CSEMA5F31C6', quartus_dir=quartus_dir)
+
+def test_busy_board_waits_for_lease(quartus_dir, sof):
+    # USB-Blaster [1-1] - первый кабель с ПЛИС платы green
+    hold = board_scheduler.request('green', 'teacher')
+    assert hold.state == 'active'
+    threading.Timer(0.5, board_scheduler.release, args=(hold.id,)).start()
+    started = time.monotonic()
+    result = program_many(sof, cables=['USB-Blaster [1-1]', 'USB-Blaster [1-2]'], quartus_dir=quartus_dir)
+    assert time.monotonic() - started >= 0.5
+    assert (result['succeeded'], result['failed']) == (2, 0)
+    assert board_scheduler.get_queue('green')['active'] is None
+
+def test_trimmed_lease_is_not_waiting(quartus_dir, sof, monkeypatch):
+    # Заявка на занятую плату исчезла из истории планировщика (get_lease -> None)
+    hold = board_scheduler.request('green', 'teacher')
+    get_lease = board_scheduler.get_lease
+    trimmed = set()
+
+    def trim_waiting():
+        trimmed.update(info['id'] for info in board_scheduler.get_queue('green')['waiting'])
+        monkeypatch.setattr(board_scheduler, 'get_lease',
+                            lambda lease_id: None if lease_id in trimmed else get_lease(lease_id))
+
+    timer = threading.Timer(0.2, trim_waiting)
+    timer.start()
+    try:
+        result = program_many(sof, cables=['USB-Blaster [1-1]', 'USB-Blaster [1-2]'], quartus_dir=quartus_dir)
+    finally:
+        timer.join()
+        for lease_id in trimmed:
+            board_scheduler.release(lease_id)
+        board_scheduler.release(hold.id)
+    by_cable = {r['cable']: r for r in result['results']}
+    assert trimmed
+    assert not by_cable['USB-Blaster [1-1]']['ok']
+    assert 'истекла' in by_cable['USB-Blaster [1-1]']['error']
+    assert by_cable['USB-Blaster [1-2]']['ok']
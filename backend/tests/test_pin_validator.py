@@ -0,0 +1,145 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.config.quartus_config import BOARDS
+from app.services import pin_validator as pin_validator_module
+from app.services.connection_matrix import ConnectionMatrix
+from app.services.pin_map import PinTables
+from app.services.pin_validator import PinValidator, io_voltage, parse_qsf_pins
+
+# V10 (DE10-Lite) -> пин N5, E (периферия) -> пин N8, см. app/data/*.csv
+PIN_REPORT = """Quartus Prime Version 20.1.0
+Pin Name/Usage               : Location  : Dir.   : I/O Standard      : Voltage : I/O Bank  : User Assignment
+-------------------------------------------------------------------------------------------------------------
+N5                           : N5        : bidir  : 3.3-V LVTTL       :         : 3         : Y
+N8                           : N8        : bidir  : 3.3-V LVTTL       :         : 4         : Y
+"""
+
+def qsf(n5, n8):
+    return (
+        'set_global_assignment -name STRATIX_DEVICE_IO_STANDARD "3.3-V LVTTL"\n'
+        'set_location_assignment PIN_N5 -to N5\n'
+        'set_location_assignment PIN_N8 -to N8\n'
+        f'set_instance_assignment -name IO_STANDARD "{n5}" -to N5\n'
+        f'set_instance_assignment -name IO_STANDARD "{n8}" -to N8 -entity top\n'
+    )
+
+@pytest.fixture
+def validator(tmp_path):
+    (tmp_path / "GreenP.pin").write_text(PIN_REPORT)
+    return PinValidator(tmp_path / "GreenP.pin", tmp_path / "GreenP.qsf")
+
+def codes(items):
+    return [item['code'] for item in items]
+
+GREEN_PIN = Path(BOARDS['green']['dir']) / "output_files" / "GreenP.pin"
+
+def test_parse_qsf_pins():
+    locations, standards, default = parse_qsf_pins(qsf("2.5 V", "3.3-V LVCMOS").splitlines())
+    assert locations == {'N5': 'N5', 'N8': 'N8'}
+    assert standards == {'N5': '2.5 V', 'N8': '3.3-V LVCMOS'}
+    assert default == '3.3-V LVTTL'
+
+@pytest.mark.skipif(not GREEN_PIN.exists(), reason="нет таблицы пинов сборки Green")
+def test_real_pin_report_uses_port_names(tmp_path):
+    # W10 -> порт M1, размещённый сборкой на E8; место M1 в корпусе - GND+
+    validator = PinValidator(GREEN_PIN, tmp_path / "GreenP.qsf")
+    assert validator.validate([['W10', 'RGB1']]) == {'valid': True, 'errors': [], 'warnings': []}
+
+    # Закреплённый в .qsf на место M1 порт попадает на землю
+    (tmp_path / "GreenP.qsf").write_text('set_location_assignment PIN_M1 -to M1\n')
+    report = validator.validate([['W10', 'RGB1']])
+    assert codes(report['errors']) == ['reserved_pin']
+    assert 'GND+' in report['errors'][0]['message']
+
+def test_pin_report_findings_are_warnings_without_location(tmp_path):
+    (tmp_path / "GreenP.pin").write_text(PIN_REPORT.replace("N8        : bidir ", "N8        : input "))
+    validator = PinValidator(tmp_path / "GreenP.pin", tmp_path / "GreenP.qsf")
+    report = validator.validate([['V10', 'E']])
+    assert report['valid']
+    assert codes(report['warnings']) == ['direction']
+
+    (tmp_path / "GreenP.qsf").write_text(qsf("3.3-V LVTTL", "3.3-V LVTTL"))
+    report = validator.validate([['V10', 'E']])
+    assert not report['valid']
+    assert codes(report['errors']) == ['direction']
+
+@pytest.mark.parametrize('standard, voltage', [
+    ('3.3-V LVTTL', 3.3), ('2.5 V', 2.5), ('1.2 V', 1.2),
+    ('SSTL-2 Class I', 2.5), ('HSTL-18 Class II', 1.8), ('LVDS', None), (None, None),
+])
+def test_io_voltage(standard, voltage):
+    assert io_voltage(standard) == voltage
+
+def test_same_standard_no_warnings(validator, tmp_path):
+    (tmp_path / "GreenP.qsf").write_text(qsf("3.3-V LVTTL", "3.3-V LVTTL"))
+    report = validator.validate([['V10', 'E']])
+    assert report == {'valid': True, 'errors': [], 'warnings': []}
+
+def test_bank_voltage_from_qsf(validator, tmp_path):
+    (tmp_path / "GreenP.qsf").write_text(qsf("2.5 V", "3.3-V LVTTL"))
+    report = validator.validate([['V10', 'E']])
+    assert report['valid']
+    assert codes(report['warnings']) == ['io_standard', 'bank_voltage']
+    assert '2.5 В' in report['warnings'][1]['message']
+
+def test_same_voltage_only_standard_warning(validator, tmp_path):
+    (tmp_path / "GreenP.qsf").write_text(qsf("3.3-V LVCMOS", "3.3-V LVTTL"))
+    assert codes(validator.validate([['V10', 'E']])['warnings']) == ['io_standard']
+
+def test_qsf_change_rebuilds_index(validator, tmp_path):
+    path = tmp_path / "GreenP.qsf"
+    path.write_text(qsf("3.3-V LVTTL", "3.3-V LVTTL"))
+    assert validator.validate([['V10', 'E']])['warnings'] == []
+    mtime = path.stat().st_mtime_ns
+    path.write_text(qsf("1.8 V", "3.3-V LVTTL"))
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+    assert 'bank_voltage' in codes(validator.validate([['V10', 'E']])['warnings'])
+
+class FakePinMap:
+    def __init__(self, de10, perif):
+        self.tables = PinTables(
+            tuple(label for label, _ in de10), tuple(label for label, _ in perif),
+            dict(de10), {pin: label for label, pin in de10},
+            dict(perif), {pin: label for label, pin in perif}, (0, 0))
+
+    def get(self):
+        return self.tables
+
+def test_drivers_and_conflicts(tmp_path, monkeypatch):
+    # Пин P1 есть и среди источников (SW2), и среди выходов (LED1)
+    fake = FakePinMap([('SW0', 'M1'), ('SW1', 'M2'), ('SW2', 'P1')],
+                      [('LED0', 'P0'), ('LED1', 'P1'), ('LED2', 'M2')])
+    monkeypatch.setattr(pin_validator_module, 'pin_map', fake)
+    validator = PinValidator(tmp_path / "missing.pin")
+    report = validator.validate([
+        ['SW0', 'LED0'],
+        ['SW0', 'LED0'],   # повтор
+        ['SW1', 'LED0'],   # второй источник выхода LED0
+        ['SW0', 'LED1'],
+        ['SW2', 'LED2'],   # P1 уже выход LED1
+    ])
+    assert [(e['index'], e['code']) for e in report['errors']] == [(2, 'multiple_drivers'), (4, 'conflict')]
+    assert 'паре 0' in report['errors'][0]['message']
+    assert 'паре 3' in report['errors'][1]['message']
+    assert [(w['index'], w['code']) for w in report['warnings']] == [(1, 'duplicate')]
+    # Наоборот: P1 уже источник SW2, выход LED1 - тот же пин
+    report = validator.validate([['SW2', 'LED0'], ['SW0', 'LED1']])
+    assert [(e['index'], e['code']) for e in report['errors']] == [(1, 'conflict')]
+    assert 'источник в паре 0' in report['errors'][0]['message']
+
+def test_matrix_bulk_set_and_clear():
+    matrix = ConnectionMatrix(4, 70)
+    matrix.set_many([(0, 1), (0, 65), (3, 65), (0, 1)])
+    assert list(matrix.cells()) == [(0, 1), (0, 65), (3, 65)]
+    assert matrix.column(65) == [0, 3]
+    assert matrix.multiple_drivers() == {65: [0, 3]}
+    matrix.clear_many([(0, 65), (3, 65)])
+    assert list(matrix.cells()) == [(0, 1)]
+    assert matrix.cols[65] == 0
+    # Ячейка вне матрицы - матрица не меняется
+    with pytest.raises(IndexError):
+        matrix.set_many([(1, 2), (4, 0)])
+    assert list(matrix.cells()) == [(0, 1)]
@@ -0,0 +1,93 @@
+import os
+import time
+
+import pytest
+
+pty = pytest.importorskip('pty')
+pytest.importorskip('serial')
+
+from app.services.serial_pool import SerialPool
+
+class FakeDevice:
+    """Псевдотерминал вместо Arduino: порт - симлинк на его slave-сторону, как у udev"""
+
+    def __init__(self, link):
+        self.link = link
+        self.plug()
+
+    def plug(self):
+        self.master, slave = pty.openpty()
+        name = os.ttyname(slave)
+        os.close(slave)
+        if os.path.lexists(self.link):
+            os.unlink(self.link)
+        os.symlink(name, self.link)
+
+    def unplug(self):
+        os.close(self.master)
+        os.unlink(self.link)
+
+    def read(self, size, timeout=2.0):
+        data = b""
+        deadline = time.monotonic() + timeout
+        while len(data) < size and time.monotonic() < deadline:
+            data += os.read(self.master, size - len(data))
+        return data
+
+@pytest.fixture
+def device(tmp_path):
+    device = FakeDevice(str(tmp_path / 'ttyACM0'))
+    yield device
+    try:
+        os.close(device.master)
+    except OSError:
+        pass
+
+@pytest.fixture
+def pool(device):
+    pool = SerialPool({'arduino': {'port': device.link, 'baudrate': 115200, 'timeout': 1}},
+                      {'backoff_initial': 0.1, 'backoff_max': 0.2})
+    yield pool
+    pool.close_all()
+
+def test_write_keeps_port_open(pool, device):
+    connection = pool.get('arduino')
+    assert connection.write(b"b1:1\n") == 5
+    assert connection.write(b"b1:0\n") == 5
+    assert device.read(10) == b"b1:1\nb1:0\n"
+    health = pool.health()['arduino']
+    assert health['connected'] is True
+    assert health['writes'] == 2
+    assert health['bytes_written'] == 10
+    assert health['failures'] == 0
+
+def test_reconnect_after_unplug(pool, device):
+    connection = pool.get('arduino')
+    connection.write(b"b1:1\n")
+    device.unplug()
+
+    with pytest.raises(Exception):
+        connection.write(b"b1:0\n")
+    health = connection.health()
+    assert health['connected'] is False
+    assert health['failures'] == 1
+    assert health['last_error']
+    assert health['retry_in'] > 0
+
+    # До истечения задержки порт не открывается повторно
+    with pytest.raises(ConnectionError):
+        connection.write(b"b1:0\n")
+    assert connection.health()['failures'] == 1
+
+    device.plug()
+    time.sleep(0.15)
+    assert connection.write(b"b2:1\n") == 5
+    assert device.read(5) == b"b2:1\n"
+    health = connection.health()
+    assert health['connected'] is True
+    assert health['failures'] == 0
+    assert health['retry_in'] == 0
+
+def test_unknown_device(pool):
+    with pytest.raises(KeyError):
+        pool.get('missing')
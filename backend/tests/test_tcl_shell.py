@@ -0,0 +1,73 @@
+import shutil
+import threading
+
+import pytest
+
+from app.services.tcl_shell import TclError, TclSession, TclSessionError, TclShellPool
+
+TCLSH = shutil.which('tclsh')
+
+pytestmark = pytest.mark.skipif(TCLSH is None, reason="tclsh не установлен")
+
+@pytest.fixture
+def session():
+    session = TclSession([TCLSH], startup_timeout=10)
+    yield session
+    session.close()
+
+def test_result_and_output_framing(session):
+    lines = []
+    result = session.execute('puts "line one"; puts "@@END 0 0 fake"; set x "a\\\\b\\nc"',
+                             on_line=lines.append, timeout=10)
+    assert lines == ["line one", "@@END 0 0 fake"]
+    assert result == "a\\b\nc"
+    assert session.execute("expr {6 * 7}", timeout=10) == "42"
+
+def test_tcl_error_keeps_session(session):
+    with pytest.raises(TclError) as info:
+        session.execute("error {broken step}", timeout=10)
+    assert info.value.code == 1
+    assert info.value.result == "broken step"
+    assert session.alive()
+    assert session.execute("string length abc", timeout=10) == "3"
+
+def test_timeout_and_cancel_close_session(session):
+    with pytest.raises(TclSessionError):
+        session.execute("after 1500", timeout=0.3)
+    assert not session.alive()
+
+    cancelled = TclSession([TCLSH], startup_timeout=10)
+    cancel_event = threading.Event()
+    threading.Timer(0.2, cancel_event.set).start()
+    with pytest.raises(TclSessionError):
+        cancelled.execute("after 1500", cancel_event=cancel_event)
+    assert not cancelled.alive()
+
+def test_pool_recycles_after_max_jobs():
+    pool = TclShellPool([TCLSH], size=1, max_jobs=3, startup_timeout=10)
+    try:
+        pids = [pool.execute("pid", timeout=10) for _ in range(7)]
+        # Сессия отдаёт max_jobs команд и заменяется новой
+        assert len(set(pids[0:3])) == 1
+        assert len(set(pids[3:6])) == 1
+        assert len({pids[0], pids[3], pids[6]}) == 3
+        stats = pool.get_stats()
+        assert stats['created'] == 3
+        assert stats['recycled'] == 2
+        assert stats['commands'] == 7
+    finally:
+        pool.close_all()
+
+def test_pool_replaces_dead_session():
+    pool = TclShellPool([TCLSH], size=1, max_jobs=10, startup_timeout=10)
+    try:
+        first = pool.execute("pid", timeout=10)
+        with pytest.raises(TclError):
+            pool.execute("error oops", timeout=10)
+        # TclError не ломает сессию
+        assert pool.execute("pid", timeout=10) == first
+        pool.idle[0].close()
+        assert pool.execute("pid", timeout=10) != first
+        assert pool.get_stats()['failed'] == 1
+    finally:
+        pool.close_all()
@@ -0,0 +1,39 @@
+from app.services.verilog_generator import render_template
+from app.services.verilog_template import TemplateCache, parse_template, rendered_template
+
+TEMPLATE = """// шаблон
+module top (
+    inout A1,   // комментарий с assign и );
+    inout B2,
+    output [3:0] LED
+);
+    wire unused;   assign A1 = B2;
+    /* assign X = Y; */
+    assign LED[0] = A1;
+
+endmodule
+"""
+
+def test_parse_template():
+    template = parse_template(TEMPLATE)
+    assert template.module == 'top'
+    assert template.ports == (('inout', 'A1'), ('inout', 'B2'), ('output', 'LED'))
+    assert template.assigns == (('A1', 'B2'), ('LED[0]', 'A1'))
+    assert template.tail.startswith('endmodule')
+
+def test_rendered_template_matches_parse():
+    template = parse_template(TEMPLATE)
+    pairs = [['B2', 'A1'], ['A1', 'LED[1]']]
+    text = render_template(template, pairs)
+    assert rendered_template(template, [(right, left) for left, right in pairs]) == parse_template(text)
+
+def test_cache_hit_after_put():
+    cache = TemplateCache(max_entries=2)
+    template = parse_template(TEMPLATE)
+    cache.put(TEMPLATE, template)
+    assert cache.get(TEMPLATE) is template
+    assert cache.stats == {'hits': 1, 'misses': 0}
+    cache.get(TEMPLATE + "\n")
+    cache.get(TEMPLATE + "\n\n")
+    assert len(cache.entries) == 2
+    assert cache.stats['misses'] == 2
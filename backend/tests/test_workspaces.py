@@ -0,0 +1,73 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from app.services.workspaces import PROJECT_LOCK_FILE, WorkspaceManager
+
+fcntl = pytest.importorskip('fcntl')
+
+HOLD_LOCK = """
+import fcntl, sys, time
+with open(sys.argv[1], 'a') as lock:
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    print('locked', flush=True)
+    time.sleep(float(sys.argv[2]))
+"""
+
+@pytest.fixture
+def project(tmp_path):
+    project = tmp_path / "2161_Green"
+    project.mkdir()
+    (project / "GreenP.v").write_text("module GreenP(); endmodule\n")
+    (project / "DE10_Cyclone.xlsx").write_bytes(b"xlsx")
+    (project / "db").mkdir()
+    (project / "db" / "GreenP.x").write_text("db")
+    return project
+
+@pytest.fixture
+def manager(tmp_path):
+    return WorkspaceManager(tmp_path / "workspaces", max_workspaces=2)
+
+def test_project_lock_waits_for_other_process(project, manager):
+    # Другой процесс (как program_fpga.py) держит блокировку проекта
+    holder = subprocess.Popen([sys.executable, '-c', HOLD_LOCK, str(project / PROJECT_LOCK_FILE), '0.5'],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'locked'
+        started = time.monotonic()
+        with manager.project_lock(project):
+            waited = time.monotonic() - started
+    finally:
+        holder.wait()
+    assert waited >= 0.3
+
+def test_project_lock_serializes_threads(project, manager):
+    events = []
+
+    def worker(name):
+        with manager.project_lock(project):
+            events.append(('enter', name))
+            time.sleep(0.05)
+            events.append(('exit', name))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [kind for kind, _ in events] == ['enter', 'exit'] * 3
+
+def test_create_links_inputs_and_skips_lock_file(project, manager):
+    with manager.project_lock(project):
+        pass
+    workspace = manager.create(project, label='t')
+    assert not (workspace / PROJECT_LOCK_FILE).exists()
+    assert (workspace / "DE10_Cyclone.xlsx").stat().st_ino == (project / "DE10_Cyclone.xlsx").stat().st_ino
+    assert (workspace / "db" / "GreenP.x").stat().st_ino != (project / "db" / "GreenP.x").stat().st_ino
+    (workspace / "db" / "GreenP.x").write_text("new db")
+    manager.promote(workspace, project)
+    assert (project / "db" / "GreenP.x").read_text() == "new db"
+    manager.release(workspace)
@@ -124,6 +124,24 @@ function App() {
     // eslint-disable-next-line
   }, []);
 
+  // Прошивка идёт задачей в очереди: маршрут сразу отвечает 202 с job_id,
+  // ход и итог приходят событиями SSE /api/jobs/<id>/events
+  const waitForJob = (jobId, onLog) => new Promise((resolve, reject) => {
+    const source = new EventSource(`http://localhost:5050/api/jobs/${jobId}/events`);
+    source.addEventListener('log', (ev) => {
+      if (onLog) onLog(JSON.parse(ev.data));
+    });
+    source.addEventListener('status', (ev) => {
+      source.close();
+      resolve(JSON.parse(ev.data));
+    });
+    source.onerror = () => {
+      // После закрытия потока сервером браузер переподключается сам;
+      // ошибка без события status - потеря соединения
+      if (source.readyState === EventSource.CLOSED) reject(new Error('Соединение с сервером потеряно'));
+    };
+  });
+
   const handleProgramDe10 = async () => {
     if (!selectedSof) return;
     setUploadStatus('Программирование...');
@@ -134,8 +152,10 @@ function App() {
         body: JSON.stringify({ sof_path: selectedSof })
       });
       const json = await resp.json();
-      if (resp.ok) setUploadStatus('Плата DE10 успешно прошита!');
-      else setUploadStatus('Ошибка прошивки: ' + (json.error || 'Неизвестная ошибка'));
+      if (!resp.ok) throw new Error(json.error || 'Неизвестная ошибка');
+      const job = await waitForJob(json.job_id, (entry) => setUploadStatus('Программирование: ' + entry.text));
+      if (job.status === 'succeeded') setUploadStatus('Плата DE10 успешно прошита!');
+      else setUploadStatus('Ошибка прошивки: ' + (job.error || job.status));
     } catch (e) {
       setUploadStatus('Ошибка: ' + e.message);
     }
@@ -161,10 +181,12 @@ function App() {
       setSaveStatus('Программирование FPGA...');
       const programResp = await fetch('http://localhost:5050/api/pins/program', { method: 'POST' });
       const programJson = await programResp.json();
-      if (programResp.ok) {
+      if (!programResp.ok) throw new Error(programJson.error || 'Failed to program FPGA');
+      const job = await waitForJob(programJson.job_id, (entry) => setSaveStatus('Программирование FPGA: ' + entry.text));
+      if (job.status === 'succeeded') {
         alert('Конфигурация успешно применена!');
       } else {
-        throw new Error(programJson.error || 'Failed to program FPGA');
+        throw new Error(job.error || 'Failed to program FPGA');
       }
     } catch (e) {
       alert('Ошибка применения конфигурации: ' + e.message);
@@ -7,9 +7,23 @@
 import subprocess
 import os
 import argparse
+import hashlib
+import json
 import sys
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Файлы в директории проекта для объединения одинаковых компиляций
+# из нескольких одновременно запущенных скриптов. LOCK_FILE блокирует и
+# backend (workspaces.PROJECT_LOCK_FILE), пока копирует проект, возвращает
+# в него результаты сборки или компилирует в нём
+LOCK_FILE = '.program_fpga.lock'
+RESULT_FILE = '.program_fpga.json'
+
 def run_command(command, description):
     """Запуск команды с выводом подробной информации"""
     print(f"\n----- Выполняю: {description} -----")
@@ -50,6 +64,49 @@ def compile_quartus_project(quartus_sh_path, project_path):
     command = f'"{quartus_sh_path}" --flow compile "{project_path}"'
     return run_command(command, "Компиляция проекта")
 
+def sources_hash(project_dir, project_name):
+    """Хэш исходников проекта (.qpf, .qsf, .v), по которому совпадают компиляции"""
+    h = hashlib.sha256()
+    for suffix in ('.qpf', '.qsf', '.v'):
+        path = project_dir / f"{project_name}{suffix}"
+        h.update(suffix.encode())
+        h.update(path.read_bytes() if path.exists() else b"")
+    return h.hexdigest()
+
+def compile_once(quartus_sh_path, project_file, project_dir, project_name, sof_file):
+    """
+    Компилирует проект, объединяя одновременные запуски с теми же исходниками.
+
+    Компиляция идёт под блокировкой файла в директории проекта (тот же файл
+    блокирует backend, см. app/services/workspaces.py). Процесс, дождавшийся
+    блокировки, сначала проверяет, не скомпилировал ли только что такие же
+    исходники другой процесс, и тогда использует готовый .sof. Хэш исходников
+    считается уже под блокировкой: пока процесс ждал, их могли изменить.
+    """
+    if fcntl is None:
+        return compile_quartus_project(quartus_sh_path, project_file)
+    with open(project_dir / LOCK_FILE, 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print("Проект уже компилируется другим процессом, ожидание...")
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        digest = sources_hash(project_dir, project_name)
+        try:
+            result = json.loads((project_dir / RESULT_FILE).read_text())
+        except (OSError, ValueError):
+            result = {}
+        if result.get('sources') == digest and sof_file.exists() \
+                and result.get('sof_mtime') == sof_file.stat().st_mtime_ns:
+            print("Эти исходники уже скомпилированы другим процессом, компиляция пропущена")
+            return True
+        if not compile_quartus_project(quartus_sh_path, project_file):
+            return False
+        if sof_file.exists():
+            (project_dir / RESULT_FILE).write_text(json.dumps(
+                {'sources': digest, 'sof_mtime': sof_file.stat().st_mtime_ns}))
+        return True
+
 def find_fpga_device(quartus_pgm_path):
     """Находит подключенные FPGA устройства"""
     command = f'"{quartus_pgm_path}" -l'
@@ -138,7 +195,7 @@ def main():
     
     # Компиляция
     print("\nШаг 1: Компиляция проекта")
-    if not compile_quartus_project(quartus_sh, project_file):
+    if not compile_once(quartus_sh, project_file, project_dir, args.project_name, sof_file):
         print("Компиляция проекта не удалась. Выход.")
         return 1
     